@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+API Benchmark for School Management System
+
+Drives a running backend with concurrent keep-alive clients and reports
+requests per second and latency percentiles. It is meant for before/after
+comparisons on a local stack, e.g. for the principal cache in
+authenticateToken:
+
+    export RATE_LIMIT_MAX_REQUESTS=1000000  # the default /api limit is 100 per 15 min
+    PRINCIPAL_CACHE_TTL_MS=0 npm start       # cache off
+    python api_bench.py auth --save before.json
+    npm start                                # cache on (default TTL)
+    python api_bench.py auth --baseline before.json
+
+The auth scenario logs in once and then hammers a cheap authenticated
+endpoint (GET /api/auth/me, one primary-key lookup of its own), so the
+difference between the runs is the middleware's principal lookup.
+
+The attendance scenario simulates the morning burst: --rolls roll calls of
+--roll-size students each, all submitted to POST /api/attendance/bulk at
+once by --concurrency clients. Courses and students are read from the
+database (DATABASE_URL); rolls are dated from --start-date onwards, one day
+per course, and --cleanup deletes the rows written under those dates.
+
+Credentials come from --email/--password or BACKEND_ADMIN_EMAIL and
+BACKEND_ADMIN_PASSWORD (defaults: the demo admin account).
+
+Usage:
+    python api_bench.py auth [--url http://localhost:5000] [--path /api/auth/me] [--requests 5000] [--concurrency 16] [--save FILE] [--baseline FILE]
+    python api_bench.py attendance [--rolls 300] [--roll-size 30] [--concurrency 30] [--start-date 2000-01-03] [--cleanup]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class ApiClient:
+    """One keep-alive HTTP connection; each benchmark thread gets its own."""
+
+    def __init__(self, base_url: str, token: Optional[str] = None, timeout: float = 10.0):
+        url = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        self.connection = connection_class(url.netloc, timeout=timeout)
+        self.prefix = url.path.rstrip("/")
+        self.token = token
+
+    def request(self, method: str, path: str, body: Optional[dict] = None) -> Tuple[int, bytes]:
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = json.dumps(body) if body is not None else None
+        try:
+            self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+        except (http.client.HTTPException, ConnectionError):
+            # Server closed the idle connection; reconnect once
+            self.connection.close()
+            self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+        return response.status, response.read()
+
+    def close(self):
+        self.connection.close()
+
+
+def login(base_url: str, email: str, password: str) -> Tuple[str, dict]:
+    """Token and user record of the account."""
+    client = ApiClient(base_url)
+    try:
+        status, body = client.request("POST", "/api/auth/login", {"email": email, "password": password})
+    finally:
+        client.close()
+    if status != 200:
+        raise RuntimeError(f"login failed with HTTP {status}: {body[:200].decode('utf-8', 'replace')}")
+    # Nested ({ data: { token, user } }) or flattened ({ token, user }) response
+    payload = json.loads(body)
+    data = payload.get("data") or payload
+    token = data.get("token") or payload.get("token")
+    if not token:
+        raise RuntimeError(f"login response has no token: {body[:200].decode('utf-8', 'replace')}")
+    return token, data.get("user") or payload.get("user") or {}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(make_client: Callable[[], ApiClient], call: Callable[[ApiClient, int], int], requests: int,
+             concurrency: int) -> Dict[str, object]:
+    """
+    Run `call(client, n)` for n in range(requests) across `concurrency`
+    threads, each with its own client. call returns the HTTP status.
+    """
+    local = threading.local()
+    clients: List[ApiClient] = []
+    clients_lock = threading.Lock()
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    results_lock = threading.Lock()
+
+    def one(n: int):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = make_client()
+            with clients_lock:
+                clients.append(client)
+        started = time.perf_counter()
+        try:
+            status = call(client, n)
+        except (OSError, http.client.HTTPException):
+            status = 0
+        elapsed = (time.perf_counter() - started) * 1000
+        with results_lock:
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+    for client in clients:
+        client.close()
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(wall, 3),
+        "rps": round(requests / wall, 1) if wall else 0.0,
+        "p50Ms": round(percentile(latencies, 0.50), 2),
+        "p95Ms": round(percentile(latencies, 0.95), 2),
+        "p99Ms": round(percentile(latencies, 0.99), 2),
+        "meanMs": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def print_report(label: str, result: Dict[str, object], baseline: Optional[Dict[str, object]] = None):
+    print(f"📊 {label}: {result['requests']} requests, concurrency {result['concurrency']}, "
+          f"{result['seconds']}s")
+    print(f"   - throughput: {result['rps']} req/s")
+    print(f"   - latency: p50 {result['p50Ms']} ms, p95 {result['p95Ms']} ms, p99 {result['p99Ms']} ms")
+    print("   - statuses: " + ", ".join(f"{status} x{count}" for status, count in result["statuses"].items()))
+    if baseline:
+        change = (result["rps"] / baseline["rps"] - 1) * 100 if baseline.get("rps") else 0.0
+        print(f"   - vs baseline: {baseline['rps']} -> {result['rps']} req/s ({change:+.1f}%), "
+              f"p95 {baseline['p95Ms']} -> {result['p95Ms']} ms")
+
+
+def save_and_report(label: str, result: Dict[str, object], args) -> int:
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(label, result, baseline)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Saved to {args.save}")
+    failed = sum(count for status, count in result["statuses"].items() if not status.startswith("2"))
+    return 1 if failed else 0
+
+
+def bench_auth(args) -> int:
+    token, _ = login(args.url, args.email, args.password)
+    print(f"🔑 Logged in as {args.email}")
+    # Warm up connections (and the cache, when it is on) before measuring
+    run_load(lambda: ApiClient(args.url, token), lambda client, n: client.request(args.method, args.path)[0],
+             min(200, args.requests), args.concurrency)
+    result = run_load(lambda: ApiClient(args.url, token),
+                      lambda client, n: client.request(args.method, args.path)[0],
+                      args.requests, args.concurrency)
+    return save_and_report(f"{args.method} {args.path}", result, args)
+
+
+def attendance_fixtures(roll_size: int) -> Tuple[List[str], List[str]]:
+    """Course ids and up to roll_size student ids from the database."""
+    # Deferred so the HTTP-only auth scenario doesn't need psycopg2
+    import psycopg2
+    from create_user import get_db_config
+
+    cfg = get_db_config()
+    conn = psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id::text FROM courses ORDER BY id")
+            courses = [row[0] for row in cur.fetchall()]
+            cur.execute("SELECT id::text FROM users WHERE role = 'student' ORDER BY id LIMIT %s", (roll_size,))
+            students = [row[0] for row in cur.fetchall()]
+        conn.commit()
+    finally:
+        conn.close()
+    return courses, students
+
+
+def cleanup_attendance(courses: List[str], first_day: date, last_day: date) -> int:
+    import psycopg2
+    from create_user import get_db_config
+
+    cfg = get_db_config()
+    conn = psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+    try:
+        with conn.cursor() as cur:
+            cur.execute('DELETE FROM attendance WHERE "courseId" = ANY(%s::uuid[]) AND date BETWEEN %s AND %s',
+                        (courses, first_day, last_day))
+            deleted = cur.rowcount
+        conn.commit()
+    finally:
+        conn.close()
+    return deleted
+
+
+def bench_attendance(args) -> int:
+    courses, students = attendance_fixtures(args.roll_size)
+    if not courses or not students:
+        print("❌ Need at least one course and one student in the database")
+        return 1
+    token, user = login(args.url, args.email, args.password)
+    print(f"🔑 Logged in as {args.email} ({user.get('role', '?')})")
+    if user.get("role") != "admin":
+        print("⚠️  Non-admin accounts can only mark their own courses; expect 403s for the others")
+
+    statuses = ("present", "present", "present", "present", "late", "absent", "excused")
+    # Roll n: course n % len(courses) on its own day, so every roll is a fresh insert
+    start = date.fromisoformat(args.start_date)
+    days = (args.rolls + len(courses) - 1) // len(courses)
+    print(f"🏫 {args.rolls} rolls of {len(students)} students over {len(courses)} courses, "
+          f"{args.concurrency} at once")
+
+    def submit(client: ApiClient, n: int) -> int:
+        roll_date = start + timedelta(days=n // len(courses))
+        body = {
+            "courseId": courses[n % len(courses)],
+            "date": roll_date.isoformat(),
+            "attendanceData": [{"studentId": student, "status": statuses[(n + i) % len(statuses)]}
+                               for i, student in enumerate(students)],
+        }
+        return client.request("POST", "/api/attendance/bulk", body)[0]
+
+    try:
+        result = run_load(lambda: ApiClient(args.url, token), submit, args.rolls, args.concurrency)
+        code = save_and_report("POST /api/attendance/bulk", result, args)
+    finally:
+        if args.cleanup:
+            deleted = cleanup_attendance(courses, start, start + timedelta(days=days - 1))
+            print(f"🧹 Deleted {deleted} benchmark attendance rows")
+    return code
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark a running backend")
+    parser.add_argument("--url", default=os.getenv("BACKEND_URL", "http://localhost:5000"))
+    parser.add_argument("--email", default=os.getenv("BACKEND_ADMIN_EMAIL", "admin@school.com"))
+    parser.add_argument("--password", default=os.getenv("BACKEND_ADMIN_PASSWORD", "admin123"))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    auth_parser = sub.add_parser("auth", help="Throughput of an authenticated endpoint")
+    auth_parser.add_argument("--path", default="/api/auth/me")
+    auth_parser.add_argument("--method", default="GET")
+    auth_parser.add_argument("--requests", type=int, default=5000)
+    auth_parser.add_argument("--concurrency", type=int, default=16)
+    auth_parser.add_argument("--save", help="Write the result as JSON (use as a later --baseline)")
+    auth_parser.add_argument("--baseline", help="Compare against a result saved with --save")
+
+    attendance_parser = sub.add_parser("attendance", help="Morning burst of bulk attendance rolls")
+    attendance_parser.add_argument("--rolls", type=int, default=300)
+    attendance_parser.add_argument("--roll-size", type=int, default=30)
+    attendance_parser.add_argument("--concurrency", type=int, default=30)
+    attendance_parser.add_argument("--start-date", default="2000-01-03", help="First roll date (keep clear of real data)")
+    attendance_parser.add_argument("--cleanup", action="store_true", help="Delete the rows written by the run")
+    attendance_parser.add_argument("--save", help="Write the result as JSON (use as a later --baseline)")
+    attendance_parser.add_argument("--baseline", help="Compare against a result saved with --save")
+    args = parser.parse_args(argv)
+    return bench_auth(args) if args.command == "auth" else bench_attendance(args)
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
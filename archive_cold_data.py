@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Cold-Data Archiver for School Management System
+
+Moves rows from past terms out of the hot, ever-growing tables into matching
+tables in an "archive" schema:
+
+- messages       (by "createdAt")
+- attendance     (by date)
+- test_comments  (by "createdAt")
+
+Rows are moved oldest-first in keyset-paginated batches. Each batch is a
+single DELETE ... RETURNING feeding an INSERT, committed on its own, with a
+lock_timeout and an optional pause between batches so the app is never
+blocked for long. Archived rows stay queryable through archive.<table> and
+the archive.<table>_all views (hot UNION ALL archived), and can be exported
+to gzip-compressed JSON Lines files or restored on demand.
+
+Archiving messages fires the unread-counter triggers like any other delete,
+so message_counters keep describing the hot table only.
+
+Usage:
+    python archive_cold_data.py archive --before 2024-08-01 [--tables messages attendance]
+    python archive_cold_data.py export --before 2023-08-01 --output archive_exports/ [--purge]
+    python archive_cold_data.py restore --table messages --after 2024-01-01 --before 2024-02-01
+    python archive_cold_data.py status
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import psycopg2
+from psycopg2 import sql
+
+from create_user import get_db_config
+
+ARCHIVE_SCHEMA = "archive"
+
+# Consecutive lock timeouts after which a table is skipped for this run
+MAX_LOCK_RETRIES = 5
+
+# table -> column that decides whether a row is cold
+ARCHIVABLE_TABLES = {
+    "messages": "createdAt",
+    "attendance": "date",
+    "test_comments": "createdAt",
+}
+
+
+def connect():
+    cfg = get_db_config()
+    return psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+
+
+def table_exists(cur, schema: str, table: str) -> bool:
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (f'{schema}."{table}"',))
+    return cur.fetchone()[0]
+
+
+def table_columns(cur, schema: str, table: str) -> Dict[str, str]:
+    """Column name -> SQL type, in table order."""
+    cur.execute("""
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped
+        ORDER BY a.attnum
+    """, (f'{schema}."{table}"',))
+    return dict(cur.fetchall())
+
+
+def ensure_archive_table(conn, table: str, ts_column: str) -> List[str]:
+    """
+    Create archive.<table> (same columns, no foreign keys, only the indexes
+    needed to look rows up) and add any columns the hot table gained since.
+    Returns the shared column list.
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(ARCHIVE_SCHEMA)))
+        archive = sql.Identifier(ARCHIVE_SCHEMA, table)
+        cur.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} (LIKE {} INCLUDING DEFAULTS)").format(
+            archive, sql.Identifier("public", table)))
+
+        hot = table_columns(cur, "public", table)
+        cold = table_columns(cur, ARCHIVE_SCHEMA, table)
+        for column, column_type in hot.items():
+            if column not in cold:
+                cur.execute(sql.SQL("ALTER TABLE {} ADD COLUMN {} " + column_type).format(
+                    archive, sql.Identifier(column)))
+
+        cur.execute(sql.SQL("CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} (id)").format(
+            sql.Identifier(f"{table}_archive_id"), archive))
+        cur.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} ({}, id)").format(
+            sql.Identifier(f"{table}_archive_{ts_column}"), archive, sql.Identifier(ts_column)))
+
+        columns = list(hot)
+        column_list = sql.SQL(", ").join(sql.Identifier(column) for column in columns)
+        cur.execute(sql.SQL(
+            "CREATE OR REPLACE VIEW {} AS SELECT {cols} FROM {} UNION ALL SELECT {cols} FROM {}"
+        ).format(
+            sql.Identifier(ARCHIVE_SCHEMA, f"{table}_all"),
+            sql.Identifier("public", table),
+            archive,
+            cols=column_list,
+        ))
+    conn.commit()
+    return columns
+
+
+def qualified(alias: str, columns: List[str]) -> sql.Composed:
+    """t."a", t."b", ... - RETURNING must not be ambiguous with the batch CTE's id."""
+    return sql.SQL(", ").join(sql.Identifier(alias, column) for column in columns)
+
+
+def attached_filter(skip_attached: bool) -> sql.SQL:
+    """Extra condition on hot rows aliased t, shared by the move and the dry-run count."""
+    if skip_attached:
+        # Attachments still point at their message; leave those rows hot.
+        return sql.SQL(' AND NOT EXISTS (SELECT 1 FROM attachments a WHERE a."messageId" = t.id)')
+    return sql.SQL("")
+
+
+def move_batch_sql(table: str, ts_column: str, columns: List[str], skip_attached: bool) -> sql.Composed:
+    column_list = sql.SQL(", ").join(sql.Identifier(column) for column in columns)
+    return sql.SQL("""
+        WITH batch AS (
+            SELECT t.id, t.{ts} AS ts
+            FROM {hot} t
+            WHERE t.{ts} < %(cutoff)s
+              AND (%(last_ts)s::timestamp IS NULL OR (t.{ts}, t.id) > (%(last_ts)s, %(last_id)s::uuid))
+              {extra}
+            ORDER BY t.{ts}, t.id
+            LIMIT %(limit)s
+            FOR UPDATE SKIP LOCKED
+        ),
+        moved AS (
+            DELETE FROM {hot} t USING batch WHERE t.id = batch.id
+            RETURNING {returning}
+        ),
+        stored AS (
+            -- A leftover archived copy is replaced by the hot row, never dropped
+            INSERT INTO {cold} ({cols}) SELECT {cols} FROM moved
+            ON CONFLICT (id) DO UPDATE SET {updates}
+        )
+        SELECT count(*), max(ts), (array_agg(id ORDER BY ts DESC, id DESC))[1] FROM batch
+    """).format(
+        ts=sql.Identifier(ts_column),
+        hot=sql.Identifier("public", table),
+        cold=sql.Identifier(ARCHIVE_SCHEMA, table),
+        cols=column_list,
+        returning=qualified("t", columns),
+        extra=attached_filter(skip_attached),
+        updates=sql.SQL(", ").join(
+            sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(column)) for column in columns if column != "id"),
+    )
+
+
+def archive_table(conn, table: str, cutoff: datetime, batch_size: int, pause: float,
+                  max_batches: Optional[int], dry_run: bool) -> int:
+    ts_column = ARCHIVABLE_TABLES[table]
+    with conn.cursor() as cur:
+        if not table_exists(cur, "public", table):
+            print(f"⚠️  Skipping {table}: table not found")
+            conn.commit()
+            return 0
+        skip_attached = table == "messages" and table_exists(cur, "public", "attachments")
+        if dry_run:
+            cur.execute(sql.SQL("SELECT count(*) FROM {} t WHERE t.{} < %s {}").format(
+                sql.Identifier("public", table), sql.Identifier(ts_column), attached_filter(skip_attached)),
+                (cutoff,))
+            count = cur.fetchone()[0]
+            conn.commit()
+            print(f"🔎 {table}: {count} rows older than {cutoff:%Y-%m-%d} would be archived")
+            return count
+    conn.commit()
+
+    try:
+        columns = ensure_archive_table(conn, table, ts_column)
+    except psycopg2.errors.LockNotAvailable:
+        conn.rollback()
+        print(f"⚠️  Skipping {table}: lock timeout while preparing its archive table")
+        return 0
+    statement = move_batch_sql(table, ts_column, columns, skip_attached)
+
+    moved = 0
+    batches = 0
+    lock_retries = 0
+    last_ts, last_id = None, None
+    started = time.perf_counter()
+    while max_batches is None or batches < max_batches:
+        try:
+            with conn.cursor() as cur:
+                cur.execute(statement, {
+                    "cutoff": cutoff, "last_ts": last_ts, "last_id": last_id, "limit": batch_size,
+                })
+                count, batch_last_ts, batch_last_id = cur.fetchone()
+            conn.commit()
+        except psycopg2.errors.LockNotAvailable:
+            conn.rollback()
+            lock_retries += 1
+            if lock_retries > MAX_LOCK_RETRIES:
+                print(f"⚠️  Skipping the rest of {table}: {MAX_LOCK_RETRIES} lock timeouts in a row "
+                      f"({moved} rows archived so far)")
+                return moved
+            print(f"   ... {table}: lock timeout, backing off ({lock_retries}/{MAX_LOCK_RETRIES})")
+            time.sleep(max(pause, 1.0))
+            continue
+        lock_retries = 0
+
+        if not count:
+            break
+        moved += count
+        batches += 1
+        last_ts, last_id = batch_last_ts, str(batch_last_id)
+        print(f"   ... {table}: {moved} rows archived")
+        if pause:
+            time.sleep(pause)
+
+    print(f"✅ {table}: archived {moved} rows in {batches} batches ({time.perf_counter() - started:.1f}s)")
+    return moved
+
+
+def vacuum_tables(conn, tables: List[str]):
+    """Reclaim space in the hot tables so their indexes shrink back to the live set."""
+    previous = conn.autocommit
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for table in tables:
+                print(f"🧹 VACUUM (ANALYZE) {table}...")
+                cur.execute(sql.SQL("VACUUM (ANALYZE) {}").format(sql.Identifier("public", table)))
+    finally:
+        conn.autocommit = previous
+
+
+def export_table(conn, table: str, cutoff: datetime, output: str, purge: bool, batch_size: int) -> int:
+    """
+    Write archived rows older than the cutoff to <output>/<table>-<cutoff>.jsonl.gz,
+    streaming through a server-side cursor. With purge, remove them from the
+    archive table once the file is safely written.
+    """
+    ts_column = ARCHIVABLE_TABLES[table]
+    with conn.cursor() as cur:
+        if not table_exists(cur, ARCHIVE_SCHEMA, table):
+            conn.commit()
+            print(f"⚠️  Skipping {table}: nothing archived yet")
+            return 0
+    conn.commit()
+
+    os.makedirs(output, exist_ok=True)
+    path = os.path.join(output, f"{table}-before-{cutoff:%Y%m%d}.jsonl.gz")
+    tmp_path = path + ".tmp"
+    written = 0
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        with conn.cursor(name=f"export_{table}") as cur:
+            cur.itersize = batch_size
+            cur.execute(sql.SQL("SELECT row_to_json(t)::text FROM {} t WHERE {} < %s ORDER BY {}, id").format(
+                sql.Identifier(ARCHIVE_SCHEMA, table), sql.Identifier(ts_column), sql.Identifier(ts_column)),
+                (cutoff,))
+            for (row,) in cur:
+                f.write(row + "\n")
+                written += 1
+    conn.commit()
+    os.replace(tmp_path, path)
+    print(f"📦 {table}: exported {written} rows to {path}")
+
+    if purge and written:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("DELETE FROM {} WHERE {} < %s").format(
+                sql.Identifier(ARCHIVE_SCHEMA, table), sql.Identifier(ts_column)), (cutoff,))
+            print(f"🗑️  {table}: purged {cur.rowcount} exported rows from the archive table")
+        conn.commit()
+    return written
+
+
+def restore_rows(conn, table: str, after: datetime, before: datetime, batch_size: int) -> int:
+    """Move archived rows in [after, before) back into the hot table."""
+    ts_column = ARCHIVABLE_TABLES[table]
+    with conn.cursor() as cur:
+        columns = list(table_columns(cur, "public", table))
+    conn.commit()
+    column_list = sql.SQL(", ").join(sql.Identifier(column) for column in columns)
+    statement = sql.SQL("""
+        WITH batch AS (
+            SELECT id FROM {cold} WHERE {ts} >= %s AND {ts} < %s ORDER BY {ts}, id LIMIT %s
+        ),
+        moved AS (
+            DELETE FROM {cold} t USING batch WHERE t.id = batch.id RETURNING {returning}
+        ),
+        stored AS (
+            -- No ON CONFLICT: a row that exists in the hot table again must fail the
+            -- batch (and roll back its DELETE) rather than vanish from both tables
+            INSERT INTO {hot} ({cols}) SELECT {cols} FROM moved
+        )
+        SELECT count(*) FROM batch
+    """).format(
+        cold=sql.Identifier(ARCHIVE_SCHEMA, table),
+        hot=sql.Identifier("public", table),
+        ts=sql.Identifier(ts_column),
+        cols=column_list,
+        returning=qualified("t", columns),
+    )
+
+    restored = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(statement, (after, before, batch_size))
+            count = cur.fetchone()[0]
+        conn.commit()
+        if not count:
+            break
+        restored += count
+    print(f"♻️  {table}: restored {restored} rows")
+    return restored
+
+
+def print_status(conn):
+    print("📊 Hot vs archived rows:")
+    with conn.cursor() as cur:
+        for table in ARCHIVABLE_TABLES:
+            sizes = []
+            for schema in ("public", ARCHIVE_SCHEMA):
+                if not table_exists(cur, schema, table):
+                    sizes.append("-")
+                    continue
+                cur.execute("""
+                    SELECT c.reltuples::bigint, pg_size_pretty(pg_total_relation_size(c.oid))
+                    FROM pg_class c WHERE c.oid = to_regclass(%s)
+                """, (f'{schema}."{table}"',))
+                rows, size = cur.fetchone()
+                sizes.append(f"~{max(rows, 0)} rows, {size}")
+            print(f"   - {table}: hot {sizes[0]} | archive {sizes[1]}")
+    conn.commit()
+
+
+def parse_date(value: str) -> datetime:
+    return datetime.combine(date.fromisoformat(value), datetime.min.time())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Archive, export and restore cold rows")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(p):
+        p.add_argument("--tables", nargs="+", choices=list(ARCHIVABLE_TABLES), default=list(ARCHIVABLE_TABLES))
+        p.add_argument("--batch-size", type=int, default=1000)
+
+    archive = sub.add_parser("archive", help="Move rows older than the cutoff into the archive schema")
+    add_common(archive)
+    cutoff = archive.add_mutually_exclusive_group(required=True)
+    cutoff.add_argument("--before", type=parse_date, help="Cutoff date (YYYY-MM-DD)")
+    cutoff.add_argument("--older-than-days", type=int, help="Cutoff relative to today")
+    archive.add_argument("--pause", type=float, default=0.1, help="Seconds to sleep between batches")
+    archive.add_argument("--max-batches", type=int, help="Stop after this many batches per table")
+    archive.add_argument("--lock-timeout", default="2s", help="Per-statement lock_timeout")
+    archive.add_argument("--vacuum", action="store_true", help="VACUUM (ANALYZE) hot tables afterwards")
+    archive.add_argument("--dry-run", action="store_true", help="Only count what would move")
+
+    export = sub.add_parser("export", help="Write archived rows to compressed JSON Lines files")
+    add_common(export)
+    export.add_argument("--before", type=parse_date, required=True)
+    export.add_argument("--output", default="archive_exports")
+    export.add_argument("--purge", action="store_true", help="Delete exported rows from the archive tables")
+
+    restore = sub.add_parser("restore", help="Move archived rows back into the hot table")
+    restore.add_argument("--table", choices=list(ARCHIVABLE_TABLES), required=True)
+    restore.add_argument("--after", type=parse_date, required=True)
+    restore.add_argument("--before", type=parse_date, required=True)
+    restore.add_argument("--batch-size", type=int, default=1000)
+
+    sub.add_parser("status", help="Show hot and archived table sizes")
+
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        if args.command == "status":
+            print_status(conn)
+        elif args.command == "archive":
+            cutoff_at = args.before or datetime.combine(
+                date.today() - timedelta(days=args.older_than_days), datetime.min.time())
+            with conn.cursor() as cur:
+                cur.execute("SET lock_timeout = %s", (args.lock_timeout,))
+            conn.commit()
+            print(f"🗄️  Archiving rows older than {cutoff_at:%Y-%m-%d}...")
+            moved = {table: archive_table(conn, table, cutoff_at, args.batch_size, args.pause,
+                                          args.max_batches, args.dry_run)
+                     for table in args.tables}
+            if args.vacuum and not args.dry_run:
+                # Only tables that actually lost rows (missing tables report 0)
+                vacuum_tables(conn, [table for table in args.tables if moved[table]])
+        elif args.command == "export":
+            for table in args.tables:
+                export_table(conn, table, args.before, args.output, args.purge, args.batch_size)
+        elif args.command == "restore":
+            restore_rows(conn, args.table, args.after, args.before, args.batch_size)
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Archiving interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Auth State Maintenance Job for School Management System
+
+Clears time-bound authentication state on the users table so request
+handling never has to:
+
+- expired account locks ("lockUntil" in the past) together with their
+  "loginAttempts" counter
+- stale failed-attempt counters that never reached a lock
+- expired password-reset and email-verification tokens, when those columns
+  exist in this database
+
+Every category is cleared in chunked, set-based UPDATEs (claimed with
+FOR UPDATE SKIP LOCKED so a user logging in at that moment is simply left
+for the next run). Partial indexes keep each run proportional to the rows
+that actually qualify rather than to the size of users.
+
+Meant to run from cron or a scheduler, e.g. every 10 minutes:
+    */10 * * * * cd /srv/app && python auth_maintenance.py run --json >> logs/auth_maintenance.log
+
+Usage:
+    python auth_maintenance.py run [--chunk-size 1000] [--attempt-window-minutes 120] [--dry-run] [--json]
+    python auth_maintenance.py install-indexes
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import psycopg2
+
+from create_user import get_db_config
+
+# Each partial index only contains rows that carry auth state at all.
+INDEXES = [
+    ("users_lock_until_partial", '("lockUntil") WHERE "lockUntil" IS NOT NULL', None),
+    ("users_login_attempts_partial", '("updatedAt") WHERE "loginAttempts" > 0', None),
+    ("users_password_reset_partial", '("passwordResetExpires") WHERE "passwordResetToken" IS NOT NULL',
+     "passwordResetToken"),
+    ("users_email_verification_partial",
+     '("emailVerificationExpires") WHERE "emailVerificationToken" IS NOT NULL', "emailVerificationToken"),
+]
+
+# name -> (required column or None, UPDATE body applied to the claimed ids, qualifying predicate)
+TASKS = {
+    "expired_locks": (
+        None,
+        '"lockUntil" = NULL, "loginAttempts" = 0',
+        '"lockUntil" IS NOT NULL AND "lockUntil" < now()',
+    ),
+    "stale_attempts": (
+        None,
+        '"loginAttempts" = 0',
+        '"loginAttempts" > 0 AND "lockUntil" IS NULL '
+        'AND "updatedAt" < now() - make_interval(mins => %(attempt_window)s)',
+    ),
+    "expired_reset_tokens": (
+        "passwordResetToken",
+        '"passwordResetToken" = NULL, "passwordResetExpires" = NULL',
+        '"passwordResetToken" IS NOT NULL AND "passwordResetExpires" < now()',
+    ),
+    "expired_verification_tokens": (
+        "emailVerificationToken",
+        '"emailVerificationToken" = NULL, "emailVerificationExpires" = NULL',
+        '"emailVerificationToken" IS NOT NULL AND "emailVerificationExpires" < now()',
+    ),
+}
+
+
+def connect():
+    cfg = get_db_config()
+    return psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+
+
+def user_columns(conn) -> set:
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = 'users'
+        """)
+        columns = {row[0] for row in cur.fetchall()}
+    conn.commit()
+    return columns
+
+
+def install_indexes(conn, columns: set, quiet: bool = False):
+    """Create the partial indexes without blocking writes (CONCURRENTLY needs autocommit)."""
+    previous = conn.autocommit
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for name, definition, required in INDEXES:
+                if required and required not in columns:
+                    continue
+                cur.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON users {definition}")
+                if not quiet:
+                    print(f"✅ Index ready: {name}")
+    finally:
+        conn.autocommit = previous
+
+
+def run_task(conn, predicate: str, assignments: str, chunk_size: int, attempt_window: int,
+             dry_run: bool) -> int:
+    params = {"attempt_window": attempt_window, "limit": chunk_size}
+    if dry_run:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT count(*) FROM users WHERE {predicate}", params)
+            count = cur.fetchone()[0]
+        conn.commit()
+        return count
+
+    statement = f"""
+        UPDATE users u SET {assignments}, "updatedAt" = now()
+        FROM (
+            SELECT id FROM users
+            WHERE {predicate}
+            LIMIT %(limit)s
+            FOR UPDATE SKIP LOCKED
+        ) due
+        WHERE u.id = due.id
+    """
+    total = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(statement, params)
+            changed = cur.rowcount
+        conn.commit()
+        total += changed
+        if changed < chunk_size:
+            return total
+
+
+def run(conn, chunk_size: int, attempt_window: int, dry_run: bool) -> Dict[str, object]:
+    columns = user_columns(conn)
+    if not dry_run:
+        install_indexes(conn, columns, quiet=True)
+
+    report: Dict[str, object] = {"startedAt": datetime.now().isoformat(timespec="seconds"), "dryRun": dry_run}
+    started = time.perf_counter()
+    for name, (required, assignments, predicate) in TASKS.items():
+        if required and required not in columns:
+            report[name] = None
+            continue
+        report[name] = run_task(conn, predicate, assignments, chunk_size, attempt_window, dry_run)
+    report["durationMs"] = round((time.perf_counter() - started) * 1000, 1)
+    return report
+
+
+def print_report(report: Dict[str, object]):
+    verb = "Would clear" if report["dryRun"] else "Cleared"
+    print(f"🔐 Auth maintenance ({report['durationMs']} ms)")
+    for name in TASKS:
+        value = report[name]
+        label = name.replace("_", " ")
+        if value is None:
+            print(f"   - {label}: skipped (columns not present)")
+        else:
+            print(f"   - {verb} {value} {label}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Clear expired locks, attempt counters and auth tokens")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Run one maintenance pass")
+    run_parser.add_argument("--chunk-size", type=int, default=1000, help="Rows per UPDATE")
+    run_parser.add_argument("--attempt-window-minutes", type=int, default=120,
+                            help="Reset unlocked attempt counters untouched for this long")
+    run_parser.add_argument("--dry-run", action="store_true", help="Only count qualifying rows")
+    run_parser.add_argument("--json", action="store_true", help="Print the report as one JSON line")
+    sub.add_parser("install-indexes", help="Create the supporting partial indexes")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        if args.command == "install-indexes":
+            install_indexes(conn, user_columns(conn))
+            return 0
+        report = run(conn, args.chunk_size, args.attempt_window_minutes, args.dry_run)
+    finally:
+        conn.close()
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
@@ -2,104 +2,238 @@
 """
 Backend Updater Script for School Management System
 This script helps update the backend response structure and manage users.
+
+Without arguments it starts the interactive menu. For unattended changes,
+describe the operations in a plan file (JSON, JSONL or YAML) and run it:
+
+Usage:
+    python backend_updater.py
+    python backend_updater.py plan users.jsonl [--concurrency 8] [--dry-run] [--resume] [--results FILE]
+
+A plan is a list of operations (or {"operations": [...]}); JSONL holds one
+operation per line:
+
+    {"id": "t1", "op": "test_connection"}
+    {"id": "u1", "op": "create_user", "data": {"email": "...", "password": "...", "role": "teacher", ...}}
+    {"id": "u2", "op": "update_user", "email": "old@school.com", "data": {"role": "admin"}}
+    {"id": "u3", "op": "delete_user", "userId": "..."}
+
+Each finished operation is appended to the results file as one JSON line;
+--resume skips operations already recorded there as "ok".
 """
 
+import argparse
+import base64
+import getpass
 import json
 import os
 import sys
+import tempfile
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Optional, Any
-import bcrypt
 import uuid
 from datetime import datetime
 
+import codemod
+
+DEFAULT_TOKEN_CACHE = os.path.join(os.path.expanduser("~"), ".school_backend_tokens.json")
+
 class BackendUpdater:
-    def __init__(self, base_url: str = "http://localhost:5000"):
+    # Refresh once less than this many seconds of a token's lifetime remain
+    REFRESH_MARGIN = 15 * 60
+    # Treat tokens this close to expiry as already expired
+    EXPIRY_SKEW = 30
+    # Plan workers each have their own updater but share the cache file
+    _token_cache_lock = threading.Lock()
+
+    def __init__(self, base_url: str = "http://localhost:5000",
+                 email: Optional[str] = None, password: Optional[str] = None,
+                 token_cache: Optional[str] = None):
         self.base_url = base_url
         self.api_url = f"{base_url}/api"
         self.session = requests.Session()
+        self.email = email or os.getenv("BACKEND_ADMIN_EMAIL")
+        self.password = password or os.getenv("BACKEND_ADMIN_PASSWORD")
+        self.token_cache = token_cache or os.getenv("BACKEND_TOKEN_CACHE", DEFAULT_TOKEN_CACHE)
+        self.token: Optional[str] = None
+        self.token_expires_at = 0.0
+        self.login_count = 0
+        self.refresh_count = 0
+    
+    @staticmethod
+    def _token_expiry(token: str) -> float:
+        """
+        Read the exp claim from a JWT without verifying it (the server does that).
+        Returns 0 when the token has no readable expiry.
+        """
+        try:
+            payload = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            return float(json.loads(base64.urlsafe_b64decode(payload)).get("exp", 0))
+        except (IndexError, ValueError, TypeError):
+            return 0.0
+    
+    @staticmethod
+    def _extract_token(body: Dict[str, Any]) -> Optional[str]:
+        """Find the token in both the nested ({ data: { token } }) and flat ({ token }) responses."""
+        return (body.get("data") or {}).get("token") or body.get("token")
+    
+    def _cache_key(self) -> str:
+        return f"{self.base_url}|{self.email}"
+    
+    def _load_cached_token(self) -> bool:
+        """Use a token from the on-disk cache if it is still comfortably valid."""
+        try:
+            with open(self.token_cache, 'r', encoding='utf-8') as f:
+                entry = json.load(f).get(self._cache_key())
+        except (OSError, ValueError):
+            return False
+        if not entry or entry.get("expiresAt", 0) - self.EXPIRY_SKEW <= time.time():
+            return False
+        self._set_token(entry["token"], persist=False)
+        return True
+    
+    def _set_token(self, token: str, persist: bool = True):
+        self.token = token
+        self.token_expires_at = self._token_expiry(token) or time.time() + 3600
+        self.session.headers["Authorization"] = f"Bearer {token}"
+        if not persist:
+            return
+        with self._token_cache_lock:
+            try:
+                with open(self.token_cache, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+            except (OSError, ValueError):
+                cache = {}
+            cache[self._cache_key()] = {"token": token, "expiresAt": self.token_expires_at}
+            # Write atomically and keep the file private; it holds bearer tokens.
+            # mkstemp gives every writer its own 0600 temp file.
+            cache_dir = os.path.dirname(os.path.abspath(self.token_cache))
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=f"{os.path.basename(self.token_cache)}.",
+                                            suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(cache, f)
+                os.replace(tmp_path, self.token_cache)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+    
+    def _clear_token(self):
+        self.token = None
+        self.token_expires_at = 0.0
+        self.session.headers.pop("Authorization", None)
+    
+    def login(self) -> bool:
+        """
+        Log in with the configured credentials and cache the token.
+        """
+        if not self.email or not self.password:
+            print("❌ No credentials configured (set BACKEND_ADMIN_EMAIL / BACKEND_ADMIN_PASSWORD)")
+            return False
+        try:
+            response = requests.post(
+                f"{self.api_url}/auth/login",
+                json={"email": self.email, "password": self.password}
+            )
+            token = self._extract_token(response.json()) if response.status_code == 200 else None
+            if not token:
+                print(f"❌ Login failed: {response.text}")
+                return False
+            self.login_count += 1
+            self._set_token(token)
+            print(f"🔑 Logged in as {self.email}")
+            return True
+        except Exception as e:
+            print(f"❌ Login error: {e}")
+            return False
+    
+    def refresh_token(self) -> bool:
+        """
+        Exchange the current token for a fresh one via /api/auth/refresh-token.
+        """
+        if not self.token:
+            return False
+        try:
+            response = self.session.post(f"{self.api_url}/auth/refresh-token")
+            token = self._extract_token(response.json()) if response.status_code == 200 else None
+            if not token:
+                return False
+            self.refresh_count += 1
+            self._set_token(token)
+            return True
+        except Exception:
+            return False
+    
+    def ensure_authenticated(self) -> bool:
+        """
+        Make sure a valid token is attached: reuse the in-memory or cached
+        token, refresh it when it is close to expiry, and only log in when
+        neither works.
+        """
+        now = time.time()
+        if not self.token and self._load_cached_token():
+            now = time.time()
+        if self.token and self.token_expires_at - self.EXPIRY_SKEW > now:
+            if self.token_expires_at - now > self.REFRESH_MARGIN or self.refresh_token():
+                return True
+            if self.token_expires_at - self.EXPIRY_SKEW > time.time():
+                return True
+        self._clear_token()
+        return self.login()
+    
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Authenticated API call. A 401 (revoked or expired token) triggers one
+        fresh login and a single retry.
+        """
+        if not self.ensure_authenticated():
+            raise RuntimeError("not authenticated")
+        url = f"{self.api_url}{path}"
+        response = self.session.request(method, url, **kwargs)
+        if response.status_code == 401:
+            self._clear_token()
+            if self.login():
+                response = self.session.request(method, url, **kwargs)
+        return response
         
-    def update_auth_response_structure(self) -> bool:
+    def update_auth_response_structure(self, dry_run: bool = False) -> bool:
         """
-        Update the backend auth routes to return flatter response structure.
-        This creates a backup and then modifies the files.
+        Flatten { success: true, data: { ... } } responses across
+        server/routes with the flatten-responses codemod. With dry_run the
+        diffs are printed and nothing is written.
         """
         print("🔄 Updating backend response structure...")
         
-        # Files to update
-        files_to_update = [
-            "server/routes/auth.js",
-            "server/routes/users.js"
-        ]
+        routes_dir = os.path.join("server", "routes")
+        if not os.path.isdir(routes_dir):
+            print(f"⚠️  Directory not found: {routes_dir}")
+            return False
         
-        for file_path in files_to_update:
-            if not os.path.exists(file_path):
-                print(f"⚠️  File not found: {file_path}")
-                continue
-                
-            # Create backup
-            backup_path = f"{file_path}.backup"
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Create backup
-                with open(backup_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                print(f"✅ Backup created: {backup_path}")
-                
-                # Update content for flatter structure
-                updated_content = self._update_response_structure(content)
-                
-                # Write updated content
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(updated_content)
-                    
-                print(f"✅ Updated: {file_path}")
-                
-            except Exception as e:
-                print(f"❌ Error updating {file_path}: {e}")
-                return False
+        try:
+            summary = codemod.run_codemod("flatten-responses", routes_dir, dry_run=dry_run)
+        except OSError as e:
+            print(f"❌ Error updating {routes_dir}: {e}")
+            return False
         
-        return True
+        return summary["errors"] == 0
     
     def _update_response_structure(self, content: str) -> str:
         """
         Update the response structure to be flatter.
         Changes from { success: true, data: { user, token } } to { user, token }
         """
-        # Update login response
-        content = content.replace(
-            'res.json({\n      success: true,\n      message: \'Login successful\',\n      data: {\n        user: {\n          id: user.id,\n          firstName: user.firstName,\n          lastName: user.lastName,\n          email: user.email,\n          role: user.role,\n          isEmailVerified: user.isEmailVerified,\n          profilePicture: user.profilePicture\n        },\n        token\n      }\n    });',
-            'res.json({\n      user: {\n        id: user.id,\n        firstName: user.firstName,\n        lastName: user.lastName,\n        email: user.email,\n        role: user.role,\n        isEmailVerified: user.isEmailVerified,\n        profilePicture: user.profilePicture\n      },\n      token\n    });'
-        )
-        
-        # Update /me endpoint response
-        content = content.replace(
-            'res.json({\n      success: true,\n      data: {\n        user: {\n          id: user.id,\n          firstName: user.firstName,\n          lastName: user.lastName,\n          email: user.email,\n          role: user.role,\n          isEmailVerified: user.isEmailVerified,\n          profilePicture: user.profilePicture\n        }\n      }\n    });',
-            'res.json({\n      user: {\n        id: user.id,\n        firstName: user.firstName,\n        lastName: user.lastName,\n        email: user.email,\n        role: user.role,\n        isEmailVerified: user.isEmailVerified,\n        profilePicture: user.profilePicture\n      }\n    });'
-        )
-        
-        # Update register response
-        content = content.replace(
-            'res.json({\n      success: true,\n      message: \'User registered successfully\',\n      data: {\n        user: {\n          id: user.id,\n          firstName: user.firstName,\n          lastName: user.lastName,\n          email: user.email,\n          role: user.role,\n          isEmailVerified: user.isEmailVerified\n        },\n        token\n      }\n    });',
-            'res.json({\n      user: {\n        id: user.id,\n        firstName: user.firstName,\n        lastName: user.lastName,\n        email: user.email,\n        role: user.role,\n        isEmailVerified: user.isEmailVerified\n      },\n      token\n    });'
-        )
-        
-        return content
+        return codemod.rewrite_source("flatten-responses", content)[0]
     
     def create_user(self, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
-        Create a new user directly in the database.
+        Create a new user through /auth/register.
+        The password is sent as given; the User model's beforeCreate hook hashes it.
         """
         try:
-            # Hash password if provided
-            if 'password' in user_data:
-                password = user_data['password'].encode('utf-8')
-                salt = bcrypt.gensalt()
-                hashed_password = bcrypt.hashpw(password, salt).decode('utf-8')
-                user_data['password'] = hashed_password
-            
             # Generate UUID if not provided
             if 'id' not in user_data:
                 user_data['id'] = str(uuid.uuid4())
@@ -193,7 +327,7 @@ class BackendUpdater:
         List all users in the system.
         """
         try:
-            response = self.session.get(f"{self.api_url}/users")
+            response = self._request("GET", "/users")
             if response.status_code == 200:
                 return response.json().get('data', [])
             else:
@@ -203,12 +337,26 @@ class BackendUpdater:
             print(f"❌ Error fetching users: {e}")
             return []
     
+    def find_user_id(self, email: str) -> Optional[str]:
+        """
+        Look up a user's ID by exact email address.
+        """
+        response = self._request("GET", "/users", params={"search": email, "limit": 50})
+        if response.status_code != 200:
+            return None
+        body = response.json()
+        users = body.get('users') or body.get('data') or []
+        for user in users:
+            if user.get('email', '').lower() == email.lower():
+                return user.get('id')
+        return None
+    
     def delete_user(self, user_id: str) -> bool:
         """
         Delete a user by ID.
         """
         try:
-            response = self.session.delete(f"{self.api_url}/users/{user_id}")
+            response = self._request("DELETE", f"/users/{user_id}")
             if response.status_code == 200:
                 print(f"✅ User deleted successfully: {user_id}")
                 return True
@@ -224,7 +372,7 @@ class BackendUpdater:
         Update a user by ID.
         """
         try:
-            response = self.session.put(f"{self.api_url}/users/{user_id}", json=user_data)
+            response = self._request("PUT", f"/users/{user_id}", json=user_data)
             if response.status_code == 200:
                 print(f"✅ User updated successfully: {user_id}")
                 return True
@@ -240,7 +388,7 @@ class BackendUpdater:
         Test connection to the backend.
         """
         try:
-            response = self.session.get(f"{self.base_url}/health")
+            response = self.session.get(f"{self.api_url}/health")
             if response.status_code == 200:
                 print("✅ Backend connection successful")
                 return True
@@ -254,12 +402,182 @@ class BackendUpdater:
             print(f"❌ Connection error: {e}")
             return False
 
-def main():
+PLAN_OPERATIONS = ("create_user", "update_user", "delete_user", "test_connection")
+
+def load_plan(path: str) -> List[Dict[str, Any]]:
+    """
+    Read a plan file and give every operation a stable id (its explicit "id"
+    or its position), which is what --resume matches on.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise RuntimeError("YAML plans need PyYAML: pip install pyyaml")
+        plan = yaml.safe_load(text)
+    elif path.endswith(".jsonl"):
+        plan = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        plan = json.loads(text)
+    operations = plan.get("operations", []) if isinstance(plan, dict) else plan
+    
+    errors = []
+    for index, operation in enumerate(operations):
+        operation.setdefault("id", str(index + 1))
+        op = operation.get("op")
+        if op not in PLAN_OPERATIONS:
+            errors.append(f"{operation['id']}: unknown op {op!r}")
+        elif op == "create_user" and not operation.get("data", {}).get("email"):
+            errors.append(f"{operation['id']}: create_user needs data.email")
+        elif op in ("update_user", "delete_user") and not (operation.get("userId") or operation.get("email")):
+            errors.append(f"{operation['id']}: {op} needs userId or email")
+        elif op == "update_user" and not operation.get("data"):
+            errors.append(f"{operation['id']}: update_user needs data")
+    ids = [operation["id"] for operation in operations]
+    if len(set(ids)) != len(ids):
+        errors.append("operation ids must be unique")
+    if errors:
+        raise ValueError("invalid plan:\n  " + "\n  ".join(errors))
+    return operations
+
+def completed_operations(results_path: str) -> set:
+    """Ids recorded as successful in an earlier run's results file."""
+    done = set()
+    if not os.path.exists(results_path):
+        return done
+    with open(results_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by an interrupted run
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+class PlanRunner:
+    """
+    Runs plan operations on a thread pool. Each worker thread has its own
+    BackendUpdater (requests sessions are not shared across threads); they all
+    reuse the token the main thread obtained through the shared token cache.
+    """
+    
+    def __init__(self, base_url: str, concurrency: int, results_path: str):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.results_path = results_path
+        self.local = threading.local()
+        self.write_lock = threading.Lock()
+    
+    def updater(self) -> BackendUpdater:
+        if not hasattr(self.local, "updater"):
+            self.local.updater = BackendUpdater(self.base_url)
+        return self.local.updater
+    
+    def execute(self, operation: Dict[str, Any]) -> Dict[str, Any]:
+        updater = self.updater()
+        op = operation["op"]
+        started = time.perf_counter()
+        record: Dict[str, Any] = {"id": operation["id"], "op": op}
+        try:
+            if op == "test_connection":
+                ok = updater.test_connection()
+            elif op == "create_user":
+                # create_user fills in defaults in place; keep the plan untouched
+                ok = updater.create_user(dict(operation["data"])) is not None
+            else:
+                user_id = operation.get("userId") or updater.find_user_id(operation["email"])
+                record["userId"] = user_id
+                if not user_id:
+                    raise LookupError(f"no user with email {operation['email']}")
+                if op == "update_user":
+                    ok = updater.update_user(user_id, operation["data"])
+                else:
+                    ok = updater.delete_user(user_id)
+            record["status"] = "ok" if ok else "failed"
+        except Exception as e:
+            record["status"] = "failed"
+            record["error"] = f"{e.__class__.__name__}: {e}"
+        record["durationMs"] = round((time.perf_counter() - started) * 1000, 1)
+        record["finishedAt"] = datetime.now().isoformat(timespec="seconds")
+        with self.write_lock:
+            with open(self.results_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+        return record
+    
+    def run(self, operations: List[Dict[str, Any]]) -> Dict[str, int]:
+        counts = {"ok": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = [pool.submit(self.execute, operation) for operation in operations]
+            for future in as_completed(futures):
+                counts[future.result()["status"]] += 1
+        return counts
+
+def run_plan(args) -> int:
+    """Entry point for `backend_updater.py plan`."""
+    try:
+        operations = load_plan(args.plan)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return 1
+    results_path = args.results or f"{os.path.splitext(args.plan)[0]}.results.jsonl"
+    done = completed_operations(results_path) if args.resume else set()
+    pending = [operation for operation in operations if operation["id"] not in done]
+    print(f"📋 {len(operations)} operations in plan, {len(done)} already done, {len(pending)} to run")
+    
+    if args.dry_run:
+        for operation in pending:
+            target = operation.get("userId") or operation.get("email") or operation.get("data", {}).get("email", "")
+            print(f"  - [{operation['id']}] {operation['op']} {target}".rstrip())
+        print("🔎 Dry run: nothing was sent to the backend")
+        return 0
+    if not pending:
+        return 0
+    if not args.resume and os.path.exists(results_path):
+        os.remove(results_path)
+    
+    # Authenticate once up front so the workers start from the cached token.
+    needs_auth = any(operation["op"] in ("update_user", "delete_user") for operation in pending)
+    if needs_auth and not BackendUpdater(args.base_url).ensure_authenticated():
+        return 1
+    
+    started = time.perf_counter()
+    counts = PlanRunner(args.base_url, args.concurrency, results_path).run(pending)
+    elapsed = time.perf_counter() - started
+    print(f"\n📊 {counts['ok']} ok, {counts['failed']} failed in {elapsed:.1f}s "
+          f"({len(pending) / elapsed if elapsed else 0:.1f} ops/s, concurrency {args.concurrency})")
+    print(f"📝 Results written to {results_path}")
+    return 0 if counts["failed"] == 0 else 2
+
+def prompt_credentials(updater: BackendUpdater):
+    """Ask for admin credentials unless they came from the environment or a cached token."""
+    if not updater.email:
+        updater.email = input("Admin email: ").strip()
+    if not updater.password and not (updater.token or updater._load_cached_token()):
+        updater.password = getpass.getpass("Admin password: ")
+
+def main(argv: Optional[List[str]] = None) -> int:
     """Main function to run the backend updater."""
+    parser = argparse.ArgumentParser(description="Backend updater and user management")
+    parser.add_argument("--base-url", default=os.getenv("BACKEND_URL", "http://localhost:5000"))
+    sub = parser.add_subparsers(dest="command")
+    plan_parser = sub.add_parser("plan", help="Run a plan file of user operations unattended")
+    plan_parser.add_argument("plan", help="Plan file (.json, .jsonl, .yaml)")
+    plan_parser.add_argument("--concurrency", type=int, default=8)
+    plan_parser.add_argument("--dry-run", action="store_true", help="Validate and list operations only")
+    plan_parser.add_argument("--resume", action="store_true",
+                             help="Skip operations already recorded as ok in the results file")
+    plan_parser.add_argument("--results", help="Results JSONL (default: <plan>.results.jsonl)")
+    args = parser.parse_args(argv)
+    if args.command == "plan":
+        return run_plan(args)
+    
     print("🚀 School Management System - Backend Updater")
     print("=" * 50)
     
-    updater = BackendUpdater()
+    updater = BackendUpdater(args.base_url)
     
     while True:
         print("\n📋 Available Actions:")
@@ -278,6 +596,12 @@ def main():
             updater.test_connection()
             
         elif choice == "2":
+            if not updater.update_auth_response_structure(dry_run=True):
+                print("❌ Failed to update backend response structure.")
+                continue
+            if input("\nApply these changes? (yes/no): ").strip().lower() != "yes":
+                print("❌ Update cancelled.")
+                continue
             if updater.update_auth_response_structure():
                 print("✅ Backend response structure updated successfully!")
                 print("🔄 Please restart your backend server for changes to take effect.")
@@ -291,6 +615,7 @@ def main():
                 print("❌ Failed to create some demo users.")
                 
         elif choice == "4":
+            prompt_credentials(updater)
             users = updater.list_users()
             if users:
                 print(f"\n👥 Found {len(users)} users:")
@@ -315,6 +640,7 @@ def main():
                 print("❌ Failed to create custom user.")
                 
         elif choice == "6":
+            prompt_credentials(updater)
             user_id = input("Enter user ID to update: ").strip()
             print("Enter new values (press Enter to skip):")
             user_data = {}
@@ -335,6 +661,7 @@ def main():
                 print("⚠️  No changes to update.")
                 
         elif choice == "7":
+            prompt_credentials(updater)
             user_id = input("Enter user ID to delete: ").strip()
             confirm = input("Are you sure? (yes/no): ").strip().lower()
             if confirm == 'yes':
@@ -347,14 +674,14 @@ def main():
                 
         elif choice == "8":
             print("👋 Goodbye!")
-            break
+            return 0
             
         else:
             print("❌ Invalid choice. Please try again.")
 
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
     except KeyboardInterrupt:
         print("\n\n👋 Script interrupted by user. Goodbye!")
     except Exception as e:
@@ -54,6 +54,7 @@ const API_BASE = process.env.REACT_APP_API_URL ? `${process.env.REACT_APP_API_UR
 const AdminTestView = () => {
   const { user, token } = useAuth();
   const [tests, setTests] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
   const [tab, setTab] = useState(0);
   const [selectedTest, setSelectedTest] = useState(null);
@@ -68,17 +69,19 @@ const AdminTestView = () => {
     loadTests();
   }, []);
 
-  const loadTests = async () => {
+  const loadTests = async (cursor = null) => {
     try {
       setLoading(true);
-      const response = await fetch(`${API_BASE}/tests`, {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`${API_BASE}/tests${query}`, {
         headers: { Authorization: `Bearer ${token}` }
       });
       
       if (!response.ok) throw new Error('Failed to load tests');
       
       const data = await response.json();
-      setTests(data.tests || []);
+      setTests(prev => (cursor ? [...prev, ...(data.tests || [])] : data.tests || []));
+      setNextCursor(data.nextCursor || null);
     } catch (err) {
       setError('Failed to load tests: ' + err.message);
     } finally {
@@ -86,6 +89,22 @@ const AdminTestView = () => {
     }
   };
 
+  // The list only carries counts; comments and submissions come from the detail endpoint
+  const loadTestDetails = async (testId) => {
+    try {
+      const response = await fetch(`${API_BASE}/tests/${testId}`, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+
+      if (!response.ok) throw new Error('Failed to load test details');
+
+      const data = await response.json();
+      setSelectedTest(data.test);
+    } catch (err) {
+      setError('Failed to load test details: ' + err.message);
+    }
+  };
+
   const handleTabChange = (event, newValue) => {
     setTab(newValue);
   };
@@ -151,6 +170,7 @@ const AdminTestView = () => {
       setOpenGradeDialog(false);
       setGradeData({ score: '', feedback: '' });
       loadTests();
+      loadTestDetails(selectedTest.id);
       setTimeout(() => setSuccess(''), 3000);
     } catch (err) {
       setError('Failed to grade submission: ' + err.message);
@@ -171,8 +191,8 @@ const AdminTestView = () => {
     const totalTests = tests.length;
     const activeTests = tests.filter(t => t.status === 'active').length;
     const completedTests = tests.filter(t => t.status === 'completed').length;
-    const totalSubmissions = tests.reduce((sum, test) => sum + (test.submissions?.length || 0), 0);
-    const totalComments = tests.reduce((sum, test) => sum + (test.comments?.length || 0), 0);
+    const totalSubmissions = tests.reduce((sum, test) => sum + (test.submissionCount || 0), 0);
+    const totalComments = tests.reduce((sum, test) => sum + (test.commentCount || 0), 0);
 
     return { totalTests, activeTests, completedTests, totalSubmissions, totalComments };
   };
@@ -282,7 +302,7 @@ const AdminTestView = () => {
       )}
 
       {/* Tests List */}
-      {loading ? (
+      {loading && tests.length === 0 ? (
         <Box sx={{ textAlign: 'center', py: 4 }}>
           <Typography>Loading tests...</Typography>
         </Box>
@@ -364,7 +384,7 @@ const AdminTestView = () => {
                   <Box sx={{ display: 'flex', justifyContent: 'space-between', mb: 2 }}>
                     <Box sx={{ textAlign: 'center' }}>
                       <Typography variant="h6" color="primary">
-                        {test.comments?.length || 0}
+                        {test.commentCount || 0}
                       </Typography>
                       <Typography variant="caption" color="text.secondary">
                         Comments
@@ -372,7 +392,7 @@ const AdminTestView = () => {
                     </Box>
                     <Box sx={{ textAlign: 'center' }}>
                       <Typography variant="h6" color="primary">
-                        {test.submissions?.length || 0}
+                        {test.submissionCount || 0}
                       </Typography>
                       <Typography variant="caption" color="text.secondary">
                         Submissions
@@ -390,6 +410,7 @@ const AdminTestView = () => {
                       onClick={() => {
                         setSelectedTest(test);
                         setOpenTestDialog(true);
+                        loadTestDetails(test.id);
                       }}
                     >
                       View Details
@@ -401,6 +422,13 @@ const AdminTestView = () => {
           ))}
         </Grid>
       )}
+      {nextCursor && (
+        <Box sx={{ textAlign: 'center', mt: 3 }}>
+          <Button variant="outlined" onClick={() => loadTests(nextCursor)} disabled={loading}>
+            Load more
+          </Button>
+        </Box>
+      )}
 
       {/* Test Details Dialog */}
       <Dialog 
@@ -45,6 +45,7 @@ const API_BASE = process.env.REACT_APP_API_URL ? `${process.env.REACT_APP_API_UR
 const StudentTestView = () => {
   const { user, token } = useAuth();
   const [tests, setTests] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
   const [tab, setTab] = useState(0);
   const [selectedTest, setSelectedTest] = useState(null);
@@ -58,14 +59,15 @@ const StudentTestView = () => {
     loadTests();
   }, []);
 
-  const loadTests = async () => {
+  const loadTests = async (cursor = null) => {
     try {
       setLoading(true);
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
       console.log('🔍 Loading tests for student...');
-      console.log('🔍 API URL:', `${API_BASE}/tests`);
+      console.log('🔍 API URL:', `${API_BASE}/tests${query}`);
       console.log('🔍 Token:', token ? 'Present' : 'Missing');
       
-      const response = await fetch(`${API_BASE}/tests`, {
+      const response = await fetch(`${API_BASE}/tests${query}`, {
         headers: { Authorization: `Bearer ${token}` }
       });
       
@@ -82,7 +84,8 @@ const StudentTestView = () => {
       console.log('🔍 Response data:', data);
       console.log('🔍 Tests array:', data.tests);
       
-      setTests(data.tests || []);
+      setTests(prev => (cursor ? [...prev, ...(data.tests || [])] : data.tests || []));
+      setNextCursor(data.nextCursor || null);
     } catch (err) {
       console.error('🔍 Error loading tests:', err);
       setError('Failed to load tests: ' + err.message);
@@ -91,6 +94,22 @@ const StudentTestView = () => {
     }
   };
 
+  // The list only carries counts; comments come from the detail endpoint
+  const loadTestDetails = async (testId) => {
+    try {
+      const response = await fetch(`${API_BASE}/tests/${testId}`, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+
+      if (!response.ok) throw new Error('Failed to load test details');
+
+      const data = await response.json();
+      setSelectedTest(data.test);
+    } catch (err) {
+      setError('Failed to load test details: ' + err.message);
+    }
+  };
+
   const handleTabChange = (event, newValue) => {
     setTab(newValue);
   };
@@ -255,7 +274,7 @@ const StudentTestView = () => {
       )}
 
       {/* Tests List */}
-      {loading ? (
+      {loading && tests.length === 0 ? (
         <Box sx={{ textAlign: 'center', py: 4 }}>
           <Typography>Loading tests...</Typography>
         </Box>
@@ -366,6 +385,7 @@ const StudentTestView = () => {
                       onClick={() => {
                         setSelectedTest(test);
                         setOpenCommentDialog(true);
+                        loadTestDetails(test.id);
                       }}
                       color="primary"
                     >
@@ -378,6 +398,13 @@ const StudentTestView = () => {
           ))}
         </Grid>
       )}
+      {nextCursor && (
+        <Box sx={{ textAlign: 'center', mt: 3 }}>
+          <Button variant="outlined" onClick={() => loadTests(nextCursor)} disabled={loading}>
+            Load more
+          </Button>
+        </Box>
+      )}
 
       {/* Test Details Dialog */}
       <Dialog 
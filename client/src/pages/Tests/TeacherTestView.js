@@ -47,6 +47,7 @@ const API_BASE = process.env.REACT_APP_API_URL ? `${process.env.REACT_APP_API_UR
 const TeacherTestView = () => {
   const { user, token } = useAuth();
   const [tests, setTests] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
   const [openDialog, setOpenDialog] = useState(false);
   const [editMode, setEditMode] = useState(false);
@@ -72,17 +73,19 @@ const TeacherTestView = () => {
     loadTests();
   }, []);
 
-  const loadTests = async () => {
+  const loadTests = async (cursor = null) => {
     try {
       setLoading(true);
-      const response = await fetch(`${API_BASE}/tests`, {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`${API_BASE}/tests${query}`, {
         headers: { Authorization: `Bearer ${token}` }
       });
       
       if (!response.ok) throw new Error('Failed to load tests');
       
       const data = await response.json();
-      setTests(data.tests || []);
+      setTests(prev => (cursor ? [...prev, ...(data.tests || [])] : data.tests || []));
+      setNextCursor(data.nextCursor || null);
     } catch (err) {
       setError('Failed to load tests: ' + err.message);
     } finally {
@@ -317,7 +320,7 @@ const TeacherTestView = () => {
         )}
 
         {/* Tests Grid */}
-        {loading ? (
+        {loading && tests.length === 0 ? (
           <Box sx={{ textAlign: 'center', py: 4 }}>
             <Typography>Loading tests...</Typography>
           </Box>
@@ -392,7 +395,7 @@ const TeacherTestView = () => {
                     <Box sx={{ display: 'flex', justifyContent: 'space-between', mb: 2 }}>
                       <Box sx={{ textAlign: 'center' }}>
                         <Typography variant="h6" color="primary">
-                          {test.comments?.length || 0}
+                          {test.commentCount || 0}
                         </Typography>
                         <Typography variant="caption" color="text.secondary">
                           Comments
@@ -400,7 +403,7 @@ const TeacherTestView = () => {
                       </Box>
                       <Box sx={{ textAlign: 'center' }}>
                         <Typography variant="h6" color="primary">
-                          {test.submissions?.length || 0}
+                          {test.submissionCount || 0}
                         </Typography>
                         <Typography variant="caption" color="text.secondary">
                           Submissions
@@ -439,6 +442,13 @@ const TeacherTestView = () => {
             ))}
           </Grid>
         )}
+        {nextCursor && (
+          <Box sx={{ textAlign: 'center', mt: 3 }}>
+            <Button variant="outlined" onClick={() => loadTests(nextCursor)} disabled={loading}>
+              Load more
+            </Button>
+          </Box>
+        )}
 
         {/* Create/Edit Test Dialog */}
         <Dialog 
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Route Codemods for School Management System
+
+Rewrites the Express route files structurally instead of with exact string
+replacements. Each file is tokenized (strings, template literals, regex
+literals and comments are single tokens, so their contents are never
+touched), the calls a codemod targets are parsed into properties, and only
+those spans of the source are replaced; formatting elsewhere is kept.
+
+Codemods:
+
+- flatten-responses   res.json({ success: true, message, data: { a, b } })
+                      becomes res.json({ a, b }); other top-level properties
+                      are kept. Calls whose data is not an object literal,
+                      whose keys would clash, or with comments between the
+                      properties are reported and left alone.
+
+Files are processed in parallel. Each file's content hash is cached in
+.codemod_cache.json once a codemod has nothing left to change in it, so
+re-runs only hash the files and skip the unchanged ones. --dry-run prints
+unified diffs; otherwise files are written atomically (temp file and rename
+in the same directory).
+
+Usage:
+    python codemod.py flatten-responses [--path server/routes] [--dry-run] [--jobs 4] [--no-cache]
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Bump when the tokenizer or a codemod changes, so cached results are discarded
+ENGINE_VERSION = 1
+DEFAULT_CACHE = ".codemod_cache.json"
+
+Token = namedtuple("Token", "kind text start end")
+
+PUNCTUATORS = sorted([
+    ">>>=", "...", "===", "!==", "**=", "<<=", ">>=", ">>>", "&&=", "||=", "??=",
+    "=>", "==", "!=", "<=", ">=", "&&", "||", "??", "?.", "++", "--", "+=", "-=", "*=", "/=", "%=",
+    "&=", "|=", "^=", "<<", ">>", "**",
+], key=len, reverse=True)
+
+# After these a slash starts a regex literal rather than a division
+REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw",
+                  "instanceof", "yield", "await"}
+
+OPENERS = {"(": ")", "[": "]", "{": "}"}
+
+
+class TokenizeError(ValueError):
+    pass
+
+
+def _scan_quoted(source: str, i: int, quote: str) -> int:
+    """End index of the string literal starting at source[i]."""
+    i += 1
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == quote:
+            return i + 1
+        if char == "\n":
+            break
+        i += 1
+    raise TokenizeError(f"unterminated string at offset {i}")
+
+
+def _scan_template(source: str, i: int) -> int:
+    """End index of the template literal at source[i], including nested ${...} code."""
+    i += 1
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            i += 2
+        elif char == "`":
+            return i + 1
+        elif source.startswith("${", i):
+            _, i = _tokenize(source, i + 2, until_brace=True)
+            i += 1  # the closing brace
+        else:
+            i += 1
+    raise TokenizeError("unterminated template literal")
+
+
+def _scan_regex(source: str, i: int) -> int:
+    i += 1
+    in_class = False
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "\n":
+            raise TokenizeError(f"unterminated regex at offset {i}")
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            i += 1
+            while i < len(source) and (source[i].isalnum() or source[i] == "_"):
+                i += 1
+            return i
+        i += 1
+    raise TokenizeError("unterminated regex")
+
+
+def _regex_allowed(previous: Optional[Token]) -> bool:
+    if previous is None:
+        return True
+    if previous.kind == "punct":
+        return previous.text not in (")", "]", "}")
+    return previous.kind == "name" and previous.text in REGEX_KEYWORDS
+
+
+def _tokenize(source: str, i: int = 0, until_brace: bool = False) -> Tuple[List[Token], int]:
+    tokens: List[Token] = []
+    previous: Optional[Token] = None
+    depth = 0
+    length = len(source)
+    while i < length:
+        char = source[i]
+        start = i
+        if char.isspace():
+            while i < length and source[i].isspace():
+                i += 1
+            kind = "ws"
+        elif source.startswith("//", i):
+            end = source.find("\n", i)
+            i = length if end == -1 else end
+            kind = "comment"
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            if end == -1:
+                raise TokenizeError(f"unterminated comment at offset {i}")
+            i = end + 2
+            kind = "comment"
+        elif char in "'\"":
+            i = _scan_quoted(source, i, char)
+            kind = "string"
+        elif char == "`":
+            i = _scan_template(source, i)
+            kind = "template"
+        elif char == "/" and _regex_allowed(previous):
+            i = _scan_regex(source, i)
+            kind = "regex"
+        elif char.isdigit() or (char == "." and i + 1 < length and source[i + 1].isdigit()):
+            while i < length and (source[i].isalnum() or source[i] in "._"):
+                i += 1
+            kind = "number"
+        elif char.isalpha() or char in "_$" or ord(char) > 127:
+            while i < length and (source[i].isalnum() or source[i] in "_$" or ord(source[i]) > 127):
+                i += 1
+            kind = "name"
+        else:
+            if until_brace:
+                if char == "{":
+                    depth += 1
+                elif char == "}":
+                    if depth == 0:
+                        return tokens, i
+                    depth -= 1
+            i += next((len(p) for p in PUNCTUATORS if source.startswith(p, i)), 1)
+            kind = "punct"
+        token = Token(kind, source[start:i], start, i)
+        tokens.append(token)
+        if kind not in ("ws", "comment"):
+            previous = token
+    if until_brace:
+        raise TokenizeError("unterminated ${ in template literal")
+    return tokens, i
+
+
+def tokenize(source: str) -> List[Token]:
+    return _tokenize(source)[0]
+
+
+def match_brackets(tokens: List[Token]) -> Dict[int, int]:
+    """Index of the matching closer for every opener (indexes into tokens)."""
+    matches: Dict[int, int] = {}
+    stack: List[int] = []
+    for index, token in enumerate(tokens):
+        if token.kind != "punct":
+            continue
+        if token.text in OPENERS:
+            stack.append(index)
+        elif token.text in (")", "]", "}"):
+            if not stack or OPENERS[tokens[stack[-1]].text] != token.text:
+                raise TokenizeError(f"unbalanced {token.text!r} at offset {token.start}")
+            matches[stack.pop()] = index
+    if stack:
+        raise TokenizeError(f"unclosed {tokens[stack[-1]].text!r} at offset {tokens[stack[-1]].start}")
+    return matches
+
+
+# A property of an object literal: key is None for spreads and computed keys.
+# first/last and value_first/value_last index the significant tokens.
+Prop = namedtuple("Prop", "key first last value_first value_last")
+
+
+def parse_object(sig: List[Token], matches: Dict[int, int], open_index: int) -> Tuple[List[Prop], bool]:
+    """Properties of the object literal opening at sig[open_index], and whether it has a trailing comma."""
+    close_index = matches[open_index]
+    props: List[Prop] = []
+    index = open_index + 1
+    trailing_comma = False
+    while index < close_index:
+        first = index
+        while index < close_index and sig[index].text != ",":
+            index = matches.get(index, index) + 1
+        last = index - 1
+        key, value_first = None, None
+        head = sig[first]
+        if head.kind in ("name", "string", "number") and first < last and sig[first + 1].text == ":":
+            key = head.text.strip("'\"") if head.kind == "string" else head.text
+            value_first = first + 2
+        elif head.kind == "name" and first == last:
+            key = head.text  # shorthand
+        props.append(Prop(key, first, last, value_first, last if value_first is not None else None))
+        trailing_comma = index < close_index and index + 1 == close_index
+        index += 1
+    return props, trailing_comma
+
+
+def line_indent(source: str, position: int) -> str:
+    line_start = source.rfind("\n", 0, position) + 1
+    end = line_start
+    while end < len(source) and source[end] in " \t":
+        end += 1
+    return source[line_start:end]
+
+
+def line_number(source: str, position: int) -> int:
+    return source.count("\n", 0, position) + 1
+
+
+def dedent_continuation(text: str, columns: int) -> str:
+    """Remove up to `columns` leading blanks from every line but the first."""
+    if columns <= 0:
+        return text
+    lines = text.split("\n")
+    for n in range(1, len(lines)):
+        line = lines[n]
+        strip = 0
+        while strip < columns and strip < len(line) and line[strip] in " \t":
+            strip += 1
+        lines[n] = line[strip:]
+    return "\n".join(lines)
+
+
+def flatten_responses(source: str) -> Tuple[str, Dict[str, object]]:
+    """The flatten-responses codemod; returns the new source and a report."""
+    tokens = tokenize(source)
+    sig = [token for token in tokens if token.kind not in ("ws", "comment")]
+    comments = [token for token in tokens if token.kind == "comment"]
+    matches = match_brackets(sig)
+    edits: List[Tuple[int, int, str]] = []
+    skipped: List[Dict[str, object]] = []
+
+    for index in range(1, len(sig) - 2):
+        if not (sig[index].text == "json" and sig[index - 1].text in (".", "?.") and sig[index + 1].text == "("
+                and sig[index + 2].text == "{"):
+            continue
+        open_index = index + 2
+        close_index = matches[open_index]
+        if close_index + 1 >= len(sig) or sig[close_index + 1].text != ")":
+            continue  # more than one argument
+        props, trailing_comma = parse_object(sig, matches, open_index)
+        by_key = {prop.key: prop for prop in props if prop.key}
+        success, data = by_key.get("success"), by_key.get("data")
+        if not (success and data and success.value_first is not None
+                and success.value_first == success.value_last and sig[success.value_first].text == "true"):
+            continue
+
+        line = line_number(source, sig[index].start)
+        data_open = data.value_first
+        if data_open is None or sig[data_open].text != "{" or matches[data_open] != data.value_last:
+            skipped.append({"line": line, "reason": "data is not an object literal"})
+            continue
+        inner, _ = parse_object(sig, matches, data_open)
+        kept = [prop for prop in props if prop.key not in ("success", "message", "data")]
+        inner_keys = [prop.key for prop in inner if prop.key]
+        if len(set(inner_keys)) != len(inner_keys) or set(inner_keys) & {prop.key for prop in kept}:
+            skipped.append({"line": line, "reason": "keys of data clash with the response's own"})
+            continue
+
+        # Comments inside a property travel with it; comments between properties have nowhere to go
+        spans = [(sig[prop.first].start, sig[prop.last].end) for prop in props + inner if prop is not data]
+        object_start, object_end = sig[open_index].start, sig[close_index].end
+        if any(object_start < comment.start < object_end and not any(start <= comment.start < end for start, end in spans)
+               for comment in comments):
+            skipped.append({"line": line, "reason": "comments between properties"})
+            continue
+
+        multiline = "\n" in source[object_start:object_end]
+        outer_indent = line_indent(source, sig[props[0].first].start) if props else ""
+        inner_indent = line_indent(source, sig[inner[0].first].start) if inner else outer_indent
+        shift = len(inner_indent) - len(outer_indent) if "\n" in source[sig[data_open].start:sig[data.last].end] else 0
+        texts: List[str] = []
+        for prop in props:
+            if prop is data:
+                texts += [dedent_continuation(source[sig[p.first].start:sig[p.last].end], shift) for p in inner]
+            elif prop in kept:
+                texts.append(source[sig[prop.first].start:sig[prop.last].end])
+
+        if not texts:
+            replacement = "{}"
+        elif multiline:
+            close_indent = line_indent(source, sig[close_index].start)
+            replacement = ("{\n" + ",\n".join(outer_indent + text for text in texts)
+                           + ("," if trailing_comma else "") + "\n" + close_indent + "}")
+        else:
+            replacement = "{ " + ", ".join(texts) + " }"
+        edits.append((object_start, object_end, replacement))
+
+    for start, end, replacement in reversed(edits):
+        source = source[:start] + replacement + source[end:]
+    return source, {"rewrites": len(edits), "skipped": skipped}
+
+
+CODEMODS: Dict[str, Callable[[str], Tuple[str, Dict[str, object]]]] = {
+    "flatten-responses": flatten_responses,
+}
+
+
+def rewrite_source(name: str, source: str) -> Tuple[str, Dict[str, object]]:
+    return CODEMODS[name](source)
+
+
+def _rewrite_file(job: Tuple[str, str, str]) -> Tuple[str, Optional[str], Dict[str, object]]:
+    """Worker: (path, new source or None if unchanged, report). Runs in a child process."""
+    name, path, source = job
+    try:
+        updated, report = rewrite_source(name, source)
+    except TokenizeError as e:
+        return path, None, {"rewrites": 0, "skipped": [], "error": str(e)}
+    if updated == source:
+        return path, None, report
+    # A second pass must find nothing left to do, or the result isn't cached
+    _, again = rewrite_source(name, updated)
+    report["fixedPoint"] = again["rewrites"] == 0
+    report["after"] = again["skipped"]
+    return path, updated, report
+
+
+def content_hash(source: str) -> str:
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def load_cache(path: str) -> Dict[str, object]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {"version": ENGINE_VERSION, "codemods": {}}
+    if cache.get("version") != ENGINE_VERSION:
+        return {"version": ENGINE_VERSION, "codemods": {}}
+    return cache
+
+
+def atomic_write(path: str, content: str):
+    tmp_path = f"{path}.codemod.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        f.write(content)
+    shutil.copymode(path, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def collect_files(root: str) -> List[str]:
+    found = []
+    for directory, _, names in os.walk(root):
+        found += [os.path.join(directory, name) for name in names if name.endswith(".js")]
+    return sorted(found)
+
+
+def run_codemod(name: str, root: str, dry_run: bool = False, jobs: int = 4, cache_path: Optional[str] = DEFAULT_CACHE,
+                quiet: bool = False) -> Dict[str, object]:
+    """Apply a codemod to every .js file under root; returns counts for the run."""
+    started = time.perf_counter()
+    cache = load_cache(cache_path) if cache_path else {"version": ENGINE_VERSION, "codemods": {}}
+    known: Dict[str, Dict[str, object]] = cache["codemods"].setdefault(name, {})
+
+    jobs_to_run = []
+    skipped: Dict[str, List[Dict[str, object]]] = {}
+    cached = 0
+    for path in collect_files(root):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            source = f.read()
+        digest = content_hash(source)
+        entry = known.get(path)
+        if entry and entry["hash"] == digest:
+            cached += 1
+            if entry["skipped"]:
+                skipped[path] = entry["skipped"]
+            continue
+        jobs_to_run.append((name, path, source, digest))
+
+    work = [job[:3] for job in jobs_to_run]
+    if len(work) > 1 and jobs > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(work))) as pool:
+            results = list(pool.map(_rewrite_file, work))
+    else:
+        results = [_rewrite_file(job) for job in work]
+
+    changed, rewrites, errors = [], 0, []
+    for (_, path, source, digest), (_, updated, report) in zip(jobs_to_run, results):
+        if report.get("error"):
+            errors.append((path, report["error"]))
+            continue
+        if updated is None:
+            known[path] = {"hash": digest, "skipped": report["skipped"]}
+            if report["skipped"]:
+                skipped[path] = report["skipped"]
+            continue
+        changed.append(path)
+        rewrites += report["rewrites"]
+        if report["after"]:
+            skipped[path] = report["after"]
+        if dry_run:
+            if not quiet:
+                sys.stdout.writelines(difflib.unified_diff(
+                    source.splitlines(keepends=True), updated.splitlines(keepends=True),
+                    fromfile=f"a/{path}", tofile=f"b/{path}"))
+            continue
+        atomic_write(path, updated)
+        if report["fixedPoint"]:
+            known[path] = {"hash": content_hash(updated), "skipped": report["after"]}
+
+    if cache_path:
+        atomic_cache = f"{cache_path}.tmp"
+        with open(atomic_cache, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+        os.replace(atomic_cache, cache_path)
+
+    summary = {
+        "codemod": name,
+        "files": len(jobs_to_run) + cached,
+        "cached": cached,
+        "changed": len(changed),
+        "rewrites": rewrites,
+        "skipped": sum(len(items) for items in skipped.values()),
+        "errors": len(errors),
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+    if not quiet:
+        verb = "Would rewrite" if dry_run else "Rewrote"
+        for path in changed:
+            print(f"✏️  {verb} {path}")
+        for path, items in sorted(skipped.items()):
+            for item in items:
+                print(f"⏭️  {path}:{item['line']} left as is: {item['reason']}")
+        for path, error in errors:
+            print(f"❌ {path}: {error}")
+        print(f"📊 {name}: {summary['files']} files ({cached} unchanged from cache), {verb.lower()} "
+              f"{rewrites} calls in {len(changed)} files, {summary['skipped']} skipped, "
+              f"{summary['seconds'] * 1000:.1f} ms")
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Structural rewrites of the Express route files")
+    parser.add_argument("codemod", choices=sorted(CODEMODS))
+    parser.add_argument("--path", default=os.path.join("server", "routes"), help="Directory of .js files")
+    parser.add_argument("--dry-run", action="store_true", help="Print unified diffs instead of writing")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 4, help="Parallel worker processes")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="Content-hash cache file")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and don't update the cache")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.path):
+        print(f"❌ Directory not found: {args.path}")
+        return 1
+    summary = run_codemod(args.codemod, args.path, dry_run=args.dry_run, jobs=args.jobs,
+                          cache_path=None if args.no_cache else args.cache)
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
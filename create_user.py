@@ -13,7 +13,6 @@ directly in the PostgreSQL database used by the app.
 import os
 import sys
 import psycopg2
-import bcrypt
 from datetime import datetime
 
 DEFAULTS = {
@@ -24,6 +23,44 @@ DEFAULTS = {
     "port": 5432,
 }
 
+# Default test users
+DEFAULT_USERS = [
+    {
+        "role": "admin",
+        "first": "Super",
+        "last": "Admin",
+        "email": "admin@school.com",
+        "password": "admin123",
+    },
+    {
+        "role": "teacher",
+        "first": "Jane",
+        "last": "Doe",
+        "email": "teacher@school.com",
+        "password": "teacher123",
+        "department": "Science",
+        "specialization": "Physics",
+    },
+    {
+        "role": "student",
+        "first": "Alex",
+        "last": "Smith",
+        "email": "student@school.com",
+        "password": "student123",
+        "student_id": "20240001",
+        "grade": "10",
+        "section": "A",
+        "enrollment_date": "2025-08-20",
+    },
+    {
+        "role": "parent",
+        "first": "Bob",
+        "last": "Brown",
+        "email": "parent@school.com",
+        "password": "parent123",
+    },
+]
+
 def get_db_config():
     dsn = os.getenv("DATABASE_URL")
     if dsn:
@@ -37,6 +74,8 @@ def get_db_config():
     }
 
 def hash_password(raw: str) -> str:
+    # Imported here: the other scripts import get_db_config from this module and never hash
+    import bcrypt
     return bcrypt.hashpw(raw.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
 
 def email_exists(cur, email: str) -> bool:
@@ -104,45 +143,7 @@ def main():
         sys.exit(1)
 
     try:
-        # Default test users
-        users = [
-            {
-                "role": "admin",
-                "first": "Super",
-                "last": "Admin",
-                "email": "admin@school.com",
-                "password": "admin123",
-            },
-            {
-                "role": "teacher",
-                "first": "Jane",
-                "last": "Doe",
-                "email": "teacher@school.com",
-                "password": "teacher123",
-                "department": "Science",
-                "specialization": "Physics",
-            },
-            {
-                "role": "student",
-                "first": "Alex",
-                "last": "Smith",
-                "email": "student@school.com",
-                "password": "student123",
-                "student_id": "20240001",
-                "grade": "10",
-                "section": "A",
-                "enrollment_date": "2025-08-20",
-            },
-            {
-                "role": "parent",
-                "first": "Bob",
-                "last": "Brown",
-                "email": "parent@school.com",
-                "password": "parent123",
-            },
-        ]
-
-        for u in users:
+        for u in DEFAULT_USERS:
             create_user(conn, **u)
 
         print("\n🎉 All default test users created successfully!\n")
@@ -10,10 +10,148 @@ import uuid
 from datetime import datetime
 import sys
 
+import schema_fingerprint
+from db_maintenance import maintain
+
+# Unread-message counters kept current by triggers on messages, so badge and
+# inbox queries become primary-key lookups instead of scans of messages.
+MESSAGE_COUNTERS_SQL = """
+CREATE TABLE IF NOT EXISTS message_counters (
+    "userId" UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    "peerId" UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    unread INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    "lastMessageAt" TIMESTAMP,
+    PRIMARY KEY ("userId", "peerId")
+);
+
+CREATE TABLE IF NOT EXISTS user_message_counters (
+    "userId" UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    unread INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    "lastMessageAt" TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION message_counters_bump(
+    p_user UUID, p_peer UUID, p_total INTEGER, p_unread INTEGER, p_at TIMESTAMP
+) RETURNS void AS $$
+BEGIN
+    IF p_total = 0 AND p_unread = 0 AND p_at IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO message_counters ("userId", "peerId", unread, total, "lastMessageAt")
+    VALUES (p_user, p_peer, GREATEST(p_unread, 0), GREATEST(p_total, 0), p_at)
+    ON CONFLICT ("userId", "peerId") DO UPDATE SET
+        unread = message_counters.unread + p_unread,
+        total = message_counters.total + p_total,
+        "lastMessageAt" = GREATEST(message_counters."lastMessageAt", EXCLUDED."lastMessageAt");
+
+    INSERT INTO user_message_counters ("userId", unread, total, "lastMessageAt")
+    VALUES (p_user, GREATEST(p_unread, 0), GREATEST(p_total, 0), p_at)
+    ON CONFLICT ("userId") DO UPDATE SET
+        unread = user_message_counters.unread + p_unread,
+        total = user_message_counters.total + p_total,
+        "lastMessageAt" = GREATEST(user_message_counters."lastMessageAt", EXCLUDED."lastMessageAt");
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION message_counters_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM message_counters_bump(
+            OLD."receiverId", OLD."senderId", -1,
+            CASE WHEN COALESCE(OLD."isRead", false) THEN 0 ELSE -1 END, NULL);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM message_counters_bump(
+            NEW."receiverId", NEW."senderId", 1,
+            CASE WHEN COALESCE(NEW."isRead", false) THEN 0 ELSE 1 END, NEW."createdAt");
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS messages_counters_insert ON messages;
+CREATE TRIGGER messages_counters_insert
+    AFTER INSERT OR DELETE ON messages
+    FOR EACH ROW EXECUTE FUNCTION message_counters_apply();
+
+DROP TRIGGER IF EXISTS messages_counters_update ON messages;
+CREATE TRIGGER messages_counters_update
+    AFTER UPDATE OF "isRead", "receiverId", "senderId" ON messages
+    FOR EACH ROW
+    WHEN (OLD."isRead" IS DISTINCT FROM NEW."isRead"
+          OR OLD."receiverId" IS DISTINCT FROM NEW."receiverId"
+          OR OLD."senderId" IS DISTINCT FROM NEW."senderId")
+    EXECUTE FUNCTION message_counters_apply();
+"""
+
+# grades.percentage and "letterGrade" derived from score/"maxScore" by a trigger,
+# so writers only send raw scores and readers never recompute. The letter uses
+# the thresholds of calculateLetterGrade in server/models/Grade.js, applied to
+# the percentage rounded to a whole number as its pre-save hook does. A
+# "maxScore" of 0 (the model requires at least 1) derives 0 and 'F' rather than
+# NULL, which percentage NOT NULL would reject.
+GRADE_COLUMNS_SQL = """
+CREATE OR REPLACE FUNCTION grade_percentage(p_score NUMERIC, p_max NUMERIC) RETURNS NUMERIC AS $$
+    SELECT coalesce(round(p_score * 100 / NULLIF(p_max, 0), 2), 0)
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION grade_letter(p_score NUMERIC, p_max NUMERIC) RETURNS VARCHAR AS $$
+    SELECT CASE
+        WHEN pct IS NULL THEN NULL
+        WHEN pct >= 97 THEN 'A+' WHEN pct >= 93 THEN 'A' WHEN pct >= 90 THEN 'A-'
+        WHEN pct >= 87 THEN 'B+' WHEN pct >= 83 THEN 'B' WHEN pct >= 80 THEN 'B-'
+        WHEN pct >= 77 THEN 'C+' WHEN pct >= 73 THEN 'C' WHEN pct >= 70 THEN 'C-'
+        WHEN pct >= 67 THEN 'D+' WHEN pct >= 63 THEN 'D' WHEN pct >= 60 THEN 'D-'
+        ELSE 'F'
+    END
+    FROM (SELECT coalesce(round(p_score * 100 / NULLIF(p_max, 0)), 0) AS pct) p
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION grades_derive_columns() RETURNS trigger AS $$
+BEGIN
+    NEW.percentage := grade_percentage(NEW.score, NEW."maxScore");
+    NEW."letterGrade" := grade_letter(NEW.score, NEW."maxScore");
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS grades_derive_columns ON grades;
+CREATE TRIGGER grades_derive_columns
+    BEFORE INSERT OR UPDATE OF score, "maxScore", percentage, "letterGrade" ON grades
+    FOR EACH ROW EXECUTE FUNCTION grades_derive_columns();
+"""
+
+# Queue the Node email service writes to with EMAIL_DELIVERY=outbox and
+# email_worker.py delivers from; created here so queueing works before the
+# worker has ever run.
+EMAIL_OUTBOX_SQL = """
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    "toAddress" VARCHAR(255) NOT NULL,
+    "fromAddress" VARCHAR(255),
+    subject VARCHAR(500) NOT NULL,
+    html TEXT,
+    text TEXT,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'sending', 'sent', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    "nextAttemptAt" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "lockedUntil" TIMESTAMP,
+    "lastError" TEXT,
+    "sentAt" TIMESTAMP,
+    "createdAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS email_outbox_due
+    ON email_outbox ("nextAttemptAt") WHERE status IN ('pending', 'sending');
+"""
+
 class DatabaseSetup:
-    def __init__(self):
-        # Database connection parameters
-        self.db_config = {
+    def __init__(self, db_config=None):
+        # Database connection parameters: a DSN string or psycopg2 keyword dict
+        self.db_config = db_config or {
             "host": "dpg-d2feoiruibrs739se2lg-a.singapore-postgres.render.com",
             "database": "app_db_321n",
             "user": "app_db_321n_user",
@@ -26,7 +164,10 @@ class DatabaseSetup:
     def connect(self):
         """Establish database connection."""
         try:
-            self.conn = psycopg2.connect(**self.db_config)
+            if isinstance(self.db_config, str):
+                self.conn = psycopg2.connect(self.db_config)
+            else:
+                self.conn = psycopg2.connect(**self.db_config)
             self.cur = self.conn.cursor()
             print("✅ Database connection established successfully!")
             return True
@@ -43,39 +184,56 @@ class DatabaseSetup:
         print("🔌 Database connection closed.")
     
     def check_existing_structure(self):
-        """Check what tables and columns already exist."""
+        """
+        Compare the schema with the expected fingerprint (one round trip when
+        it matches) and report any drift. Returns False when the users table
+        is missing or still has the old lowercase columns, i.e. when the
+        schema has to be recreated; other drift is reported but kept. Errors
+        are raised, never taken as a reason to recreate.
+        """
         print("🔍 Checking existing database structure...")
         
         try:
-            # Check if users table exists and what columns it has
-            self.cur.execute("""
-                SELECT column_name, data_type, is_nullable 
-                FROM information_schema.columns 
-                WHERE table_name = 'users' 
-                ORDER BY ordinal_position
-            """)
-            
-            existing_columns = self.cur.fetchall()
-            if existing_columns:
-                print("📋 Existing users table columns:")
-                for col in existing_columns:
-                    print(f"   - {col[0]} ({col[1]}, nullable: {col[2]})")
-                
-                # Check if we have the right column names
-                column_names = [col[0] for col in existing_columns]
-                if 'firstname' in column_names and 'firstName' not in column_names:
-                    print("⚠️  Found 'firstname' column but need 'firstName' - will need to recreate table")
-                    return False
-                elif 'firstName' in column_names:
-                    print("✅ Found correct 'firstName' column structure")
-                    return True
+            try:
+                matches, differences = schema_fingerprint.check(self.cur)
+            except FileNotFoundError as e:
+                # No expected fingerprint to compare with; only look at users
+                print(f"⚠️  {e}")
+                live = {tuple(entry[:3]) for entry in schema_fingerprint.schema_entries(self.cur)}
+                missing = {key for key in [("table", "users", "users"), ("column", "users", "firstName")]
+                           if key not in live}
+                unexpected = {("column", "users", "firstname")} & live
             else:
+                if matches:
+                    print("✅ Schema matches the expected fingerprint")
+                    return True
+                print("⚠️  Schema differs from the expected fingerprint:")
+                schema_fingerprint.print_diff(differences)
+                missing = {(item["kind"], item["table"], item["name"]) for item in differences["missing"]}
+                unexpected = {(item["kind"], item["table"], item["name"]) for item in differences["unexpected"]}
+            
+            if ("table", "users", "users") in missing:
                 print("📭 No users table found")
                 return False
+            if ("column", "users", "firstName") in missing and ("column", "users", "firstname") in unexpected:
+                print("⚠️  Found 'firstname' column but need 'firstName' - will need to recreate table")
+                return False
+            print("✅ Found correct 'firstName' column structure")
+            return True
                 
         except Exception as e:
-            print(f"⚠️  Error checking structure: {e}")
-            return False
+            self.conn.rollback()
+            print(f"❌ Error checking structure: {e}")
+            raise
+    
+    def existing_managed_tables(self):
+        """The schema's tracked tables that exist in this database."""
+        self.cur.execute(
+            "SELECT name FROM unnest(%s::text[]) name WHERE to_regclass('public.' || quote_ident(name)) IS NOT NULL",
+            (schema_fingerprint.TRACKED_TABLES,))
+        tables = [row[0] for row in self.cur.fetchall()]
+        self.conn.commit()
+        return tables
     
     def drop_existing_tables(self):
         """Drop all existing tables to start fresh."""
@@ -84,6 +242,8 @@ class DatabaseSetup:
         drop_queries = [
             "DROP TABLE IF EXISTS fees CASCADE",
             "DROP TABLE IF EXISTS events CASCADE",
+            "DROP TABLE IF EXISTS message_counters CASCADE",
+            "DROP TABLE IF EXISTS user_message_counters CASCADE",
             "DROP TABLE IF EXISTS messages CASCADE",
             "DROP TABLE IF EXISTS attendance CASCADE",
             "DROP TABLE IF EXISTS grades CASCADE",
@@ -256,7 +416,8 @@ class DatabaseSetup:
             "markedBy" UUID REFERENCES users(id),
             "markedAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             "createdAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            "updatedAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            "updatedAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CONSTRAINT attendance_student_course_date UNIQUE ("studentId", "courseId", date)
         );
         """
         
@@ -338,6 +499,48 @@ class DatabaseSetup:
         print("✅ All tables created successfully!")
         return True
     
+    def create_message_counters(self):
+        """Create unread-message counter tables and the triggers that maintain them."""
+        print("🔢 Creating message counters...")
+        
+        try:
+            self.cur.execute(MESSAGE_COUNTERS_SQL)
+            self.conn.commit()
+            print("✅ Message counters and triggers created")
+            return True
+        except Exception as e:
+            self.conn.rollback()
+            print(f"❌ Error creating message counters: {e}")
+            return False
+    
+    def create_email_outbox(self):
+        """Create the email outbox table."""
+        print("📮 Creating email outbox...")
+        
+        try:
+            self.cur.execute(EMAIL_OUTBOX_SQL)
+            self.conn.commit()
+            print("✅ Email outbox created")
+            return True
+        except Exception as e:
+            self.conn.rollback()
+            print(f"❌ Error creating email outbox: {e}")
+            return False
+    
+    def create_grade_columns(self):
+        """Create the trigger that derives grades.percentage and letterGrade."""
+        print("🧮 Creating grade columns trigger...")
+        
+        try:
+            self.cur.execute(GRADE_COLUMNS_SQL)
+            self.conn.commit()
+            print("✅ Grade percentage and letter grade are now derived on write")
+            return True
+        except Exception as e:
+            self.conn.rollback()
+            print(f"❌ Error creating grade columns trigger: {e}")
+            return False
+    
     def insert_sample_data(self):
         """Insert sample subjects and courses."""
         print("📚 Inserting sample subjects and courses...")
@@ -522,8 +725,14 @@ class DatabaseSetup:
         self.conn.commit()
         print("✅ Sample courses created successfully!")
     
-    def setup_database(self):
-        """Main method to set up the entire database."""
+    def setup_database(self, recreate=None, drop_broken=True):
+        """
+        Main method to set up the entire database. recreate decides what to do
+        when the structure is already correct; None asks interactively.
+        drop_broken=False refuses to drop the tables of a database whose users
+        table is missing or outdated (unattended runs); a database without any
+        of the tables is still set up.
+        """
         print("🚀 Starting Database Setup...")
         print("=" * 50)
         
@@ -534,11 +743,17 @@ class DatabaseSetup:
             
             # Check existing structure
             if self.check_existing_structure():
-                print("⚠️  Database already has correct structure. Do you want to recreate it anyway?")
-                recreate = input("Recreate database? (yes/no): ").strip().lower()
-                if recreate != 'yes':
+                if recreate is None:
+                    print("⚠️  Database already has correct structure. Do you want to recreate it anyway?")
+                    recreate = input("Recreate database? (yes/no): ").strip().lower() == 'yes'
+                if not recreate:
                     print("✅ Using existing database structure.")
                     return True
+            elif not drop_broken:
+                existing = self.existing_managed_tables()
+                if existing:
+                    print(f"❌ Refusing to drop existing tables ({', '.join(existing)}) without an explicit recreate")
+                    return False
             
             # Drop existing tables
             self.drop_existing_tables()
@@ -547,6 +762,18 @@ class DatabaseSetup:
             if not self.create_new_schema():
                 return False
             
+            # Unread counters maintained by triggers
+            if not self.create_message_counters():
+                return False
+            
+            # Derived grade columns maintained by a trigger
+            if not self.create_grade_columns():
+                return False
+            
+            # Outbox for EMAIL_DELIVERY=outbox
+            if not self.create_email_outbox():
+                return False
+            
             # Insert sample data
             self.insert_sample_data()
             
@@ -565,13 +792,19 @@ class DatabaseSetup:
             print("   STUDENT: student@school.com / student123")
             print("   PARENT: parent@school.com / parent123")
             
-            return True
-            
         except Exception as e:
             print(f"❌ Setup failed: {e}")
             return False
         finally:
             self.disconnect()
+        
+        # Every table was just bulk-loaded; give the planner statistics now.
+        # The database is usable without them, so a failure here only warns.
+        try:
+            maintain(self.db_config)
+        except Exception as e:
+            print(f"⚠️  Statistics maintenance failed: {e}")
+        return True
 
 def main():
     """Main function to run the database setup."""
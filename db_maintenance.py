@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Planner Statistics Maintenance for School Management System
+
+Bulk writes (database_setup.py, test_seed.py, imports, archiving) leave the
+planner statistics stale until autovacuum gets round to the table, and the
+first real queries pay for it with bad plans. This orchestrator looks at
+pg_stat_user_tables and decides per table:
+
+- VACUUM (ANALYZE) when dead tuples, or rows inserted since the last vacuum,
+  exceed a share of the live rows
+- ANALYZE when the rows modified since the last analyze exceed a share of
+  the live rows, or the table has rows but was never analyzed
+- skip otherwise
+
+The thresholds are deliberately tighter than autovacuum's defaults. Chosen
+operations run in parallel on a bounded pool of autocommit connections, and
+each one is logged with its duration and the resulting statistics age.
+
+Bulk tools call maintain() after they finish; it can also run standalone,
+e.g. nightly from cron.
+
+Usage:
+    python db_maintenance.py run [--tables users,grades] [--jobs 4] [--dry-run] [--json] [--log FILE]
+    python db_maintenance.py status
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import psycopg2
+from psycopg2 import sql
+
+from create_user import get_db_config
+
+# Fixed floor plus a share of the live rows, as in autovacuum, but tighter
+ANALYZE_THRESHOLD = 50
+ANALYZE_SCALE = 0.05
+VACUUM_THRESHOLD = 50
+VACUUM_SCALE = 0.1
+INSERT_VACUUM_SCALE = 0.2
+
+STATS_SQL = """
+    SELECT relname, n_live_tup, n_dead_tup, n_mod_since_analyze, n_ins_since_vacuum,
+           greatest(last_analyze, last_autoanalyze) AS analyzed_at,
+           greatest(last_vacuum, last_autovacuum) AS vacuumed_at,
+           extract(epoch FROM now() - greatest(last_analyze, last_autoanalyze))::float8 AS stats_age
+    FROM pg_stat_user_tables
+    WHERE schemaname = 'public'
+"""
+
+
+def connect(db_config=None):
+    cfg = db_config or get_db_config()
+    return psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+
+
+def table_stats(conn, tables: Optional[List[str]] = None) -> Dict[str, Dict[str, object]]:
+    with conn.cursor() as cur:
+        cur.execute(STATS_SQL + (" AND relname = ANY(%s)" if tables else ""), (tables,) if tables else None)
+        columns = [desc[0] for desc in cur.description]
+        rows = {row[0]: dict(zip(columns, row)) for row in cur.fetchall()}
+    conn.commit()
+    return rows
+
+
+def decide(stats: Dict[str, object]) -> Optional[str]:
+    """'vacuum', 'analyze' or None for one table's pg_stat_user_tables row."""
+    live = stats["n_live_tup"]
+    if stats["n_dead_tup"] > VACUUM_THRESHOLD + VACUUM_SCALE * live:
+        return "vacuum"
+    # Freshly inserted pages aren't all-visible until vacuumed (no index-only scans)
+    if stats["n_ins_since_vacuum"] > VACUUM_THRESHOLD + INSERT_VACUUM_SCALE * live:
+        return "vacuum"
+    if stats["n_mod_since_analyze"] > ANALYZE_THRESHOLD + ANALYZE_SCALE * live:
+        return "analyze"
+    # Small tables written by setup scripts never reach the thresholds
+    if stats["analyzed_at"] is None and (live or stats["n_mod_since_analyze"]):
+        return "analyze"
+    return None
+
+
+def run_operation(db_config, table: str, operation: str) -> Dict[str, object]:
+    """Run one VACUUM/ANALYZE on its own autocommit connection (VACUUM can't run in a transaction)."""
+    statement = sql.SQL("VACUUM (ANALYZE) {}" if operation == "vacuum" else "ANALYZE {}").format(
+        sql.Identifier("public", table))
+    started = time.perf_counter()
+    result: Dict[str, object] = {"table": table, "operation": operation}
+    conn = connect(db_config)
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(statement)
+        result["status"] = "ok"
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{e.__class__.__name__}: {e}"
+    finally:
+        conn.close()
+    result["durationMs"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def maintain(db_config=None, tables: Optional[List[str]] = None, jobs: int = 4, dry_run: bool = False,
+             quiet: bool = False) -> List[Dict[str, object]]:
+    """
+    Plan and run statistics maintenance. db_config is a DSN or psycopg2
+    keyword dict (defaults to get_db_config()), so bulk tools can pass the
+    database they just wrote to.
+    """
+    conn = connect(db_config)
+    try:
+        before = table_stats(conn, tables)
+        plan = [(table, decide(stats)) for table, stats in sorted(before.items())]
+        plan = [(table, operation) for table, operation in plan if operation]
+        if dry_run or not plan:
+            results = [{"table": table, "operation": operation, "status": "planned"} for table, operation in plan]
+        else:
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                results = list(pool.map(lambda item: run_operation(db_config, *item), plan))
+        after = table_stats(conn, [table for table, _ in plan]) if plan and not dry_run else {}
+    finally:
+        conn.close()
+
+    for result in results:
+        stats = after.get(result["table"]) or before[result["table"]]
+        result["modifiedSinceAnalyze"] = stats["n_mod_since_analyze"]
+        result["deadTuples"] = stats["n_dead_tup"]
+        # Aged on the server, so the client's time zone doesn't matter
+        result["statsAgeSeconds"] = round(stats["stats_age"], 1) if stats["stats_age"] is not None else None
+    if not quiet:
+        print_results(results, skipped=len(before) - len(plan), dry_run=dry_run)
+    return results
+
+
+def print_results(results: List[Dict[str, object]], skipped: int, dry_run: bool):
+    verb = "Would run" if dry_run else "Ran"
+    print(f"📈 {verb} {len(results)} maintenance operations ({skipped} tables already fresh)")
+    for result in results:
+        if result["status"] == "failed":
+            print(f"   ❌ {result['operation'].upper()} {result['table']}: {result['error']}")
+        elif dry_run:
+            print(f"   - {result['operation'].upper()} {result['table']} "
+                  f"({result['modifiedSinceAnalyze']} modified, {result['deadTuples']} dead)")
+        else:
+            print(f"   ✅ {result['operation'].upper()} {result['table']} in {result['durationMs']} ms "
+                  f"(stats age {result['statsAgeSeconds']}s, {result['deadTuples']} dead)")
+
+
+def status(conn):
+    print("📊 Statistics freshness:")
+    for table, stats in sorted(table_stats(conn).items()):
+        age = f"{stats['stats_age'] / 3600:.1f}h ago" if stats["stats_age"] is not None else "never"
+        pending = decide(stats)
+        print(f"   - {table}: ~{stats['n_live_tup']} rows, {stats['n_mod_since_analyze']} modified, "
+              f"{stats['n_dead_tup']} dead, analyzed {age}" + (f" -> needs {pending.upper()}" if pending else ""))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="ANALYZE/VACUUM tables whose planner statistics are stale")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Decide and run maintenance per table")
+    run_parser.add_argument("--tables", help="Comma-separated table names (default: all in public)")
+    run_parser.add_argument("--jobs", type=int, default=4, help="Parallel operations")
+    run_parser.add_argument("--dry-run", action="store_true", help="Only show the plan")
+    run_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    run_parser.add_argument("--log", help="Append results as JSON lines to this file")
+    sub.add_parser("status", help="Show statistics age and pending work per table")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        conn = connect()
+        try:
+            status(conn)
+        finally:
+            conn.close()
+        return 0
+
+    tables = [table.strip() for table in args.tables.split(",")] if args.tables else None
+    results = maintain(tables=tables, jobs=args.jobs, dry_run=args.dry_run, quiet=args.json)
+    if args.json:
+        print(json.dumps(results, default=str))
+    if args.log and not args.dry_run:
+        stamp = datetime.now().isoformat(timespec="seconds")
+        with open(args.log, "a", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(dict(result, at=stamp), default=str) + "\n")
+    return 1 if any(result["status"] == "failed" for result in results) else 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
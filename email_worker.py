@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+Batched Email Delivery Worker for School Management System
+
+With EMAIL_DELIVERY=outbox the Node email service only inserts a row into
+email_outbox; this worker does the actual SMTP delivery off the request
+path:
+
+- claims due rows in batches with FOR UPDATE SKIP LOCKED, so several worker
+  processes can share one outbox
+- each worker thread keeps a single SMTP connection open and reuses it for
+  every message it sends, reconnecting only when the server drops it
+- a per-domain semaphore caps how many messages go to one provider at once
+- temporary failures (4xx replies, dropped connections) are retried with
+  exponential backoff and jitter; permanent 5xx failures and messages that
+  run out of attempts are marked failed
+- when a thread cannot connect or log in at all, its remaining messages go
+  back to pending with backoff instead of being counted against each message
+
+The loadtest subcommand runs the whole pipeline against a local SMTP sink,
+for example `python -m aiosmtpd -n -l localhost:8025`, and reports delivery
+throughput.
+
+Usage:
+    python email_worker.py run [--threads 4] [--per-domain 2] [--once]
+    python email_worker.py loadtest --messages 2000 [--smtp-port 8025] [--start-sink]
+    python email_worker.py stats
+"""
+
+import argparse
+import os
+import random
+import smtplib
+import socket
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from create_user import get_db_config
+from database_setup import EMAIL_OUTBOX_SQL
+
+CLAIM_SQL = """
+    UPDATE email_outbox o
+    SET status = 'sending', attempts = o.attempts + 1,
+        "lockedUntil" = now() + make_interval(secs => %(lease)s)
+    FROM (
+        SELECT id FROM email_outbox
+        WHERE (status = 'pending' AND "nextAttemptAt" <= now())
+           OR (status = 'sending' AND "lockedUntil" < now())
+        ORDER BY "nextAttemptAt"
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    ) due
+    WHERE o.id = due.id
+    RETURNING o.id, o."toAddress", o."fromAddress", o.subject, o.html, o.text, o.attempts
+"""
+
+FINISH_SQL = """
+    UPDATE email_outbox o
+    SET status = v.status,
+        attempts = o.attempts - v.refund,
+        "sentAt" = CASE WHEN v.status = 'sent' THEN now() ELSE o."sentAt" END,
+        "nextAttemptAt" = now() + make_interval(secs => v.delay),
+        "lastError" = v.error,
+        "lockedUntil" = NULL
+    FROM (VALUES %s) AS v(id, status, delay, error, refund)
+    WHERE o.id = v.id::uuid
+"""
+
+
+def connect():
+    cfg = get_db_config()
+    return psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+
+
+def ensure_schema(conn):
+    with conn.cursor() as cur:
+        cur.execute(EMAIL_OUTBOX_SQL)
+    conn.commit()
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+def recipient_domain(address: str) -> str:
+    return address.rsplit("@", 1)[-1].strip().lower()
+
+
+class SmtpConfig:
+    def __init__(self, host: str, port: int, user: Optional[str], password: Optional[str],
+                 use_tls: bool, ssl: bool, sender: str, timeout: float):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.ssl = ssl
+        self.sender = sender
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls, args) -> "SmtpConfig":
+        user = os.getenv("SMTP_USER")
+        return cls(
+            host=args.smtp_host or os.getenv("SMTP_HOST", "localhost"),
+            port=args.smtp_port or int(os.getenv("SMTP_PORT", "25")),
+            user=None if args.no_auth else user,
+            password=None if args.no_auth else os.getenv("SMTP_PASS"),
+            use_tls=not args.no_tls,
+            ssl=os.getenv("SMTP_SECURE") == "true",
+            sender=f'"School Management System" <{user or "no-reply@localhost"}>',
+            timeout=args.smtp_timeout,
+        )
+
+
+class SmtpUnavailable(Exception):
+    """The SMTP server could not be reached or refused the login; says nothing about the message."""
+
+
+class SmtpSession:
+    """One SMTP connection, opened lazily and reused across messages."""
+
+    def __init__(self, config: SmtpConfig, metrics: "DeliveryMetrics"):
+        self.config = config
+        self.metrics = metrics
+        self.client: Optional[smtplib.SMTP] = None
+
+    def _open(self):
+        cfg = self.config
+        client = None
+        try:
+            if cfg.ssl:
+                client = smtplib.SMTP_SSL(cfg.host, cfg.port, timeout=cfg.timeout)
+            else:
+                client = smtplib.SMTP(cfg.host, cfg.port, timeout=cfg.timeout)
+                client.ehlo()
+                # Upgrade like nodemailer does when the server offers STARTTLS.
+                if cfg.use_tls and client.has_extn("starttls"):
+                    client.starttls()
+                    client.ehlo()
+            if cfg.user and cfg.password:
+                client.login(cfg.user, cfg.password)
+        except (smtplib.SMTPException, OSError) as e:
+            if client is not None:
+                client.close()
+            if isinstance(e, smtplib.SMTPResponseException):
+                raise SmtpUnavailable(f"{e.smtp_code} {e.smtp_error!r}") from e
+            raise SmtpUnavailable(str(e) or e.__class__.__name__) from e
+        self.client = client
+        self.metrics.add("connections")
+
+    def send(self, message: EmailMessage):
+        if self.client is None:
+            self._open()
+        try:
+            self.client.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # The server closed an idle connection; reconnect once and retry.
+            self.client = None
+            self._open()
+            self.client.send_message(message)
+
+    def reset(self):
+        """RSET after a refused transaction so the next message starts clean; drop the connection if that fails."""
+        if self.client is None:
+            return
+        try:
+            self.client.rset()
+        except (smtplib.SMTPException, OSError):
+            self.close()
+
+    def close(self):
+        if self.client is not None:
+            try:
+                self.client.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.client = None
+
+
+class DeliveryMetrics:
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.by_domain: Dict[str, Counter] = defaultdict(Counter)
+        self.latencies: List[float] = []
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, key: str, amount: int = 1, domain: Optional[str] = None, latency: Optional[float] = None):
+        with self._lock:
+            self.counts[key] += amount
+            if domain:
+                self.by_domain[domain][key] += amount
+            if latency is not None:
+                self.latencies.append(latency)
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        sent = self.counts["sent"]
+        print(f"\n📊 Delivery metrics ({elapsed:.2f}s)")
+        print(f"   - sent: {sent} ({sent / elapsed if elapsed else 0:.1f} msg/s)")
+        print(f"   - retried: {self.counts['retried']}, failed: {self.counts['failed']}, "
+              f"deferred (SMTP unavailable): {self.counts['deferred']}")
+        print(f"   - SMTP connections opened: {self.counts['connections']}")
+        if self.latencies:
+            latencies = sorted(self.latencies)
+            p50 = latencies[len(latencies) // 2] * 1000
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+            print(f"   - per-message send time: p50 {p50:.1f} ms, p95 {p95:.1f} ms")
+        for domain, counts in sorted(self.by_domain.items(), key=lambda item: -item[1]["sent"])[:10]:
+            print(f"   - {domain}: {dict(counts)}")
+
+
+class DeliveryWorker:
+    """
+    Claims batches from the outbox and fans them out to sender threads.
+    Each sender thread owns one SmtpSession for the worker's lifetime.
+    """
+
+    def __init__(self, smtp: SmtpConfig, threads: int, per_domain: int, batch_size: int,
+                 max_attempts: int, backoff_base: float, backoff_cap: float, lease: int):
+        self.smtp = smtp
+        self.threads = threads
+        self.per_domain = per_domain
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.lease = lease
+        self.metrics = DeliveryMetrics()
+        self._domain_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._slots_lock = threading.Lock()
+        self._sessions = [SmtpSession(smtp, self.metrics) for _ in range(threads)]
+
+    def _domain_slot(self, domain: str) -> threading.BoundedSemaphore:
+        with self._slots_lock:
+            if domain not in self._domain_slots:
+                self._domain_slots[domain] = threading.BoundedSemaphore(self.per_domain)
+            return self._domain_slots[domain]
+
+    def _build_message(self, row: Dict[str, Any]) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = row["fromAddress"] or self.smtp.sender
+        message["To"] = row["toAddress"]
+        message["Subject"] = row["subject"]
+        message.set_content(row["text"] or "")
+        if row["html"]:
+            message.add_alternative(row["html"], subtype="html")
+        return message
+
+    def _deliver(self, session: SmtpSession, row: Dict[str, Any]) -> tuple:
+        """Send one message and return its (id, status, delay, error) outcome."""
+        domain = recipient_domain(row["toAddress"])
+        with self._domain_slot(domain):
+            started = time.perf_counter()
+            try:
+                session.send(self._build_message(row))
+            except smtplib.SMTPResponseException as e:
+                session.reset()
+                permanent = 500 <= e.smtp_code < 600
+                return self._failure(row, domain, f"{e.smtp_code} {e.smtp_error!r}", permanent)
+            except smtplib.SMTPRecipientsRefused as e:
+                session.reset()
+                return self._failure(row, domain, f"recipient refused: {e.recipients}", True)
+            except (smtplib.SMTPException, OSError, socket.timeout) as e:
+                session.close()
+                return self._failure(row, domain, str(e) or e.__class__.__name__, False)
+            self.metrics.add("sent", domain=domain, latency=time.perf_counter() - started)
+            return (str(row["id"]), "sent", 0, None, 0)
+
+    def _failure(self, row: Dict[str, Any], domain: str, error: str, permanent: bool) -> tuple:
+        if permanent or row["attempts"] >= self.max_attempts:
+            self.metrics.add("failed", domain=domain)
+            return (str(row["id"]), "failed", 0, error[:1000], 0)
+        self.metrics.add("retried", domain=domain)
+        delay = backoff_delay(row["attempts"], self.backoff_base, self.backoff_cap)
+        return (str(row["id"]), "pending", delay, error[:1000], 0)
+
+    def _defer(self, row: Dict[str, Any], error: str) -> tuple:
+        """Put a message back without counting the attempt: the server, not the message, failed."""
+        self.metrics.add("deferred", domain=recipient_domain(row["toAddress"]))
+        delay = backoff_delay(max(row["attempts"] - 1, 1), self.backoff_base, self.backoff_cap)
+        return (str(row["id"]), "pending", delay, f"SMTP unavailable: {error}"[:1000], 1)
+
+    def _send_batch(self, rows: List[Dict[str, Any]]) -> List[tuple]:
+        # Spread each domain's messages over the threads round-robin.
+        rows = sorted(rows, key=lambda row: recipient_domain(row["toAddress"]))
+        shards: List[List[Dict[str, Any]]] = [[] for _ in range(self.threads)]
+        for index, row in enumerate(rows):
+            shards[index % self.threads].append(row)
+
+        results: List[tuple] = []
+        lock = threading.Lock()
+
+        def run(session: SmtpSession, shard: List[Dict[str, Any]]):
+            outcomes = []
+            unavailable = None
+            for row in shard:
+                if unavailable is None:
+                    try:
+                        outcomes.append(self._deliver(session, row))
+                        continue
+                    except SmtpUnavailable as e:
+                        # Don't retry the connection for every message in the shard
+                        unavailable = str(e)
+                outcomes.append(self._defer(row, unavailable))
+            with lock:
+                results.extend(outcomes)
+
+        threads = [threading.Thread(target=run, args=(session, shard))
+                   for session, shard in zip(self._sessions, shards) if shard]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def run(self, conn, once: bool = False, idle_sleep: float = 2.0):
+        """Drain the outbox; with once=True, stop as soon as nothing is due."""
+        try:
+            while True:
+                with conn.cursor() as cur:
+                    cur.execute(CLAIM_SQL, {"limit": self.batch_size, "lease": self.lease})
+                    columns = [column.name for column in cur.description]
+                    rows = [dict(zip(columns, values)) for values in cur.fetchall()]
+                conn.commit()
+
+                if not rows:
+                    if once:
+                        return
+                    time.sleep(idle_sleep)
+                    continue
+
+                results = self._send_batch(rows)
+                with conn.cursor() as cur:
+                    execute_values(cur, FINISH_SQL, results, template="(%s, %s, %s::float8, %s, %s)")
+                conn.commit()
+                print(f"   ... {self.metrics.counts['sent']} sent, "
+                      f"{self.metrics.counts['retried']} retried, {self.metrics.counts['failed']} failed")
+                if self.metrics.counts["deferred"]:
+                    print(f"⚠️  SMTP unavailable, {self.metrics.counts['deferred']} deferred so far")
+        finally:
+            for session in self._sessions:
+                session.close()
+
+
+# --- Load test against a local SMTP sink -------------------------------------
+
+LOADTEST_SUBJECT = "[outbox loadtest]"
+LOADTEST_DOMAINS = ["school.test", "gmail.test", "outlook.test", "yahoo.test", "parents.test"]
+
+
+def start_local_sink(host: str, port: int):
+    """Start an in-process aiosmtpd sink, if aiosmtpd is installed."""
+    try:
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.handlers import Sink
+    except ImportError:
+        print("❌ aiosmtpd is not installed (pip install aiosmtpd), "
+              f"or start a sink yourself: python -m aiosmtpd -n -l {host}:{port}")
+        return None
+    controller = Controller(Sink(), hostname=host, port=port)
+    controller.start()
+    print(f"📭 Local SMTP sink listening on {host}:{port}")
+    return controller
+
+
+def loadtest(args) -> int:
+    sink = start_local_sink(args.smtp_host or "localhost", args.smtp_port) if args.start_sink else None
+    if args.start_sink and sink is None:
+        return 1
+
+    conn = connect()
+    try:
+        ensure_schema(conn)
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM email_outbox WHERE subject LIKE %s", (LOADTEST_SUBJECT + "%",))
+            rows = [
+                (f"user{n}@{random.choice(LOADTEST_DOMAINS)}", f"{LOADTEST_SUBJECT} message {n}",
+                 f"<p>Load test message {n}</p>", f"Load test message {n}")
+                for n in range(args.messages)
+            ]
+            execute_values(cur, 'INSERT INTO email_outbox ("toAddress", subject, html, text) VALUES %s',
+                           rows, page_size=1000)
+        conn.commit()
+        print(f"📥 Queued {args.messages} messages across {len(LOADTEST_DOMAINS)} domains")
+
+        smtp = SmtpConfig(args.smtp_host or "localhost", args.smtp_port, None, None, False, False,
+                          '"School Management System" <loadtest@localhost>', args.smtp_timeout)
+        worker = DeliveryWorker(smtp, args.threads, args.per_domain, args.batch_size,
+                                args.max_attempts, args.backoff_base, args.backoff_cap, args.lease)
+        worker.run(conn, once=True)
+        worker.metrics.report()
+
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM email_outbox WHERE subject LIKE %s", (LOADTEST_SUBJECT + "%",))
+        conn.commit()
+    finally:
+        conn.close()
+        if sink is not None:
+            sink.stop()
+    return 0
+
+
+def print_stats(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT status, count(*), min("createdAt"), max(attempts)
+            FROM email_outbox GROUP BY status ORDER BY status
+        """)
+        rows = cur.fetchall()
+    conn.commit()
+    if not rows:
+        print("📭 Outbox is empty")
+        return
+    print("📬 Outbox status:")
+    for status, count, oldest, attempts in rows:
+        print(f"   - {status}: {count} (oldest {oldest:%Y-%m-%d %H:%M}, max attempts {attempts})")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Deliver queued emails from the email_outbox table")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_delivery_options(p):
+        p.add_argument("--threads", type=int, default=4, help="Sender threads (one SMTP connection each)")
+        p.add_argument("--per-domain", type=int, default=2, help="Concurrent sends per recipient domain")
+        p.add_argument("--batch-size", type=int, default=200)
+        p.add_argument("--max-attempts", type=int, default=5)
+        p.add_argument("--backoff-base", type=float, default=30.0, help="Seconds before the first retry")
+        p.add_argument("--backoff-cap", type=float, default=3600.0)
+        p.add_argument("--lease", type=int, default=300, help="Seconds before a stuck 'sending' row is reclaimed")
+        p.add_argument("--smtp-host")
+        p.add_argument("--smtp-port", type=int)
+        p.add_argument("--smtp-timeout", type=float, default=30.0)
+
+    run = sub.add_parser("run", help="Drain the outbox")
+    add_delivery_options(run)
+    run.add_argument("--once", action="store_true", help="Exit when nothing is due instead of polling")
+    run.add_argument("--no-tls", action="store_true", help="Never upgrade with STARTTLS")
+    run.add_argument("--no-auth", action="store_true", help="Do not log in (local relays)")
+
+    load = sub.add_parser("loadtest", help="Measure throughput against a local SMTP sink")
+    add_delivery_options(load)
+    load.add_argument("--messages", type=int, default=2000)
+    load.add_argument("--start-sink", action="store_true", help="Start an in-process aiosmtpd sink")
+
+    sub.add_parser("stats", help="Show outbox counts by status")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "loadtest":
+        args.smtp_port = args.smtp_port or 8025
+        return loadtest(args)
+
+    conn = connect()
+    try:
+        ensure_schema(conn)
+        if args.command == "stats":
+            print_stats(conn)
+            return 0
+        worker = DeliveryWorker(SmtpConfig.from_env(args), args.threads, args.per_domain, args.batch_size,
+                                args.max_attempts, args.backoff_base, args.backoff_cap, args.lease)
+        print(f"🚚 Delivering via {worker.smtp.host}:{worker.smtp.port} with {args.threads} connections...")
+        try:
+            worker.run(conn, once=args.once)
+        finally:
+            worker.metrics.report()
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Delivery worker stopped. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Bulk Enrollment Engine for School Management System
+
+Processes queued enrolment requests in batches instead of one HTTP request per
+student. Workers claim pending rows from "enrollment_requests" with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of them can drain the queue
+side by side without blocking on each other's claims. Capacity is decided for
+a whole batch in one set-based statement:
+
+- requests are ranked per course by "requestedAt"
+- the first (maxCapacity - currentEnrollment) become enrolments
+- the next (waitlistCapacity - current waitlist) are waitlisted
+- the rest are rejected, and repeats of an existing enrolment are duplicates
+
+"currentEnrollment" is bumped in the same statement that inserts into
+course_enrollments, with the touched course rows locked in id order so
+concurrent batches never deadlock.
+
+Usage:
+    python enrollment_engine.py process [--workers 4] [--batch-size 200]
+    python enrollment_engine.py simulate --students 3000 --courses 40 [--workers 8]
+    python enrollment_engine.py cleanup
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import psycopg2
+
+from create_user import get_db_config
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS course_enrollments (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    "courseId" UUID NOT NULL,
+    "studentId" UUID NOT NULL,
+    "createdAt" TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS course_enrollments_course_id_student_id
+    ON course_enrollments ("courseId", "studentId");
+
+CREATE TABLE IF NOT EXISTS enrollment_requests (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    "courseId" UUID NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    "studentId" UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'enrolled', 'waitlisted', 'rejected', 'duplicate')),
+    "requestedAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    "processedAt" TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS enrollment_requests_pending
+    ON enrollment_requests ("requestedAt", id) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS enrollment_requests_waitlist
+    ON enrollment_requests ("courseId", "requestedAt") WHERE status = 'waitlisted';
+"""
+
+CLAIM_SQL = """
+    SELECT id, "courseId"
+    FROM enrollment_requests
+    WHERE status = 'pending'
+    ORDER BY "requestedAt", id
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+"""
+
+LOCK_COURSES_SQL = """
+    SELECT id FROM courses WHERE id = ANY(%s::uuid[]) ORDER BY id FOR UPDATE
+"""
+
+DECIDE_SQL = """
+WITH claimed AS (
+    SELECT DISTINCT ON (r."courseId", r."studentId")
+           r.id, r."courseId", r."studentId", r."requestedAt"
+    FROM enrollment_requests r
+    WHERE r.id = ANY(%(ids)s::uuid[])
+      AND NOT EXISTS (
+          SELECT 1 FROM course_enrollments e
+          WHERE e."courseId" = r."courseId" AND e."studentId" = r."studentId"
+      )
+    ORDER BY r."courseId", r."studentId", r."requestedAt", r.id
+),
+ranked AS (
+    SELECT claimed.*,
+           row_number() OVER (PARTITION BY "courseId" ORDER BY "requestedAt", id) AS rank
+    FROM claimed
+),
+room AS (
+    SELECT c.id,
+           CASE WHEN c."enrollmentOpen" THEN GREATEST(c."maxCapacity" - c."currentEnrollment", 0) ELSE 0 END AS seats,
+           CASE WHEN c."enrollmentOpen" THEN GREATEST(c."waitlistCapacity" - (
+               SELECT count(*) FROM enrollment_requests w
+               WHERE w."courseId" = c.id AND w.status = 'waitlisted'
+           ), 0) ELSE 0 END AS waitlist
+    FROM courses c
+    WHERE c.id IN (SELECT "courseId" FROM claimed)
+),
+decided AS (
+    SELECT r.id, r."courseId", r."studentId",
+           CASE WHEN r.rank <= room.seats THEN 'enrolled'
+                WHEN r.rank <= room.seats + room.waitlist THEN 'waitlisted'
+                ELSE 'rejected' END AS outcome
+    FROM ranked r JOIN room ON room.id = r."courseId"
+),
+enrolled AS (
+    INSERT INTO course_enrollments (id, "courseId", "studentId", "createdAt", "updatedAt")
+    SELECT gen_random_uuid(), "courseId", "studentId", now(), now()
+    FROM decided WHERE outcome = 'enrolled'
+    ON CONFLICT ("courseId", "studentId") DO NOTHING
+    RETURNING "courseId", "studentId"
+),
+bumped AS (
+    UPDATE courses c
+    SET "currentEnrollment" = c."currentEnrollment" + n.added, "updatedAt" = now()
+    FROM (SELECT "courseId", count(*) AS added FROM enrolled GROUP BY "courseId") n
+    WHERE c.id = n."courseId"
+    RETURNING c.id
+)
+-- An enrolment that ON CONFLICT skipped (the student got in through another
+-- path meanwhile) took no seat, so it is a duplicate rather than 'enrolled'
+UPDATE enrollment_requests r
+SET status = CASE WHEN d.outcome = 'enrolled' AND e."studentId" IS NULL THEN 'duplicate'
+                  ELSE COALESCE(d.outcome, 'duplicate') END,
+    "processedAt" = now()
+FROM unnest(%(ids)s::uuid[]) AS ids(id)
+LEFT JOIN decided d ON d.id = ids.id
+LEFT JOIN enrolled e ON e."courseId" = d."courseId" AND e."studentId" = d."studentId"
+WHERE r.id = ids.id
+RETURNING r.status
+"""
+
+
+def connect():
+    cfg = get_db_config()
+    return psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+
+
+def ensure_schema(conn):
+    """Create the request queue (and course_enrollments if Sequelize hasn't yet)."""
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA_SQL)
+    conn.commit()
+
+
+def enqueue_requests(conn, requests: List[tuple]) -> int:
+    """Queue (courseId, studentId) pairs in one multi-row INSERT."""
+    if not requests:
+        return 0
+    with conn.cursor() as cur:
+        values = ",".join(cur.mogrify("(%s::uuid, %s::uuid, clock_timestamp())", r).decode() for r in requests)
+        cur.execute(f'INSERT INTO enrollment_requests ("courseId", "studentId", "requestedAt") VALUES {values}')
+    conn.commit()
+    return len(requests)
+
+
+def process_batch(conn, batch_size: int) -> Optional[Dict[str, Any]]:
+    """
+    Claim and decide one batch in a single short transaction.
+    Returns None when the queue is empty.
+    """
+    started = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(CLAIM_SQL, (batch_size,))
+        claimed = cur.fetchall()
+        if not claimed:
+            conn.rollback()
+            return None
+
+        ids = [str(request_id) for request_id, _ in claimed]
+        course_ids = sorted({str(course_id) for _, course_id in claimed})
+
+        lock_started = time.perf_counter()
+        cur.execute(LOCK_COURSES_SQL, (course_ids,))
+        lock_wait = time.perf_counter() - lock_started
+
+        cur.execute(DECIDE_SQL, {"ids": ids})
+        outcomes: Dict[str, int] = {}
+        for (status,) in cur.fetchall():
+            outcomes[status] = outcomes.get(status, 0) + 1
+    conn.commit()
+
+    return {
+        "requests": len(ids),
+        "courses": len(course_ids),
+        "outcomes": outcomes,
+        "lock_wait": lock_wait,
+        "duration": time.perf_counter() - started,
+    }
+
+
+class WorkerPool:
+    """Run N workers, each with its own connection, until the queue is drained."""
+
+    def __init__(self, workers: int, batch_size: int):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batches: List[Dict[str, Any]] = []
+        self.errors: List[str] = []
+        self._lock = threading.Lock()
+
+    def _worker(self):
+        conn = connect()
+        try:
+            while True:
+                try:
+                    result = process_batch(conn, self.batch_size)
+                except psycopg2.errors.DeadlockDetected as e:
+                    conn.rollback()
+                    with self._lock:
+                        self.errors.append(str(e).strip())
+                    continue
+                if result is None:
+                    break
+                with self._lock:
+                    self.batches.append(result)
+        except Exception as e:
+            with self._lock:
+                self.errors.append(str(e).strip())
+        finally:
+            conn.close()
+
+    def run(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return summarize(self.batches, elapsed, self.errors)
+
+
+def summarize(batches: List[Dict[str, Any]], elapsed: float, errors: List[str]) -> Dict[str, Any]:
+    total = sum(batch["requests"] for batch in batches)
+    outcomes: Dict[str, int] = {}
+    for batch in batches:
+        for status, count in batch["outcomes"].items():
+            outcomes[status] = outcomes.get(status, 0) + count
+    waits = sorted(batch["lock_wait"] * 1000 for batch in batches)
+
+    def percentile(values, pct):
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+    return {
+        "requests": total,
+        "batches": len(batches),
+        "elapsed": elapsed,
+        "throughput": total / elapsed if elapsed else 0.0,
+        "outcomes": outcomes,
+        "lock_wait_ms": {
+            "mean": statistics.fmean(waits) if waits else 0.0,
+            "p50": percentile(waits, 50),
+            "p95": percentile(waits, 95),
+            "max": waits[-1] if waits else 0.0,
+            "total": sum(waits),
+        },
+        "errors": errors,
+    }
+
+
+def print_summary(summary: Dict[str, Any]):
+    print(f"\n📊 Processed {summary['requests']} requests in {summary['batches']} batches "
+          f"({summary['elapsed']:.2f}s, {summary['throughput']:.0f} req/s)")
+    for status, count in sorted(summary["outcomes"].items()):
+        print(f"   - {status}: {count}")
+    waits = summary["lock_wait_ms"]
+    print(f"🔒 Course lock waits: mean {waits['mean']:.1f} ms, p50 {waits['p50']:.1f} ms, "
+          f"p95 {waits['p95']:.1f} ms, max {waits['max']:.1f} ms, total {waits['total']:.0f} ms")
+    if summary["errors"]:
+        print(f"⚠️  {len(summary['errors'])} worker errors, first: {summary['errors'][0]}")
+
+
+# --- Registration-day simulation -------------------------------------------
+
+SIM_EMAIL_DOMAIN = "enrollment-sim.local"
+SIM_COURSE_PREFIX = "SIM"
+
+
+def create_simulation_fixture(conn, students: int, courses: int, capacity: int) -> tuple:
+    """Create throwaway students and courses that cleanup() can remove again."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM users WHERE role IN ('teacher', 'admin') ORDER BY role DESC LIMIT 1")
+        instructor = cur.fetchone()
+        if not instructor:
+            raise RuntimeError("need at least one teacher or admin user to own simulated courses")
+
+        cur.execute("""
+            INSERT INTO users ("firstName", "lastName", email, password, role)
+            SELECT 'Sim', 'Student ' || n, 'student' || n || '@' || %s, '!', 'student'
+            FROM generate_series(1, %s) AS n
+            RETURNING id
+        """, (SIM_EMAIL_DOMAIN, students))
+        student_ids = [str(row[0]) for row in cur.fetchall()]
+
+        cur.execute("""
+            INSERT INTO courses (code, title, description, credits, duration, level, grade, category,
+                                 "maxCapacity", "waitlistCapacity", "academicYear", semester,
+                                 "instructorId", tuition, status, "enrollmentOpen")
+            SELECT %s || n, 'Simulated Course ' || n, 'Registration-day simulation', 3, 16,
+                   'beginner', '10', 'core', %s, 10, 'sim', 'fall', %s, 0, 'active', true
+            FROM generate_series(1, %s) AS n
+            RETURNING id
+        """, (SIM_COURSE_PREFIX + "-", capacity, instructor[0], courses))
+        course_ids = [str(row[0]) for row in cur.fetchall()]
+    conn.commit()
+    return student_ids, course_ids
+
+
+def burst_requests(student_ids: List[str], course_ids: List[str], per_student: int,
+                   skew: float, seed: int) -> List[tuple]:
+    """
+    Each student asks for `per_student` distinct courses; course popularity
+    follows a Zipf-like curve so a handful of courses get most of the demand.
+    """
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) ** skew for rank in range(len(course_ids))]
+    requests = []
+    for student_id in student_ids:
+        picks = set()
+        while len(picks) < min(per_student, len(course_ids)):
+            picks.add(rng.choices(course_ids, weights=weights)[0])
+        requests.extend((course_id, student_id) for course_id in picks)
+    rng.shuffle(requests)
+    return requests
+
+
+def cleanup(conn):
+    """Remove everything the simulation created."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            DELETE FROM course_enrollments
+            WHERE "courseId" IN (SELECT id FROM courses WHERE code LIKE %s)
+        """, (SIM_COURSE_PREFIX + "-%",))
+        cur.execute("DELETE FROM courses WHERE code LIKE %s", (SIM_COURSE_PREFIX + "-%",))
+        cur.execute("DELETE FROM users WHERE email LIKE %s", ("%@" + SIM_EMAIL_DOMAIN,))
+        removed = cur.rowcount
+    conn.commit()
+    print(f"🧹 Removed simulation data ({removed} simulated students)")
+
+
+def simulate(args) -> int:
+    print("⚠️  The simulation writes students, courses and enrolments into the configured database.")
+    if not args.yes:
+        confirm = input("Run it against this database? (yes/no): ").strip().lower()
+        if confirm != 'yes':
+            print("❌ Simulation cancelled.")
+            return 1
+
+    conn = connect()
+    try:
+        ensure_schema(conn)
+        cleanup(conn)
+        student_ids, course_ids = create_simulation_fixture(conn, args.students, args.courses, args.capacity)
+        requests = burst_requests(student_ids, course_ids, args.per_student, args.skew, args.seed)
+        enqueue_started = time.perf_counter()
+        for start in range(0, len(requests), 1000):
+            enqueue_requests(conn, requests[start:start + 1000])
+        print(f"📥 Queued {len(requests)} requests from {len(student_ids)} students for "
+              f"{len(course_ids)} courses in {time.perf_counter() - enqueue_started:.2f}s")
+    finally:
+        conn.close()
+
+    print(f"🏃 Draining with {args.workers} workers, batch size {args.batch_size}...")
+    summary = WorkerPool(args.workers, args.batch_size).run()
+    print_summary(summary)
+
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT count(*) FROM courses c
+                WHERE c.code LIKE %s AND (
+                    c."currentEnrollment" > c."maxCapacity"
+                    OR c."currentEnrollment" <> (SELECT count(*) FROM course_enrollments e WHERE e."courseId" = c.id)
+                )
+            """, (SIM_COURSE_PREFIX + "-%",))
+            broken = cur.fetchone()[0]
+        if broken:
+            print(f"❌ {broken} courses have an inconsistent or over-capacity enrolment count")
+        else:
+            print("✅ Every course stayed within capacity and matches course_enrollments")
+        if not args.keep:
+            cleanup(conn)
+    finally:
+        conn.close()
+    return 1 if broken else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Batch enrolment engine with waitlists")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    process = sub.add_parser("process", help="Drain the enrolment request queue")
+    process.add_argument("--workers", type=int, default=4)
+    process.add_argument("--batch-size", type=int, default=200)
+
+    sim = sub.add_parser("simulate", help="Model a registration-day burst")
+    sim.add_argument("--students", type=int, default=3000)
+    sim.add_argument("--courses", type=int, default=40)
+    sim.add_argument("--capacity", type=int, default=30)
+    sim.add_argument("--per-student", type=int, default=4)
+    sim.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for course popularity")
+    sim.add_argument("--workers", type=int, default=8)
+    sim.add_argument("--batch-size", type=int, default=200)
+    sim.add_argument("--seed", type=int, default=42)
+    sim.add_argument("--keep", action="store_true", help="Keep simulated data afterwards")
+    sim.add_argument("--yes", action="store_true", help="Skip the confirmation prompt")
+
+    sub.add_parser("cleanup", help="Remove data left behind by simulate --keep")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "simulate":
+        return simulate(args)
+
+    conn = connect()
+    try:
+        if args.command == "cleanup":
+            cleanup(conn)
+            return 0
+        ensure_schema(conn)
+    finally:
+        conn.close()
+
+    summary = WorkerPool(args.workers, args.batch_size).run()
+    print_summary(summary)
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Enrollment engine interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
@@ -112,7 +112,7 @@ def fix_database():
         cur.close()
         conn.close()
 
-if __name__ == "__main__":
+def main():
     print("🚀 Quick Database Fix")
     print("=" * 30)
     
@@ -121,3 +121,6 @@ if __name__ == "__main__":
         fix_database()
     else:
         print("❌ Cancelled.")
+
+if __name__ == "__main__":
+    main()
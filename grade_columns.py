@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Grade Column Maintenance for School Management System
+
+Installs, backfills and verifies the trigger that DatabaseSetup.create_grade_columns
+adds to grades: percentage and "letterGrade" are derived from score and
+"maxScore" on every insert or update, so bulk grade writes only carry raw
+scores and reads never recompute. grade_percentage() and grade_letter() are
+the single definition; this script uses them too.
+
+Rows written before the trigger existed (or by hand with it disabled) are
+corrected in keyset-paginated chunks of ids. Each chunk is one UPDATE in its
+own short transaction that only touches rows whose stored values differ, so
+the backfill can run on a live database and be re-run at any time.
+
+Usage:
+    python grade_columns.py install
+    python grade_columns.py backfill [--batch-size 5000]
+    python grade_columns.py verify [--fix] [--batch-size 5000]
+"""
+
+import argparse
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import psycopg2
+
+from create_user import get_db_config
+from database_setup import GRADE_COLUMNS_SQL
+
+DRIFTED = """
+    (g.percentage IS DISTINCT FROM grade_percentage(g.score, g."maxScore")
+     OR g."letterGrade" IS DISTINCT FROM grade_letter(g.score, g."maxScore"))
+"""
+
+# One round trip per chunk: the page of ids, then the drifted rows in it
+CHUNK_SQL = """
+    WITH page AS (
+        SELECT id FROM grades
+        WHERE %(last)s::uuid IS NULL OR id > %(last)s::uuid
+        ORDER BY id
+        LIMIT %(limit)s
+    ), drifted AS (
+        SELECT g.id FROM grades g JOIN page ON page.id = g.id
+        WHERE """ + DRIFTED + """
+    )
+    SELECT (SELECT id FROM page ORDER BY id DESC LIMIT 1), (SELECT count(*) FROM page),
+           (SELECT count(*) FROM drifted), (SELECT min(id::text) FROM drifted)
+"""
+
+FIX_CHUNK_SQL = """
+    WITH page AS (
+        SELECT id FROM grades
+        WHERE %(last)s::uuid IS NULL OR id > %(last)s::uuid
+        ORDER BY id
+        LIMIT %(limit)s
+    ), fixed AS (
+        UPDATE grades g
+        SET percentage = grade_percentage(g.score, g."maxScore"),
+            "letterGrade" = grade_letter(g.score, g."maxScore")
+        FROM page
+        WHERE g.id = page.id AND """ + DRIFTED + """
+        RETURNING g.id
+    )
+    SELECT (SELECT id FROM page ORDER BY id DESC LIMIT 1), (SELECT count(*) FROM page),
+           (SELECT count(*) FROM fixed), (SELECT min(id::text) FROM fixed)
+"""
+
+ZERO_MAX_SQL = """
+    SELECT count(*), min(id::text) FROM grades WHERE "maxScore" <= 0
+"""
+
+TRIGGER_SQL = """
+    SELECT tgenabled FROM pg_trigger
+    WHERE tgrelid = 'grades'::regclass AND tgname = 'grades_derive_columns'
+"""
+
+
+def connect():
+    cfg = get_db_config()
+    return psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+
+
+def install(conn):
+    with conn.cursor() as cur:
+        cur.execute(GRADE_COLUMNS_SQL)
+    conn.commit()
+    print("✅ Grade column functions and trigger installed")
+
+
+def trigger_state(conn) -> Optional[str]:
+    """None when the trigger is missing, else pg_trigger.tgenabled ('D' is disabled)."""
+    with conn.cursor() as cur:
+        cur.execute(TRIGGER_SQL)
+        row = cur.fetchone()
+    conn.commit()
+    return row[0] if row else None
+
+
+def iter_chunks(conn, batch_size: int, fix: bool):
+    """Yield (rows, drifted, example id) per chunk, each chunk its own transaction."""
+    last = None
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(FIX_CHUNK_SQL if fix else CHUNK_SQL, {"last": last, "limit": batch_size})
+            last, rows, drifted, example = cur.fetchone()
+        conn.commit()
+        if not rows:
+            return
+        yield rows, drifted, example
+
+
+def scan(conn, batch_size: int, fix: bool) -> Tuple[int, int, List[str]]:
+    checked = 0
+    drifted = 0
+    examples: List[str] = []
+    for rows, bad, example in iter_chunks(conn, batch_size, fix):
+        checked += rows
+        drifted += bad
+        if example and len(examples) < 5:
+            examples.append(example)
+        if checked % (batch_size * 20) < batch_size:
+            print(f"   ... {checked} grades checked")
+    return checked, drifted, examples
+
+
+def backfill(conn, batch_size: int):
+    if trigger_state(conn) is None:
+        print("⚠️  The grades trigger is not installed; run `python grade_columns.py install` first")
+    print("🔄 Backfilling grade percentage and letter grade...")
+    started = time.perf_counter()
+    checked, fixed, _ = scan(conn, batch_size, fix=True)
+    print(f"✅ Updated {fixed} of {checked} grades in {time.perf_counter() - started:.2f}s")
+
+
+def verify(conn, batch_size: int, fix: bool) -> int:
+    state = trigger_state(conn)
+    if state is None:
+        print("⚠️  The grades trigger is not installed; new writes are not derived")
+    elif state == "D":
+        print("⚠️  The grades trigger is disabled; new writes are not derived")
+    print("🔍 Verifying grade percentage and letter grade...")
+    checked, drifted, examples = scan(conn, batch_size, fix)
+    with conn.cursor() as cur:
+        cur.execute(ZERO_MAX_SQL)
+        zero_max, zero_example = cur.fetchone()
+    conn.commit()
+    if zero_max:
+        print(f"⚠️  {zero_max} grades have maxScore <= 0 (derived as 0%, F), e.g. {zero_example}; correct them by hand")
+
+    if drifted == 0:
+        print(f"✅ All {checked} grades match their score and maxScore")
+    elif fix:
+        print(f"🔧 Corrected {drifted} of {checked} grades")
+    else:
+        print(f"❌ {drifted} of {checked} grades have stale derived columns, e.g. {', '.join(examples)}"
+              " (re-run with --fix)")
+    trigger_ok = state not in (None, "D")
+    return 0 if trigger_ok and (drifted == 0 or fix) else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Install, backfill and verify the derived grade columns")
+    parser.add_argument("command", choices=["install", "backfill", "verify"])
+    parser.add_argument("--batch-size", type=int, default=5000, help="Grades per transaction")
+    parser.add_argument("--fix", action="store_true", help="With verify: correct drifted grades")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        if args.command == "install":
+            install(conn)
+        elif args.command == "backfill":
+            backfill(conn, args.batch_size)
+        else:
+            return verify(conn, args.batch_size, args.fix)
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+iCalendar Feed Generator for School Management System
+
+Calendar apps poll a subscribed feed every few minutes for every student
+and parent. Instead of answering each poll with role-filtered queries, this
+generator writes one .ics file per user into CALENDAR_FEED_PATH
+(./calendar_feeds by default), which the backend serves as static files
+under /calendar/<token>.ics with ETag and Last-Modified, so a poll is a file
+read and an unchanged feed is a 304.
+
+A feed holds:
+
+- events: public ones for everybody, others for the organizer and the
+  attendees (and the attendees' parents); admins get all of them
+- tests ("Tests".conductDate): upcoming/active ones for students and
+  parents, a teacher's own ones for the teacher, all active ones for admins
+- assignments (dueDate): published ones for the students enrolled in the
+  course, their parents and the course instructor
+
+Runs are incremental. One catalog round trip compares each source table's
+row count and max("updatedAt") with the last run and stops there when
+nothing changed. Otherwise rows updated since the watermark (and deleted
+rows) are mapped to the users who could see them before or after the
+change, and only those feeds are rendered. A feed file is only replaced
+when its content changed, so its ETag stays stable. Run it from cron every
+minute or two, with a nightly --full to catch rows committed late with an
+old "updatedAt".
+
+The file name is an HMAC of the user id keyed with CALENDAR_FEED_SECRET (or
+JWT_SECRET), so feed URLs can't be guessed; GET /api/events/calendar/feed
+returns the caller's URL.
+
+Usage:
+    python ical_feeds.py run [--full] [--output calendar_feeds]
+    python ical_feeds.py url <user-id>
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from create_user import get_db_config
+
+STATE_FILE = ".state.json"
+# Rows updated this long before the watermark are looked at again; re-rendering is harmless
+WATERMARK_OVERLAP = timedelta(minutes=5)
+PRODID = "-//School Management System//Calendar Feeds//EN"
+UID_DOMAIN = "school-management-system"
+
+USERS_SQL = """
+    SELECT id::text, role, "firstName", "lastName", "studentId", children, "isActive", "updatedAt"
+    FROM users
+"""
+
+EVENTS_SQL = """
+    SELECT id::text, title, description, location, "startDate", "endDate", "isPublic",
+           "organizerId"::text, attendees, "updatedAt"
+    FROM events
+"""
+
+TESTS_SQL = """
+    SELECT id::text, title, subject, topic, instructions, "conductDate", duration, status, "isActive",
+           "teacherId"::text, "updatedAt"
+    FROM {table}
+"""
+
+ASSIGNMENTS_SQL = """
+    SELECT a.id::text, a.title, a.description, a."dueDate", a."isPublished", a."courseId"::text,
+           c.code AS "courseCode", a."updatedAt"
+    FROM assignments a LEFT JOIN courses c ON c.id = a."courseId"
+"""
+
+COURSES_SQL = """SELECT id::text, "instructorId"::text, code FROM courses"""
+
+ENROLLMENTS_SQL = """SELECT "courseId"::text, "studentId"::text FROM course_enrollments"""
+
+
+def connect():
+    cfg = get_db_config()
+    return psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+
+
+def feed_secret() -> bytes:
+    secret = os.getenv("CALENDAR_FEED_SECRET") or os.getenv("JWT_SECRET")
+    if not secret:
+        raise RuntimeError("set CALENDAR_FEED_SECRET (or JWT_SECRET) to name the feed files")
+    return secret.encode("utf-8")
+
+
+def feed_token(user_id: str, secret: bytes) -> str:
+    """Same derivation as feedToken() in server/routes/events.js."""
+    return hmac.new(secret, user_id.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+
+def source_tables(cur) -> Dict[str, str]:
+    """Source name -> table, for the tables this database has. The app's tests live in "Tests"."""
+    cur.execute("""
+        SELECT to_regclass('public."Tests"') IS NOT NULL, to_regclass('public.tests') IS NOT NULL,
+               to_regclass('public.course_enrollments') IS NOT NULL
+    """)
+    quoted_tests, lower_tests, enrollments = cur.fetchone()
+    tables = {"users": "users", "events": "events", "assignments": "assignments", "courses": "courses"}
+    if quoted_tests or lower_tests:
+        tables["tests"] = '"Tests"' if quoted_tests else "tests"
+    if enrollments:
+        tables["enrollments"] = "course_enrollments"
+    return tables
+
+
+def source_stats(cur, tables: Dict[str, str]) -> Dict[str, List]:
+    """Row count and max("updatedAt") of every source in one round trip."""
+    cur.execute(" UNION ALL ".join(
+        f"""SELECT '{name}', count(*), max("updatedAt")::text FROM {table}""" for name, table in sorted(tables.items())))
+    return {name: [count, latest] for name, count, latest in cur.fetchall()}
+
+
+class Directory:
+    """Users, parents, enrolments and instructors: who is in which audience."""
+
+    def __init__(self, users: List[dict], courses: List[dict], enrollments: List[dict]):
+        self.users = {user["id"]: user for user in users}
+        by_code = {user["studentId"]: user["id"] for user in users if user["studentId"]}
+        self.parents: Dict[str, Set[str]] = defaultdict(set)
+        self.children: Dict[str, Set[str]] = defaultdict(set)
+        for user in users:
+            if user["role"] != "parent":
+                continue
+            for child in user["children"] or []:
+                code = child.get("studentId") if isinstance(child, dict) else child
+                child_id = by_code.get(code) or (code if code in self.users else None)
+                if child_id:
+                    self.parents[child_id].add(user["id"])
+                    self.children[user["id"]].add(child_id)
+        self.instructor = {course["id"]: course["instructorId"] for course in courses}
+        self.enrolled: Dict[str, Set[str]] = defaultdict(set)
+        for row in enrollments:
+            self.enrolled[row["courseId"]].add(row["studentId"])
+        self.by_role: Dict[str, Set[str]] = defaultdict(set)
+        for user in users:
+            self.by_role[user["role"]].add(user["id"])
+        self.cache: Dict[str, Set[str]] = {}
+
+    def with_parents(self, user_ids: Iterable[str]) -> Set[str]:
+        result = set(user_ids)
+        for user_id in list(result):
+            result |= self.parents.get(user_id, set())
+        return result
+
+    def members(self, audience: str) -> Set[str]:
+        if audience not in self.cache:
+            self.cache[audience] = self._members(audience)
+        return self.cache[audience]
+
+    def _members(self, audience: str) -> Set[str]:
+        kind, _, key = audience.partition(":")
+        if kind == "all":
+            return set(self.users)
+        if kind == "role":
+            return set(self.by_role.get(key, set()))
+        if kind == "students":
+            return self.with_parents(self.by_role.get("student", set()))
+        if kind == "user":
+            return self.with_parents([key]) if key in self.users else set()
+        if kind == "course":
+            members = self.with_parents(self.enrolled.get(key, set()))
+            if self.instructor.get(key):
+                members.add(self.instructor[key])
+            return members
+        return set()
+
+
+def event_audiences(row: dict) -> List[str]:
+    if row["isPublic"]:
+        return ["all"]
+    audiences = ["role:admin"]
+    if row["organizerId"]:
+        audiences.append(f"user:{row['organizerId']}")
+    for attendee in row["attendees"] or []:
+        attendee_id = (attendee.get("userId") or attendee.get("id")) if isinstance(attendee, dict) else attendee
+        if attendee_id:
+            audiences.append(f"user:{attendee_id}")
+    return audiences
+
+
+def test_audiences(row: dict) -> List[str]:
+    if not row["isActive"]:
+        return []
+    audiences = ["role:admin"]
+    if row["teacherId"]:
+        audiences.append(f"user:{row['teacherId']}")
+    if row["status"] in ("upcoming", "active"):
+        audiences.append("students")
+    return audiences
+
+
+def assignment_audiences(row: dict) -> List[str]:
+    return [f"course:{row['courseId']}"] if row["isPublished"] and row["courseId"] else []
+
+
+def ical_text(value) -> str:
+    text = str(value or "")
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def ical_time(value: datetime) -> str:
+    # Timestamps without a zone are stored in UTC by the backend
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def fold(line: str) -> str:
+    """Fold content lines at 75 octets (RFC 5545 3.1)."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    parts, current = [], b""
+    for char in line:
+        piece = char.encode("utf-8")
+        if len(current) + len(piece) > (75 if not parts else 74):
+            parts.append(current.decode("utf-8"))
+            current = b""
+        current += piece
+    parts.append(current.decode("utf-8"))
+    return "\r\n ".join(parts)
+
+
+def render_item(source: str, row: dict) -> List[str]:
+    lines = ["BEGIN:VEVENT", f"UID:{source}-{row['id']}@{UID_DOMAIN}", f"DTSTAMP:{ical_time(row['updatedAt'])}"]
+    if source == "events":
+        lines += [f"DTSTART:{ical_time(row['startDate'])}", f"DTEND:{ical_time(row['endDate'])}",
+                  f"SUMMARY:{ical_text(row['title'])}"]
+        if row["description"]:
+            lines.append(f"DESCRIPTION:{ical_text(row['description'])}")
+        if row["location"]:
+            lines.append(f"LOCATION:{ical_text(row['location'])}")
+    elif source == "tests":
+        summary = f"Test: {row['title']} ({row['subject']})"
+        lines += [f"DTSTART:{ical_time(row['conductDate'])}", f"DURATION:PT{int(row['duration'] or 0)}M",
+                  f"SUMMARY:{ical_text(summary)}"]
+        details = "\n\n".join(part for part in (row["topic"], row["instructions"]) if part)
+        if details:
+            lines.append(f"DESCRIPTION:{ical_text(details)}")
+        lines.append("CATEGORIES:Test")
+    else:
+        course = f" ({row['courseCode']})" if row["courseCode"] else ""
+        lines += [f"DTSTART:{ical_time(row['dueDate'])}", f"SUMMARY:{ical_text('Due: ' + row['title'] + course)}"]
+        if row["description"]:
+            lines.append(f"DESCRIPTION:{ical_text(row['description'])}")
+        lines.append("CATEGORIES:Assignment")
+    lines.append("END:VEVENT")
+    return lines
+
+
+def start_of(source: str, row: dict) -> datetime:
+    value = row["startDate" if source == "events" else "conductDate" if source == "tests" else "dueDate"]
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+def render_feed(user: dict, items: List[tuple]) -> str:
+    name = " ".join(part for part in (user["firstName"], user["lastName"]) if part) or "School"
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN", "METHOD:PUBLISH",
+             f"X-WR-CALNAME:{ical_text(name + ' - School calendar')}"]
+    for source, row in sorted(items, key=lambda item: (start_of(*item), item[0], item[1]["id"])):
+        lines += render_item(source, row)
+    lines.append("END:VCALENDAR")
+    return "".join(fold(line) + "\r\n" for line in lines)
+
+
+def load_state(output: str) -> Dict[str, object]:
+    try:
+        with open(os.path.join(output, STATE_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(output: str, state: Dict[str, object]):
+    path = os.path.join(output, STATE_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def write_feed(output: str, token: str, content: str):
+    path = os.path.join(output, f"{token}.ics")
+    with open(f"{path}.tmp", "w", encoding="utf-8", newline="") as f:
+        f.write(content)
+    os.replace(f"{path}.tmp", path)
+
+
+def fetch(cur, query: str) -> List[dict]:
+    cur.execute(query)
+    return cur.fetchall()
+
+
+def newer_than(value: Optional[datetime], watermark: Optional[str]) -> bool:
+    if watermark is None or value is None:
+        return True
+    mark = datetime.fromisoformat(watermark) - WATERMARK_OVERLAP
+    if (value.tzinfo is None) != (mark.tzinfo is None):
+        value, mark = value.replace(tzinfo=None), mark.replace(tzinfo=None)
+    return value > mark
+
+
+def latest(rows: List[dict]) -> Optional[str]:
+    values = [row["updatedAt"] for row in rows if row["updatedAt"]]
+    return max(values).isoformat() if values else None
+
+
+def generate(conn, output: str, full: bool = False) -> Dict[str, object]:
+    """Bring the feeds in output up to date; returns counts for the run."""
+    started = time.perf_counter()
+    secret = feed_secret()
+    os.makedirs(output, exist_ok=True)
+    state = load_state(output)
+    if state.get("secret") != hashlib.sha256(secret).hexdigest():
+        full = True  # feed names depend on the secret
+    with conn.cursor() as cur:
+        tables = source_tables(cur)
+        stats = source_stats(cur, tables)
+    if not full and stats == state.get("stats"):
+        conn.rollback()
+        return {"changed": False, "rendered": 0, "written": 0, "removed": 0,
+                "seconds": round(time.perf_counter() - started, 4)}
+
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        users = fetch(cur, USERS_SQL)
+        courses = fetch(cur, COURSES_SQL)
+        enrollments = fetch(cur, ENROLLMENTS_SQL) if "enrollments" in tables else []
+        sources = {
+            "events": fetch(cur, EVENTS_SQL),
+            "tests": fetch(cur, TESTS_SQL.format(table=tables["tests"])) if "tests" in tables else [],
+            "assignments": fetch(cur, ASSIGNMENTS_SQL),
+        }
+    conn.rollback()
+
+    directory = Directory(users, courses, enrollments)
+    audience_of = {"events": event_audiences, "tests": test_audiences, "assignments": assignment_audiences}
+    watermarks = state.get("watermarks", {})
+    previous_items: Dict[str, List[str]] = state.get("items", {})
+    items: Dict[str, List[str]] = {}
+    touched: Set[str] = set()
+
+    # Items: the old and the new audience of every changed or deleted row
+    for source, rows in sources.items():
+        for row in rows:
+            key = f"{source}:{row['id']}"
+            items[key] = audience_of[source](row)
+            if full or newer_than(row["updatedAt"], watermarks.get(source)) or key not in previous_items:
+                touched.update(previous_items.get(key, []), items[key])
+    for key in previous_items.keys() - items.keys():
+        touched.update(previous_items[key])
+
+    affected: Set[str] = set()
+    for audience in touched:
+        affected |= directory.members(audience)
+
+    # Membership: changed users, enrolments that came or went, courses whose instructor or code changed
+    for user in users:
+        if full or newer_than(user["updatedAt"], watermarks.get("users")):
+            affected.add(user["id"])
+            affected |= directory.parents.get(user["id"], set()) | directory.children.get(user["id"], set())
+    enrolled = {f"{row['courseId']}:{row['studentId']}" for row in enrollments}
+    for pair in enrolled.symmetric_difference(state.get("enrolled", [])):
+        affected |= directory.with_parents([pair.split(":", 1)[1]])
+    course_details = {course["id"]: [course["instructorId"], course["code"]] for course in courses}
+    previous_courses = state.get("courses", {})
+    for course_id in course_details.keys() | previous_courses.keys():
+        before, after = previous_courses.get(course_id), course_details.get(course_id)
+        if before != after:
+            affected |= directory.members(f"course:{course_id}")
+            affected.update(details[0] for details in (before, after) if details and details[0])
+    if full:
+        affected = set(directory.users)
+
+    # Render the affected feeds
+    visible: Dict[str, List[tuple]] = defaultdict(list)
+    for source, rows in sources.items():
+        for row in rows:
+            audience = set()
+            for spec in items[f"{source}:{row['id']}"]:
+                audience |= directory.members(spec)
+            for user_id in audience & affected:
+                visible[user_id].append((source, row))
+
+    feeds: Dict[str, Dict[str, str]] = state.get("feeds", {}) if not full else {}
+    written = rendered = removed = 0
+    for user_id in sorted(affected):
+        user = directory.users.get(user_id)
+        if user is None or not user["isActive"]:
+            continue
+        content = render_feed(user, visible.get(user_id, []))
+        rendered += 1
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        token = feed_token(user_id, secret)
+        if feeds.get(user_id, {}).get("hash") == digest and os.path.exists(os.path.join(output, f"{token}.ics")):
+            continue
+        write_feed(output, token, content)
+        feeds[user_id] = {"token": token, "hash": digest}
+        written += 1
+
+    # Feeds of deleted or deactivated users, and files no user owns any more
+    for user_id in list(feeds):
+        user = directory.users.get(user_id)
+        if user is None or not user["isActive"]:
+            del feeds[user_id]
+    owned = {f"{feed['token']}.ics" for feed in feeds.values()}
+    for name in os.listdir(output):
+        if name.endswith(".ics") and name not in owned:
+            os.remove(os.path.join(output, name))
+            removed += 1
+
+    state = {
+        "secret": hashlib.sha256(secret).hexdigest(),
+        "stats": stats,
+        "watermarks": dict({source: latest(rows) for source, rows in sources.items()}, users=latest(users)),
+        "items": items,
+        "enrolled": sorted(enrolled),
+        "courses": course_details,
+        "feeds": feeds,
+    }
+    save_state(output, state)
+    return {"changed": True, "rendered": rendered, "written": written, "removed": removed,
+            "seconds": round(time.perf_counter() - started, 4)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate per-user iCalendar feeds")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Regenerate the feeds affected by changed rows")
+    run_parser.add_argument("--full", action="store_true", help="Re-render every feed")
+    run_parser.add_argument("--output", default=os.getenv("CALENDAR_FEED_PATH", "./calendar_feeds"))
+    url_parser = sub.add_parser("url", help="Print the feed path of a user")
+    url_parser.add_argument("user_id")
+    args = parser.parse_args(argv)
+
+    if args.command == "url":
+        print(f"/calendar/{feed_token(args.user_id, feed_secret())}.ics")
+        return 0
+
+    conn = connect()
+    try:
+        result = generate(conn, args.output, full=args.full)
+    finally:
+        conn.close()
+    if not result["changed"]:
+        print(f"✅ Feeds are up to date ({result['seconds'] * 1000:.1f} ms)")
+    else:
+        print(f"📅 Rendered {result['rendered']} feeds, wrote {result['written']} changed ones, "
+              f"removed {result['removed']} in {result['seconds']:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
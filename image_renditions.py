@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Image Rendition Pipeline for School Management System
+
+Profile pictures and photo messages are stored at full phone-camera
+resolution. This script pre-renders small WebP copies next to them:
+
+- thumb:  96px on the long edge (48px avatars on 2x screens)
+- medium: 640px on the long edge (chat bubbles, rosters)
+
+Renditions are written to uploads/renditions/<size>/<source key>.webp,
+which express.static already serves under /uploads/, and recorded in
+image_renditions so the API can hand out the small key instead of the
+original.
+
+Sources are image attachments (messages with contentType 'image' or an
+image/* mimeType) and users."profilePicture" values under /uploads/. Each
+source kind keeps a ("createdAt"/"updatedAt", id) watermark in
+rendition_watermarks, so regular runs only pick up new rows; --full
+re-scans everything for a backfill. The watermark never passes a source that
+failed to render or is missing, so the next run retries it. Rendering runs
+in a process pool sized to the machine.
+
+Usage:
+    python image_renditions.py run [--full] [--jobs 8] [--batch-size 200]
+    python image_renditions.py stats
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from create_user import get_db_config
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is only needed by the workers that render
+    Image = None
+    ImageOps = None
+
+RENDITION_DIR = "renditions"
+SIZES = {"thumb": 96, "medium": 640}
+WEBP_QUALITY = 80
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS image_renditions (
+    "sourceKey" TEXT NOT NULL,
+    size VARCHAR(20) NOT NULL,
+    "renditionKey" TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    "createdAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY ("sourceKey", size)
+);
+
+CREATE TABLE IF NOT EXISTS rendition_watermarks (
+    source VARCHAR(50) PRIMARY KEY,
+    "lastAt" TIMESTAMP,
+    "lastId" UUID,
+    "updatedAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Each source yields (id, watermark timestamp, upload key) in watermark order.
+SOURCES = {
+    "attachments": """
+        SELECT a.id, a."createdAt", a."fileKey"
+        FROM attachments a
+        LEFT JOIN messages m ON m.id = a."messageId"
+        WHERE (m."contentType" = 'image' OR a."mimeType" LIKE 'image/%%')
+          AND (%(last_at)s::timestamp IS NULL OR (a."createdAt", a.id) > (%(last_at)s, %(last_id)s::uuid))
+        ORDER BY a."createdAt", a.id
+        LIMIT %(limit)s
+    """,
+    "profile_pictures": """
+        SELECT u.id, u."updatedAt", substr(u."profilePicture", length('/uploads/') + 1)
+        FROM users u
+        WHERE u."profilePicture" LIKE '/uploads/%%'
+          AND (%(last_at)s::timestamp IS NULL OR (u."updatedAt", u.id) > (%(last_at)s, %(last_id)s::uuid))
+        ORDER BY u."updatedAt", u.id
+        LIMIT %(limit)s
+    """,
+}
+
+
+def connect():
+    cfg = get_db_config()
+    return psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+
+
+def upload_root() -> str:
+    return os.path.abspath(os.getenv("UPLOAD_PATH", "./uploads"))
+
+
+def rendition_key(source_key: str, size: str) -> str:
+    # Keep the source extension: x.jpg and x.png must not share a rendition
+    return "/".join([RENDITION_DIR, size, source_key + ".webp"])
+
+
+def render(root: str, source_key: str) -> Tuple[str, List[tuple], Optional[str]]:
+    """
+    Render every size for one source image. Runs inside a pool worker.
+    Returns (source_key, [(size, key, width, height, bytes)], error).
+    """
+    source = os.path.join(root, source_key)
+    if not os.path.isfile(source):
+        return source_key, [], "source file missing"
+    results = []
+    try:
+        source_mtime = os.path.getmtime(source)
+        with Image.open(source) as original:
+            image = ImageOps.exif_transpose(original)
+            # Palette and RGB/L images can carry alpha as a transparency key instead of a band
+            transparent = "A" in image.getbands() or "transparency" in original.info
+            if image.mode not in ("RGB", "RGBA") or transparent:
+                image = image.convert("RGBA" if transparent else "RGB")
+            for size, edge in SIZES.items():
+                key = rendition_key(source_key, size)
+                target = os.path.join(root, key)
+                if os.path.exists(target) and os.path.getmtime(target) >= source_mtime:
+                    with Image.open(target) as existing:
+                        width, height = existing.size
+                    results.append((size, key, width, height, os.path.getsize(target)))
+                    continue
+                copy = image.copy()
+                copy.thumbnail((edge, edge), Image.LANCZOS)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp = target + ".tmp"
+                copy.save(tmp, "WEBP", quality=WEBP_QUALITY, method=4)
+                os.replace(tmp, target)
+                results.append((size, key, copy.width, copy.height, os.path.getsize(target)))
+    except Exception as e:
+        return source_key, results, f"{e.__class__.__name__}: {e}"
+    return source_key, results, None
+
+
+def load_watermark(conn, source: str) -> Tuple[Optional[object], Optional[str]]:
+    with conn.cursor() as cur:
+        cur.execute('SELECT "lastAt", "lastId" FROM rendition_watermarks WHERE source = %s', (source,))
+        row = cur.fetchone()
+    conn.commit()
+    return (row[0], str(row[1]) if row[1] else None) if row else (None, None)
+
+
+def process_source(conn, pool: ProcessPoolExecutor, root: str, source: str, batch_size: int,
+                   full: bool, totals: Dict[str, int]):
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", ("attachments" if source == "attachments" else "users",))
+        if not cur.fetchone()[0]:
+            conn.commit()
+            print(f"⚠️  Skipping {source}: table not found")
+            return
+    conn.commit()
+
+    if full:
+        # Rebuilt as the re-scan goes, so it can't stay ahead of a failure
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM rendition_watermarks WHERE source = %s", (source,))
+        conn.commit()
+    last_at, last_id = (None, None) if full else load_watermark(conn, source)
+    held = None  # first source key that failed; the watermark stays before it
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(SOURCES[source], {"last_at": last_at, "last_id": last_id, "limit": batch_size})
+            rows = cur.fetchall()
+        conn.commit()
+        if not rows:
+            break
+
+        keys = sorted({key for _, _, key in rows if key})
+        rendered = []
+        failed = set()
+        for source_key, results, error in pool.map(render, [root] * len(keys), keys, chunksize=8):
+            if error:
+                failed.add(source_key)
+                totals["errors"] += 1
+                print(f"   ⚠️  {source_key}: {error}")
+            for size, key, width, height, size_bytes in results:
+                rendered.append((source_key, size, key, width, height, size_bytes))
+                totals["bytes"] += size_bytes
+        totals["sources"] += len(keys)
+        totals["renditions"] += len(rendered)
+
+        # Only rows before the first failure are covered by the watermark
+        stop = 0 if held else next(
+            (index for index, (_, _, key) in enumerate(rows) if key in failed), len(rows))
+        if stop < len(rows) and not held:
+            held = rows[stop][2]
+        mark_id, mark_at = (str(rows[stop - 1][0]), rows[stop - 1][1]) if stop else (None, None)
+        last_id, last_at = str(rows[-1][0]), rows[-1][1]
+        with conn.cursor() as cur:
+            if rendered:
+                execute_values(cur, """
+                    INSERT INTO image_renditions ("sourceKey", size, "renditionKey", width, height, bytes)
+                    VALUES %s
+                    ON CONFLICT ("sourceKey", size) DO UPDATE
+                    SET "renditionKey" = EXCLUDED."renditionKey", width = EXCLUDED.width,
+                        height = EXCLUDED.height, bytes = EXCLUDED.bytes, "createdAt" = now()
+                """, rendered)
+            # The watermark moves in the same transaction as the rows it covers.
+            if stop:
+                cur.execute("""
+                    INSERT INTO rendition_watermarks (source, "lastAt", "lastId", "updatedAt")
+                    VALUES (%s, %s, %s, now())
+                    ON CONFLICT (source) DO UPDATE
+                    SET "lastAt" = EXCLUDED."lastAt", "lastId" = EXCLUDED."lastId", "updatedAt" = now()
+                """, (source, mark_at, mark_id))
+        conn.commit()
+        print(f"   ... {source}: {totals['sources']} images, {totals['renditions']} renditions")
+    if held:
+        print(f"   ⚠️  {source}: watermark held before {held}; the next run retries from there")
+
+
+def run(conn, root: str, jobs: int, batch_size: int, full: bool) -> int:
+    if Image is None:
+        print("❌ Pillow is required to render images: pip install Pillow")
+        return 1
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA_SQL)
+    conn.commit()
+
+    totals = {"sources": 0, "renditions": 0, "bytes": 0, "errors": 0}
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for source in SOURCES:
+            process_source(conn, pool, root, source, batch_size, full, totals)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Rendered {totals['renditions']} renditions for {totals['sources']} images "
+          f"({totals['bytes'] / 1e6:.1f} MB) in {elapsed:.1f}s with {jobs} processes"
+          + (f", {totals['errors']} errors" if totals["errors"] else ""))
+    return 0
+
+
+def stats(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('image_renditions') IS NOT NULL")
+        if not cur.fetchone()[0]:
+            conn.commit()
+            print("📭 No renditions recorded yet")
+            return
+        cur.execute('SELECT size, count(*), avg(bytes)::int, max(width) FROM image_renditions GROUP BY size ORDER BY size')
+        rows = cur.fetchall()
+        cur.execute('SELECT source, "lastAt" FROM rendition_watermarks ORDER BY source')
+        marks = cur.fetchall()
+    conn.commit()
+    print("🖼️  Renditions:")
+    for size, count, avg_bytes, width in rows:
+        print(f"   - {size}: {count} files, avg {avg_bytes / 1024:.1f} KB, max width {width}px")
+    for source, last_at in marks:
+        print(f"   - watermark {source}: {last_at}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-render thumbnail and medium WebP copies of uploaded images")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Render new images since the last run")
+    run_parser.add_argument("--full", action="store_true", help="Ignore watermarks and re-scan everything")
+    run_parser.add_argument("--jobs", type=int, default=os.cpu_count() or 4)
+    run_parser.add_argument("--batch-size", type=int, default=200)
+    sub.add_parser("stats", help="Show rendition counts and watermarks")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        if args.command == "stats":
+            stats(conn)
+            return 0
+        root = upload_root()
+        if not os.path.isdir(root):
+            print(f"❌ Upload directory not found: {root}")
+            return 1
+        return run(conn, root, args.jobs, args.batch_size, args.full)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Referential Integrity Scanner for School Management System
+
+Most relationships in this schema are not enforced by the database: the
+Sequelize models only imply them, fix_db.py drops parent tables with
+CASCADE (which removes the constraints, not the orphans), and test_seed.py
+writes to quoted "Users"/"Tests" while everything else uses users/tests.
+
+This scanner checks every relationship with one anti-join per edge:
+
+- the implied edges listed in EDGES (grades."studentId" -> users,
+  attendance."courseId" -> courses, test_comments."testId" -> tests, ...)
+- JSON id arrays, e.g. users.children -> users."studentId"
+- declared foreign keys that were added NOT VALID (columns behind a
+  validated foreign key are guaranteed by PostgreSQL and skipped)
+
+Tables are resolved under both spellings (tests and "Tests"); a value is
+only an orphan if no spelling of the parent table has it, and tables that
+exist under both spellings are reported separately. Edges are scanned in
+parallel, one connection per worker.
+
+repair fixes orphans in batches: nullable columns are set to NULL and
+dangling array elements are removed. Orphans in NOT NULL columns are only
+reported, since fixing them means deleting the whole row; --delete-orphans
+deletes those rows, stopping at the first batch a foreign key still points at.
+
+Usage:
+    python integrity_scan.py scan [--jobs 4] [--samples 5] [--json]
+    python integrity_scan.py repair [--edge grades.studentId] [--batch-size 1000] [--dry-run]
+                                    [--delete-orphans]
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+from psycopg2 import sql
+
+from create_user import get_db_config
+
+# Logical table -> spellings it may exist under
+ALIASES = {
+    "users": ["users", "Users"],
+    "subjects": ["subjects", "Subjects"],
+    "tests": ["tests", "Tests"],
+    "test_comments": ["test_comments", "TestComments"],
+    "test_submissions": ["test_submissions", "TestSubmissions"],
+}
+
+# (child table, column, parent table, parent column)
+EDGES = [
+    ("courses", "subjectId", "subjects", "id"),
+    ("courses", "instructorId", "users", "id"),
+    ("assignments", "courseId", "courses", "id"),
+    ("grades", "studentId", "users", "id"),
+    ("grades", "courseId", "courses", "id"),
+    ("grades", "assignmentId", "assignments", "id"),
+    ("grades", "gradedBy", "users", "id"),
+    ("attendance", "studentId", "users", "id"),
+    ("attendance", "courseId", "courses", "id"),
+    ("attendance", "markedBy", "users", "id"),
+    ("course_enrollments", "courseId", "courses", "id"),
+    ("course_enrollments", "studentId", "users", "id"),
+    ("enrollment_requests", "courseId", "courses", "id"),
+    ("enrollment_requests", "studentId", "users", "id"),
+    ("classes", "courseId", "courses", "id"),
+    ("classes", "teacherId", "users", "id"),
+    ("classes", "attendanceId", "attendance", "id"),
+    ("conversations", "teacherId", "users", "id"),
+    ("conversations", "studentId", "users", "id"),
+    ("messages", "conversationId", "conversations", "id"),
+    ("messages", "senderId", "users", "id"),
+    ("messages", "receiverId", "users", "id"),
+    ("attachments", "messageId", "messages", "id"),
+    ("events", "organizerId", "users", "id"),
+    ("fees", "studentId", "users", "id"),
+    ("tests", "teacherId", "users", "id"),
+    ("test_comments", "testId", "tests", "id"),
+    ("test_comments", "userId", "users", "id"),
+    ("test_submissions", "testId", "tests", "id"),
+    ("test_submissions", "studentId", "users", "id"),
+]
+
+# (child table, JSON array column, parent table, parent columns an element may match)
+# users.children holds student numbers, either bare or as {"studentId": ..., "relation": ...}
+ARRAY_EDGES = [
+    ("users", "children", "users", ["studentId", "id"]),
+]
+
+# Text of one array element: {"studentId": "x"} -> x, "x" -> x
+ELEMENT_SQL = "coalesce(elem->>'studentId', elem->>'id', elem #>> '{}')"
+
+
+def connect():
+    cfg = get_db_config()
+    return psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+
+
+def load_catalog(conn) -> Dict[str, Dict[str, Tuple[str, bool]]]:
+    """table -> column -> (data type, nullable) for every table in public."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT table_name, column_name, data_type, is_nullable = 'YES'
+            FROM information_schema.columns
+            WHERE table_schema = 'public'
+        """)
+        catalog: Dict[str, Dict[str, Tuple[str, bool]]] = {}
+        for table, column, data_type, nullable in cur.fetchall():
+            catalog.setdefault(table, {})[column] = (data_type, nullable)
+    conn.commit()
+    return catalog
+
+
+def declared_edges(conn) -> Tuple[List[Tuple[str, str, str, str]], set]:
+    """
+    Single-column foreign keys: the ones created NOT VALID (which can hide
+    orphans) as edges, and the (table, column) pairs of validated ones.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT c.conrelid::regclass::text, a.attname, c.confrelid::regclass::text, af.attname, c.convalidated
+            FROM pg_constraint c
+            JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+            JOIN pg_attribute af ON af.attrelid = c.confrelid AND af.attnum = c.confkey[1]
+            WHERE c.contype = 'f' AND array_length(c.conkey, 1) = 1
+              AND c.connamespace = 'public'::regnamespace
+        """)
+        rows = cur.fetchall()
+    conn.commit()
+    unvalidated = [(child.strip('"'), column, parent.strip('"'), parent_column)
+                   for child, column, parent, parent_column, valid in rows if not valid]
+    enforced = {(child.strip('"'), column) for child, column, _, _, valid in rows if valid}
+    return unvalidated, enforced
+
+
+def spellings(catalog, table: str) -> List[str]:
+    return [name for name in ALIASES.get(table, [table]) if name in catalog]
+
+
+class Check:
+    """One anti-join: orphans of child.column that no spelling of the parent contains."""
+
+    def __init__(self, child: str, column: str, parents: List[str], parent_columns: List[str],
+                 catalog, is_array: bool = False):
+        self.child = child
+        self.column = column
+        self.parents = parents
+        self.parent_columns = parent_columns
+        self.is_array = is_array
+        self.column_type, self.nullable = catalog[child][column]
+        self.child_has_id = "id" in catalog[child]
+        # Compare as text when the types differ (e.g. UUID vs VARCHAR), natively otherwise
+        self.as_text = is_array or any(catalog[parent][pc][0] != self.column_type
+                                       for parent in parents for pc in parent_columns)
+        self.name = f"{child}.{column}"
+
+    def _value(self, alias: str) -> sql.Composable:
+        if self.is_array:
+            return sql.SQL(ELEMENT_SQL)
+        value = sql.SQL("{}.{}").format(sql.Identifier(alias), sql.Identifier(self.column))
+        return sql.SQL("{}::text").format(value) if self.as_text else value
+
+    def missing(self, alias: str = "c") -> sql.Composable:
+        """Predicate that is true when the value exists in no parent table."""
+        clauses = []
+        for i, parent in enumerate(self.parents):
+            for parent_column in self.parent_columns:
+                target = sql.SQL("p{}.{}").format(sql.SQL(str(i)), sql.Identifier(parent_column))
+                if self.as_text:
+                    target = sql.SQL("{}::text").format(target)
+                clauses.append(sql.SQL("NOT EXISTS (SELECT 1 FROM {} p{} WHERE {} = {})").format(
+                    sql.Identifier(parent), sql.SQL(str(i)), target, self._value(alias)))
+        return sql.SQL(" AND ").join(clauses)
+
+    def elements(self) -> sql.Composable:
+        # Non-array JSON (null, objects) contributes no elements
+        return sql.SQL(
+            "jsonb_array_elements(CASE jsonb_typeof(c.{col}::jsonb) WHEN 'array' THEN c.{col}::jsonb "
+            "ELSE '[]'::jsonb END) elem"
+        ).format(col=sql.Identifier(self.column))
+
+    def scan_query(self, samples: int) -> sql.Composable:
+        sample_value = sql.SQL("c.id::text") if self.child_has_id else sql.SQL("c.ctid::text")
+        if self.is_array:
+            sample_value = sql.SQL("{} || ':' || {}").format(sample_value, sql.SQL(ELEMENT_SQL))
+            source = sql.SQL("{} c CROSS JOIN LATERAL {}").format(sql.Identifier(self.child), self.elements())
+            present = sql.SQL("TRUE")
+        else:
+            source = sql.SQL("{} c").format(sql.Identifier(self.child))
+            present = sql.SQL("c.{} IS NOT NULL").format(sql.Identifier(self.column))
+        # The samples stop at LIMIT instead of collecting every orphan into an array first
+        return sql.SQL("""
+            SELECT (SELECT count(*) FROM {source} WHERE {present} AND {missing}),
+                   ARRAY(SELECT {sample} FROM {source} WHERE {present} AND {missing} LIMIT {samples})
+        """).format(sample=sample_value, samples=sql.Literal(samples), source=source,
+                    present=present, missing=self.missing())
+
+    def repair_query(self, batch_size: int) -> sql.Composable:
+        table = sql.Identifier(self.child)
+        key = sql.SQL("id") if self.child_has_id else sql.SQL("ctid")
+        if self.is_array:
+            column = sql.Identifier(self.column)
+            keep = sql.SQL("NOT ({})").format(self.missing("x"))
+            return sql.SQL("""
+                WITH batch AS (
+                    SELECT DISTINCT c.{key} FROM {table} c CROSS JOIN LATERAL {elements}
+                    WHERE {missing}
+                    LIMIT {limit}
+                )
+                UPDATE {table} c SET {column} = (
+                    SELECT coalesce(jsonb_agg(elem), '[]'::jsonb) FROM jsonb_array_elements(c.{column}::jsonb) elem
+                    WHERE {keep}
+                )::{column_type}
+                WHERE c.{key} IN (SELECT {key} FROM batch)
+            """).format(key=key, table=table, elements=self.elements(), missing=self.missing(),
+                        limit=sql.Literal(batch_size), column=column, keep=keep,
+                        column_type=sql.SQL(self.column_type))
+        batch = sql.SQL("""
+            SELECT c.{key} FROM {table} c
+            WHERE c.{column} IS NOT NULL AND {missing}
+            LIMIT {limit}
+            FOR UPDATE SKIP LOCKED
+        """).format(key=key, table=table, column=sql.Identifier(self.column), missing=self.missing(),
+                    limit=sql.Literal(batch_size))
+        if self.nullable:
+            return sql.SQL("UPDATE {table} SET {column} = NULL WHERE {key} IN ({batch})").format(
+                table=table, column=sql.Identifier(self.column), key=key, batch=batch)
+        return sql.SQL("DELETE FROM {table} WHERE {key} IN ({batch})").format(table=table, key=key, batch=batch)
+
+
+def build_checks(conn) -> Tuple[List[Check], List[Tuple[str, List[str]]]]:
+    """All checks that apply to this database, plus logical tables that exist under two spellings."""
+    catalog = load_catalog(conn)
+    unvalidated, enforced = declared_edges(conn)
+    checks: List[Check] = []
+    # Columns behind a validated foreign key cannot hold orphans
+    seen = set(enforced)
+
+    def add(child, column, parent, parent_columns, is_array=False):
+        parents = [name for name in spellings(catalog, parent)
+                   if all(pc in catalog[name] for pc in parent_columns)]
+        for table in spellings(catalog, child):
+            if column not in catalog[table] or not parents or (table, column) in seen:
+                continue
+            seen.add((table, column))
+            checks.append(Check(table, column, parents, parent_columns, catalog, is_array))
+
+    for child, column, parent, parent_column in EDGES + unvalidated:
+        add(child, column, parent, [parent_column])
+    for child, column, parent, parent_columns in ARRAY_EDGES:
+        add(child, column, parent, parent_columns, is_array=True)
+
+    shadows = [(logical, spellings(catalog, logical)) for logical in ALIASES
+               if len(spellings(catalog, logical)) > 1]
+    return checks, shadows
+
+
+def scan(checks: List[Check], jobs: int, samples: int) -> List[Dict[str, object]]:
+    """Run every check on a pool of connections (one per worker thread)."""
+    local = threading.local()
+    connections = []
+    lock = threading.Lock()
+
+    def run(check: Check) -> Dict[str, object]:
+        if not hasattr(local, "conn"):
+            local.conn = connect()
+            local.conn.set_session(readonly=True)
+            with lock:
+                connections.append(local.conn)
+        started = time.perf_counter()
+        try:
+            with local.conn.cursor() as cur:
+                cur.execute(check.scan_query(samples))
+                count, sample = cur.fetchone()
+            local.conn.commit()
+            result = {"edge": check.name, "orphans": count, "samples": sample or []}
+        except Exception as e:
+            local.conn.rollback()
+            result = {"edge": check.name, "orphans": None, "error": f"{e.__class__.__name__}: {e}"}
+        result["parents"] = check.parents
+        result["durationMs"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            return list(pool.map(run, checks))
+    finally:
+        for conn in connections:
+            conn.close()
+
+
+def repair(conn, checks: List[Check], batch_size: int, dry_run: bool, delete_orphans: bool):
+    for check in checks:
+        deletes = not check.is_array and not check.nullable
+        if dry_run or (deletes and not delete_orphans):
+            with conn.cursor() as cur:
+                cur.execute(check.scan_query(0))
+                count = cur.fetchone()[0]
+            conn.commit()
+            if not count:
+                continue
+            if deletes and not delete_orphans:
+                print(f"⚠️  {check.name}: {count} orphans in a NOT NULL column, left for manual handling "
+                      "(or re-run with --delete-orphans)")
+            else:
+                action = "remove dangling elements" if check.is_array else ("set NULL" if check.nullable else "delete rows")
+                print(f"🔎 {check.name}: {count} orphans, would {action}")
+            continue
+        total = 0
+        while True:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(check.repair_query(batch_size))
+                    changed = cur.rowcount
+                conn.commit()
+            except psycopg2.errors.ForeignKeyViolation as e:
+                conn.rollback()
+                print(f"❌ {check.name}: orphan rows are still referenced, left in place: {e.diag.message_primary}")
+                break
+            total += changed
+            if changed < batch_size:
+                break
+        if total:
+            print(f"🔧 {check.name}: repaired {total} rows")
+
+
+def print_report(results: List[Dict[str, object]], shadows):
+    broken = [r for r in results if r["orphans"]]
+    print(f"🔍 Checked {len(results)} relationships")
+    for logical, names in shadows:
+        print(f"⚠️  {logical} exists under several spellings: {', '.join(names)} (rows may be misplaced)")
+    for result in results:
+        if result.get("error"):
+            print(f"   ❌ {result['edge']}: {result['error']}")
+    for result in sorted(broken, key=lambda r: -r["orphans"]):
+        print(f"   ⚠️  {result['edge']} -> {'/'.join(result['parents'])}: {result['orphans']} orphans "
+              f"({result['durationMs']} ms), e.g. {', '.join(result['samples'])}")
+    if not broken:
+        print("✅ No orphaned references found")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Find and repair orphaned references")
+    sub = parser.add_subparsers(dest="command", required=True)
+    scan_parser = sub.add_parser("scan", help="Count orphans for every relationship")
+    scan_parser.add_argument("--jobs", type=int, default=4, help="Parallel connections")
+    scan_parser.add_argument("--samples", type=int, default=5, help="Sample ids per edge")
+    scan_parser.add_argument("--json", action="store_true")
+    repair_parser = sub.add_parser("repair", help="Null, delete or prune orphans in batches")
+    repair_parser.add_argument("--edge", action="append", help="Only this edge (table.column); repeatable")
+    repair_parser.add_argument("--batch-size", type=int, default=1000)
+    repair_parser.add_argument("--dry-run", action="store_true")
+    repair_parser.add_argument("--delete-orphans", action="store_true",
+                               help="Delete rows whose NOT NULL column is an orphan")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        checks, shadows = build_checks(conn)
+        if args.command == "scan":
+            started = time.perf_counter()
+            results = scan(checks, args.jobs, args.samples)
+            if args.json:
+                print(json.dumps({"results": results, "shadowTables": dict(shadows)}, default=str))
+            else:
+                print_report(results, shadows)
+                print(f"⏱️  {time.perf_counter() - started:.2f}s with {args.jobs} workers")
+            return 1 if any(r["orphans"] for r in results) else 0
+        if args.edge:
+            unknown = set(args.edge) - {check.name for check in checks}
+            if unknown:
+                print(f"❌ Unknown edges: {', '.join(sorted(unknown))}")
+                return 2
+            checks = [check for check in checks if check.name in args.edge]
+        repair(conn, checks, args.batch_size, args.dry_run, args.delete_orphans)
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Message Counter Maintenance for School Management System
+
+Installs, rebuilds and verifies the unread-message counters that
+DatabaseSetup.create_message_counters adds (message_counters per
+receiver/sender pair, user_message_counters per receiver). Triggers keep
+them current; this script is for the initial backfill and for periodic
+reconciliation.
+
+Work is done in keyset-paginated batches of receivers. Each batch runs in
+its own short transaction that briefly locks the counter tables, so
+messages inserted while a batch is rebuilt are neither lost nor counted
+twice.
+
+Usage:
+    python message_counters.py install
+    python message_counters.py backfill [--batch-size 500]
+    python message_counters.py verify [--fix] [--batch-size 500]
+"""
+
+import argparse
+import sys
+import time
+from typing import List, Optional
+
+import psycopg2
+
+from create_user import get_db_config
+from database_setup import MESSAGE_COUNTERS_SQL
+
+RECEIVER_PAGE_SQL = """
+    SELECT DISTINCT "receiverId" FROM messages
+    WHERE %s::uuid IS NULL OR "receiverId" > %s::uuid
+    ORDER BY "receiverId"
+    LIMIT %s
+"""
+
+COUNTER_PAGE_SQL = """
+    SELECT "userId" FROM user_message_counters
+    WHERE %s::uuid IS NULL OR "userId" > %s::uuid
+    ORDER BY "userId"
+    LIMIT %s
+"""
+
+LOCK_SQL = "LOCK TABLE message_counters, user_message_counters IN SHARE ROW EXCLUSIVE MODE"
+
+CLEAR_SQL = """
+    DELETE FROM message_counters WHERE "userId" = ANY(%(users)s::uuid[]);
+    DELETE FROM user_message_counters WHERE "userId" = ANY(%(users)s::uuid[]);
+"""
+
+REBUILD_SQL = """
+WITH pairs AS (
+    SELECT "receiverId" AS "userId", "senderId" AS "peerId",
+           count(*) FILTER (WHERE NOT COALESCE("isRead", false)) AS unread,
+           count(*) AS total,
+           max("createdAt") AS "lastMessageAt"
+    FROM messages
+    WHERE "receiverId" = ANY(%(users)s::uuid[])
+    GROUP BY "receiverId", "senderId"
+),
+inserted AS (
+    INSERT INTO message_counters ("userId", "peerId", unread, total, "lastMessageAt")
+    SELECT "userId", "peerId", unread, total, "lastMessageAt" FROM pairs
+)
+INSERT INTO user_message_counters ("userId", unread, total, "lastMessageAt")
+SELECT "userId", sum(unread), sum(total), max("lastMessageAt")
+FROM pairs
+GROUP BY "userId"
+"""
+
+MISMATCH_SQL = """
+WITH actual AS (
+    SELECT "receiverId" AS "userId", "senderId" AS "peerId",
+           count(*) FILTER (WHERE NOT COALESCE("isRead", false)) AS unread,
+           count(*) AS total
+    FROM messages
+    WHERE "receiverId" = ANY(%(users)s::uuid[])
+    GROUP BY "receiverId", "senderId"
+),
+stored AS (
+    SELECT "userId", "peerId", unread, total
+    FROM message_counters
+    WHERE "userId" = ANY(%(users)s::uuid[])
+)
+SELECT DISTINCT COALESCE(a."userId", s."userId")
+FROM actual a
+FULL JOIN stored s ON s."userId" = a."userId" AND s."peerId" = a."peerId"
+WHERE a.unread IS DISTINCT FROM s.unread OR a.total IS DISTINCT FROM s.total
+   OR (a."userId" IS NULL AND s.total <> 0)
+"""
+
+USER_MISMATCH_SQL = """
+SELECT u."userId"
+FROM user_message_counters u
+LEFT JOIN (
+    SELECT "userId", sum(unread) AS unread, sum(total) AS total
+    FROM message_counters
+    WHERE "userId" = ANY(%(users)s::uuid[])
+    GROUP BY "userId"
+) p ON p."userId" = u."userId"
+WHERE u."userId" = ANY(%(users)s::uuid[])
+  AND (u.unread IS DISTINCT FROM COALESCE(p.unread, 0) OR u.total IS DISTINCT FROM COALESCE(p.total, 0))
+"""
+
+
+def connect():
+    cfg = get_db_config()
+    return psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+
+
+def install(conn):
+    with conn.cursor() as cur:
+        cur.execute(MESSAGE_COUNTERS_SQL)
+    conn.commit()
+    print("✅ Message counter tables and triggers installed")
+
+
+def iter_receiver_batches(conn, batch_size: int, page_sql: str = RECEIVER_PAGE_SQL):
+    """Yield lists of user ids, keyset-paginated so each page is an index range scan."""
+    last = None
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(page_sql, (last, last, batch_size))
+            users = [str(row[0]) for row in cur.fetchall()]
+        conn.commit()
+        if not users:
+            return
+        yield users
+        last = users[-1]
+
+
+def rebuild(conn, users: List[str]):
+    """Recompute counters for a batch of receivers in one short transaction."""
+    with conn.cursor() as cur:
+        cur.execute(LOCK_SQL)
+        cur.execute(CLEAR_SQL, {"users": users})
+        cur.execute(REBUILD_SQL, {"users": users})
+    conn.commit()
+
+
+def find_mismatches(conn, users: List[str]) -> List[str]:
+    with conn.cursor() as cur:
+        cur.execute(MISMATCH_SQL, {"users": users})
+        broken = {str(row[0]) for row in cur.fetchall()}
+        cur.execute(USER_MISMATCH_SQL, {"users": users})
+        broken.update(str(row[0]) for row in cur.fetchall())
+    conn.commit()
+    return sorted(broken)
+
+
+def backfill(conn, batch_size: int):
+    print("🔄 Rebuilding message counters...")
+    started = time.perf_counter()
+    total = 0
+    with conn.cursor() as cur:
+        cur.execute(LOCK_SQL)
+        cur.execute('DELETE FROM message_counters WHERE "userId" NOT IN (SELECT DISTINCT "receiverId" FROM messages)')
+        cur.execute('DELETE FROM user_message_counters WHERE "userId" NOT IN (SELECT DISTINCT "receiverId" FROM messages)')
+    conn.commit()
+
+    for users in iter_receiver_batches(conn, batch_size):
+        rebuild(conn, users)
+        total += len(users)
+        print(f"   ... {total} receivers rebuilt")
+
+    print(f"✅ Rebuilt counters for {total} receivers in {time.perf_counter() - started:.2f}s")
+
+
+def verify(conn, batch_size: int, fix: bool) -> int:
+    print("🔍 Verifying message counters...")
+    checked = 0
+    mismatched = 0
+    seen = set()
+
+    # Receivers with messages, then counter rows that no longer have any.
+    for page_sql in (RECEIVER_PAGE_SQL, COUNTER_PAGE_SQL):
+        for users in iter_receiver_batches(conn, batch_size, page_sql):
+            users = [user for user in users if user not in seen]
+            seen.update(users)
+            if not users:
+                continue
+            checked += len(users)
+            broken = find_mismatches(conn, users)
+            if not broken:
+                continue
+            mismatched += len(broken)
+            print(f"⚠️  {len(broken)} receivers with drifted counters, e.g. {broken[0]}")
+            if fix:
+                rebuild(conn, broken)
+
+    if mismatched == 0:
+        print(f"✅ All counters match for {checked} receivers")
+    elif fix:
+        print(f"🔧 Reconciled {mismatched} of {checked} receivers")
+    else:
+        print(f"❌ {mismatched} of {checked} receivers have drifted counters (re-run with --fix)")
+    return 1 if mismatched and not fix else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Install, backfill and verify unread-message counters")
+    parser.add_argument("command", choices=["install", "backfill", "verify"])
+    parser.add_argument("--batch-size", type=int, default=500, help="Receivers per transaction")
+    parser.add_argument("--fix", action="store_true", help="With verify: rebuild drifted receivers")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        if args.command == "install":
+            install(conn)
+        elif args.command == "backfill":
+            backfill(conn, args.batch_size)
+        else:
+            return verify(conn, args.batch_size, args.fix)
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Metrics Exporter for School Management System
+
+Long-running exporter that serves database and API health in the Prometheus
+text format on /metrics. A background loop collects every --interval
+seconds and scrapes are answered from the last result, so however often
+Prometheus scrapes, the database sees one round of cheap catalog queries per
+interval:
+
+- school_api_health_seconds          histogram of GET /api/health latency
+- school_db_connect_seconds          histogram of the time to open a connection
+- school_table_size_bytes / school_table_rows_estimate / school_table_dead_tuples
+                                     per table, from pg_stat_user_tables
+- school_db_connections              backends by state (pg_stat_activity)
+- school_db_lock_waits               backends waiting on a lock
+- school_db_cache_hit_ratio          shared buffer hits / (hits + reads)
+- school_up, school_collect_seconds, school_collect_errors_total
+                                     the exporter's own view of each target
+
+Usage:
+    python metrics_exporter.py [--port 9400] [--interval 15] [--api-url http://localhost:5000]
+    python metrics_exporter.py --once      # collect once and print the exposition
+"""
+
+import argparse
+import http.client
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import psycopg2
+
+from create_user import get_db_config
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TABLES_SQL = """
+    SELECT relname, pg_total_relation_size(relid), n_live_tup, n_dead_tup
+    FROM pg_stat_user_tables
+    WHERE schemaname = 'public'
+"""
+
+CONNECTIONS_SQL = """
+    SELECT coalesce(state, 'unknown'), count(*),
+           count(*) FILTER (WHERE wait_event_type = 'Lock')
+    FROM pg_stat_activity
+    WHERE datname = current_database() AND backend_type = 'client backend'
+    GROUP BY 1
+"""
+
+CACHE_SQL = """
+    SELECT blks_hit, blks_read FROM pg_stat_database WHERE datname = current_database()
+"""
+
+
+class Histogram:
+    """Cumulative-bucket histogram as Prometheus expects it."""
+
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for bound, count in zip(self.buckets, self.counts):
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {count}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.total}')
+        lines.append(f"{self.name}_sum {self.sum:.6f}")
+        lines.append(f"{self.name}_count {self.total}")
+        return lines
+
+
+def label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def gauge(name: str, help_text: str, samples: List[Tuple[Dict[str, str], float]], kind: str = "gauge") -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        rendered = ",".join(f'{key}="{label_value(val)}"' for key, val in labels.items())
+        lines.append(f"{name}{{{rendered}}} {value}" if rendered else f"{name} {value}")
+    return lines
+
+
+class Collector:
+    def __init__(self, api_url: Optional[str], db_config, timeout: float):
+        self.api_url = api_url
+        self.db_config = db_config
+        self.timeout = timeout
+        self.api_latency = Histogram("school_api_health_seconds", "Latency of GET /api/health")
+        self.connect_latency = Histogram("school_db_connect_seconds", "Time to open a database connection")
+        self.errors = {"api": 0, "db": 0}
+        self.lock = threading.Lock()
+        self.exposition = "# no collection yet\n"
+
+    def probe_api(self) -> bool:
+        url = urlsplit(self.api_url)
+        connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        started = time.perf_counter()
+        try:
+            connection = connection_class(url.netloc, timeout=self.timeout)
+            try:
+                connection.request("GET", url.path.rstrip("/") + "/api/health")
+                response = connection.getresponse()
+                response.read()
+            finally:
+                connection.close()
+        except (OSError, http.client.HTTPException):
+            return False
+        self.api_latency.observe(time.perf_counter() - started)
+        return response.status == 200
+
+    def query_db(self) -> Dict[str, object]:
+        started = time.perf_counter()
+        cfg = self.db_config
+        conn = psycopg2.connect(cfg, connect_timeout=int(self.timeout)) if isinstance(cfg, str) \
+            else psycopg2.connect(connect_timeout=int(self.timeout), **cfg)
+        self.connect_latency.observe(time.perf_counter() - started)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(TABLES_SQL)
+                tables = cur.fetchall()
+                cur.execute(CONNECTIONS_SQL)
+                connections = cur.fetchall()
+                cur.execute(CACHE_SQL)
+                hits, reads = cur.fetchone() or (0, 0)
+        finally:
+            conn.close()
+        return {"tables": tables, "connections": connections, "hits": hits, "reads": reads}
+
+    def collect(self):
+        started = time.perf_counter()
+        api_up = self.probe_api() if self.api_url else None
+        if api_up is False:
+            self.errors["api"] += 1
+        try:
+            db = self.query_db()
+        except psycopg2.Error as e:
+            print(f"⚠️  Database collection failed: {str(e).strip()}", file=sys.stderr)
+            self.errors["db"] += 1
+            db = None
+        elapsed = time.perf_counter() - started
+
+        lines: List[str] = []
+        if self.api_url:
+            lines += self.api_latency.render()
+        lines += self.connect_latency.render()
+        if db is not None:
+            tables = sorted(db["tables"])
+            lines += gauge("school_table_size_bytes", "Total size of the table including indexes and TOAST",
+                           [({"table": name}, size) for name, size, _, _ in tables])
+            lines += gauge("school_table_rows_estimate", "Live rows according to the statistics collector",
+                           [({"table": name}, live) for name, _, live, _ in tables])
+            lines += gauge("school_table_dead_tuples", "Dead tuples waiting for vacuum",
+                           [({"table": name}, dead) for name, _, _, dead in tables])
+            lines += gauge("school_db_connections", "Client connections to this database by state",
+                           [({"state": state}, count) for state, count, _ in sorted(db["connections"])])
+            lines += gauge("school_db_lock_waits", "Client connections currently waiting on a lock",
+                           [({}, sum(waiting for _, _, waiting in db["connections"]))])
+            total = db["hits"] + db["reads"]
+            lines += gauge("school_db_cache_hit_ratio", "Shared buffer hits / (hits + reads) since stats reset",
+                           [({}, round(db["hits"] / total, 6) if total else 1.0)])
+        up = [({"target": "db"}, 0 if db is None else 1)]
+        if self.api_url:
+            up.append(({"target": "api"}, 1 if api_up else 0))
+        lines += gauge("school_up", "Whether the last collection reached the target", up)
+        lines += gauge("school_collect_errors_total", "Failed collections per target",
+                       [({"target": target}, count) for target, count in sorted(self.errors.items())], "counter")
+        lines += gauge("school_collect_seconds", "Duration of the last collection", [({}, round(elapsed, 6))])
+
+        with self.lock:
+            self.exposition = "\n".join(lines) + "\n"
+
+    def render(self) -> str:
+        with self.lock:
+            return self.exposition
+
+    def run_forever(self, interval: float, stop: threading.Event):
+        while not stop.is_set():
+            self.collect()
+            stop.wait(interval)
+
+
+def make_handler(collector: Collector):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] == "/metrics":
+                body = collector.render().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+                status = 200
+            else:
+                body = b'<a href="/metrics">/metrics</a>\n'
+                content_type = "text/html"
+                status = 404 if self.path != "/" else 200
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # one line per scrape is noise
+
+    return MetricsHandler
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Expose database and API health in Prometheus format")
+    parser.add_argument("--port", type=int, default=int(os.getenv("METRICS_PORT", "9400")))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--interval", type=float, default=15.0, help="Seconds between collections")
+    parser.add_argument("--api-url", default=os.getenv("BACKEND_URL", "http://localhost:5000"),
+                        help="Backend base URL; empty to skip the API probe")
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--once", action="store_true", help="Collect once, print and exit")
+    args = parser.parse_args(argv)
+
+    collector = Collector(args.api_url or None, get_db_config(), args.timeout)
+    if args.once:
+        collector.collect()
+        sys.stdout.write(collector.render())
+        return 0
+
+    stop = threading.Event()
+    worker = threading.Thread(target=collector.run_forever, args=(args.interval, stop), daemon=True)
+    worker.start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(collector))
+    print(f"📈 Serving metrics on http://{args.host}:{args.port}/metrics (collecting every {args.interval:g}s)")
+    try:
+        server.serve_forever()
+    finally:
+        stop.set()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
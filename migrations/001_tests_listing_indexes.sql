@@ -0,0 +1,12 @@
+-- Indexes behind GET /api/tests: trigram search over title/subject/topic
+-- (the route uses the same expression with ILIKE) and the keyset order.
+-- "Tests" is created by Sequelize sync or test_seed.py, not by DatabaseSetup;
+-- tenant_fleet leaves this migration pending until the table exists.
+-- requires: "Tests"
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS tests_search_trgm
+    ON "Tests" USING gin ((title || ' ' || subject || ' ' || topic) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS tests_active_conduct_date_id
+    ON "Tests" ("conductDate", id) WHERE "isActive" = true;
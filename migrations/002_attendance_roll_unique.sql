@@ -0,0 +1,17 @@
+-- One attendance row per student, course and day: the conflict target of
+-- POST /api/attendance/bulk. Older databases may hold duplicates, so keep the
+-- most recently updated row of each before adding the constraint.
+DELETE FROM attendance a
+USING attendance newer
+WHERE a."studentId" = newer."studentId"
+  AND a."courseId" = newer."courseId"
+  AND a.date = newer.date
+  AND (coalesce(a."updatedAt", '-infinity'), a.id) < (coalesce(newer."updatedAt", '-infinity'), newer.id);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'attendance_student_course_date') THEN
+        ALTER TABLE attendance
+            ADD CONSTRAINT attendance_student_course_date UNIQUE ("studentId", "courseId", date);
+    END IF;
+END $$;
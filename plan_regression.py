@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Query-Plan Regression Suite for School Management System
+
+Schema changes (database_setup.py, fix_db.py, migrations/) and new indexes
+change how the application's hot queries are planned, and nothing tells us
+whether they got faster or slower. This tool keeps a catalogue of
+representative queries:
+
+- user_by_email               login lookup
+- grades_by_student_course    a student's grades in one course
+- attendance_by_course_date   one roll call
+- unread_messages             a user's unread inbox page
+- tests_by_teacher            a teacher's active tests, in keyset order
+- fees_due                    outstanding fees due by a date
+
+and runs each under EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) against a
+generated dataset. The dataset lives in a scratch schema (plan_bench) whose
+tables are copied from the current public tables with LIKE ... INCLUDING
+INDEXES, so the plans reflect the schema and indexes as they are now, and
+is filled deterministically with generate_series, so two runs at the same
+--scale see identical data. Parallel workers and JIT are switched off for
+the session to keep plans and timings comparable between runs.
+
+`record` stores every query's plan shape (node types, relations and
+indexes, without costs or row counts), median execution time and buffer
+counts as the baseline. `check` runs the catalogue again and flags plan
+shape changes and queries whose median time grew by more than --threshold
+(and by at least --min-ms, so sub-millisecond noise doesn't count); it
+exits 1 when anything was flagged. A changed plan is flagged even when it is
+faster: review it, then `record` again to accept it.
+
+Usage:
+    python plan_regression.py record [--baseline plan_baselines.json] [--scale 1] [--repeat 7] [--keep-dataset]
+    python plan_regression.py check [--baseline plan_baselines.json] [--threshold 0.25] [--min-ms 0.5] [--reuse-dataset]
+    python plan_regression.py drop   # remove the plan_bench schema
+"""
+
+import argparse
+import hashlib
+import json
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import psycopg2
+from psycopg2 import sql
+
+from create_user import get_db_config
+
+BENCH_SCHEMA = "plan_bench"
+DEFAULT_BASELINE = "plan_baselines.json"
+
+# All timestamps are relative to a fixed date so the data never depends on when it was generated
+BASE_DATE = "2024-09-02"
+
+# Row counts at --scale 1
+SIZES = {
+    "students": 20000,
+    "teachers": 1000,
+    "courses": 500,
+    "grades_per_student": 10,
+    "attendance_days": 40,
+    "roll_size": 25,
+    "messages": 200000,
+    "fees_per_student": 3,
+    "tests_per_teacher": 20,
+}
+
+# Per table: the columns the generator fills (NOT NULL is dropped from the rest) and the INSERT
+DATASET = {
+    "users": {
+        "columns": ["id", "firstName", "lastName", "email", "password", "role", "isActive", "createdAt"],
+        "sql": """
+            INSERT INTO users (id, "firstName", "lastName", email, password, role, "isActive", "createdAt")
+            SELECT md5('student:' || n)::uuid, 'Student', 'S' || n, 'student' || n || '@bench.school', 'x',
+                   'student', n %% 50 <> 0, %(base)s::timestamp - n * interval '1 minute'
+            FROM generate_series(0, %(students)s - 1) n
+            UNION ALL
+            SELECT md5('teacher:' || n)::uuid, 'Teacher', 'T' || n, 'teacher' || n || '@bench.school', 'x',
+                   'teacher', true, %(base)s::timestamp - n * interval '1 hour'
+            FROM generate_series(0, %(teachers)s - 1) n
+        """,
+    },
+    "grades": {
+        "columns": ["id", "studentId", "courseId", "score", "maxScore", "percentage", "letterGrade", "gradedAt"],
+        "sql": """
+            INSERT INTO grades (id, "studentId", "courseId", score, "maxScore", percentage, "letterGrade", "gradedAt")
+            SELECT md5('grade:' || n)::uuid, md5('student:' || n %% %(students)s)::uuid,
+                   md5('course:' || ((n %% %(students)s) * 3 + n / %(students)s / 2) %% %(courses)s)::uuid,
+                   (n * 37) %% 101, 100, (n * 37) %% 101, 'B', %(base)s::timestamp - (n %% 365) * interval '1 day'
+            FROM generate_series(0, %(students)s * %(grades_per_student)s - 1) n
+        """,
+    },
+    "attendance": {
+        "columns": ["id", "studentId", "courseId", "date", "status", "markedBy", "markedAt"],
+        "sql": """
+            INSERT INTO attendance (id, "studentId", "courseId", date, status, "markedBy", "markedAt")
+            SELECT md5('attendance:' || c || ':' || d || ':' || k)::uuid,
+                   md5('student:' || (c * %(roll_size)s + k) %% %(students)s)::uuid, md5('course:' || c)::uuid,
+                   %(base)s::date - d, CASE WHEN (c + d + k) %% 12 = 0 THEN 'absent' ELSE 'present' END,
+                   md5('teacher:' || c %% %(teachers)s)::uuid, %(base)s::timestamp - d * interval '1 day'
+            FROM generate_series(0, %(courses)s - 1) c, generate_series(0, %(attendance_days)s - 1) d,
+                 generate_series(0, %(roll_size)s - 1) k
+        """,
+    },
+    "messages": {
+        "columns": ["id", "senderId", "receiverId", "subject", "content", "isRead", "createdAt"],
+        "sql": """
+            INSERT INTO messages (id, "senderId", "receiverId", subject, content, "isRead", "createdAt")
+            SELECT md5('message:' || n)::uuid, md5('teacher:' || n %% %(teachers)s)::uuid,
+                   md5('student:' || n %% %(students)s)::uuid, 'Message ' || n, 'Generated message body',
+                   n %% 7 <> 0, %(base)s::timestamp - n * interval '30 seconds'
+            FROM generate_series(0, %(messages)s - 1) n
+        """,
+    },
+    "fees": {
+        "columns": ["id", "studentId", "feeType", "amount", "dueDate", "paidAmount", "status"],
+        "sql": """
+            INSERT INTO fees (id, "studentId", "feeType", amount, "dueDate", "paidAmount", status)
+            SELECT md5('fee:' || n)::uuid, md5('student:' || n %% %(students)s)::uuid,
+                   (ARRAY['tuition', 'library', 'transport'])[n %% 3 + 1], 500,
+                   %(base)s::date + (n %% 360) - 180, CASE n %% 5 WHEN 3 THEN 200 WHEN 0 THEN 500 WHEN 1 THEN 500 ELSE 0 END,
+                   (ARRAY['paid', 'paid', 'pending', 'partial', 'overdue'])[n %% 5 + 1]
+            FROM generate_series(0, %(students)s * %(fees_per_student)s - 1) n
+        """,
+    },
+    "Tests": {
+        "columns": ["id", "title", "subject", "topic", "totalMarks", "duration", "announcementDate",
+                    "conductDate", "status", "isActive", "teacherId"],
+        "sql": """
+            INSERT INTO "Tests" (id, title, subject, topic, "totalMarks", duration, "announcementDate",
+                                 "conductDate", status, "isActive", "teacherId")
+            SELECT md5('test:' || n)::uuid, 'Test ' || n, (ARRAY['Mathematics', 'Physics', 'English'])[n %% 3 + 1],
+                   'Generated topic', 100, 60, %(base)s::timestamp + ((n %% 300) - 160) * interval '1 day',
+                   %(base)s::timestamp + ((n %% 300) - 150) * interval '1 day' + n * interval '1 second',
+                   'upcoming', n %% 20 <> 0, md5('teacher:' || n %% %(teachers)s)::uuid
+            FROM generate_series(0, %(teachers)s * %(tests_per_teacher)s - 1) n
+        """,
+    },
+}
+
+CATALOGUE = [
+    {
+        "name": "user_by_email",
+        "table": "users",
+        "sql": """
+            SELECT id, password, role, "isActive", "lockUntil"
+            FROM users WHERE email = %(email)s
+        """,
+    },
+    {
+        "name": "grades_by_student_course",
+        "table": "grades",
+        "sql": """
+            SELECT id, score, "maxScore", percentage, "letterGrade", "gradedAt"
+            FROM grades WHERE "studentId" = %(student)s AND "courseId" = %(course)s
+            ORDER BY "gradedAt" DESC
+        """,
+    },
+    {
+        "name": "attendance_by_course_date",
+        "table": "attendance",
+        "sql": """
+            SELECT "studentId", status, notes
+            FROM attendance WHERE "courseId" = %(roll_course)s AND date = %(roll_date)s
+        """,
+    },
+    {
+        "name": "unread_messages",
+        "table": "messages",
+        "sql": """
+            SELECT id, "senderId", subject, "createdAt"
+            FROM messages WHERE "receiverId" = %(student)s AND "isRead" = false
+            ORDER BY "createdAt" DESC LIMIT 50
+        """,
+    },
+    {
+        "name": "tests_by_teacher",
+        "table": "Tests",
+        "sql": """
+            SELECT id, title, subject, status, "conductDate"
+            FROM "Tests" WHERE "teacherId" = %(teacher)s AND "isActive" = true
+            ORDER BY "conductDate", id LIMIT 50
+        """,
+    },
+    {
+        "name": "fees_due",
+        "table": "fees",
+        "sql": """
+            SELECT id, "studentId", "feeType", amount - coalesce("paidAmount", 0) AS balance, "dueDate"
+            FROM fees WHERE status IN ('pending', 'partial', 'overdue') AND "dueDate" <= %(due_by)s
+            ORDER BY "dueDate" LIMIT 100
+        """,
+    },
+]
+
+
+def connect():
+    cfg = get_db_config()
+    return psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+
+
+def bench_id(kind: str, n: int) -> str:
+    """Python side of the generator's md5('<kind>:<n>')::uuid ids."""
+    return str(uuid.UUID(hashlib.md5(f"{kind}:{n}".encode("utf-8")).hexdigest()))
+
+
+def scaled_sizes(scale: float) -> Dict[str, int]:
+    sizes = dict(SIZES)
+    for key in ("students", "teachers", "courses", "messages"):
+        sizes[key] = max(10, int(SIZES[key] * scale))
+    return sizes
+
+
+def query_parameters(sizes: Dict[str, int]) -> Dict[str, str]:
+    """Values that hit rows the generator actually wrote, whatever the scale."""
+    student = sizes["students"] // 3
+    return {
+        "email": f"student{student}@bench.school",
+        "student": bench_id("student", student),
+        "course": bench_id("course", (student * 3) % sizes["courses"]),
+        "roll_course": bench_id("course", sizes["courses"] // 4),
+        "roll_date": (date.fromisoformat(BASE_DATE) - timedelta(days=7)).isoformat(),
+        "teacher": bench_id("teacher", sizes["teachers"] // 2 + 1),
+        "due_by": BASE_DATE,
+    }
+
+
+def existing_tables(cur) -> List[str]:
+    cur.execute("""
+        SELECT table_name FROM information_schema.tables
+        WHERE table_schema = 'public' AND table_type = 'BASE TABLE' AND table_name = ANY(%s)
+    """, (list(DATASET),))
+    return [row[0] for row in cur.fetchall()]
+
+
+def build_dataset(conn, sizes: Dict[str, int]) -> List[str]:
+    """(Re)create plan_bench from the current public tables and fill it; returns the tables built."""
+    params = dict(sizes, base=BASE_DATE)
+    schema = sql.Identifier(BENCH_SCHEMA)
+    with conn.cursor() as cur:
+        tables = existing_tables(cur)
+        cur.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(schema))
+        cur.execute(sql.SQL("CREATE SCHEMA {}").format(schema))
+        cur.execute(sql.SQL("SET LOCAL search_path = {}").format(schema))
+        for table in tables:
+            started = time.perf_counter()
+            target = sql.Identifier(BENCH_SCHEMA, table)
+            # Indexes and defaults but no foreign keys, checks or triggers
+            cur.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING INDEXES)").format(
+                target, sql.Identifier("public", table)))
+            cur.execute("""
+                SELECT attname FROM pg_attribute
+                WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped AND attnotnull
+            """, (f'{BENCH_SCHEMA}."{table}"',))
+            for (column,) in cur.fetchall():
+                if column not in DATASET[table]["columns"]:
+                    cur.execute(sql.SQL("ALTER TABLE {} ALTER COLUMN {} DROP NOT NULL").format(
+                        target, sql.Identifier(column)))
+            cur.execute(DATASET[table]["sql"], params)
+            print(f"   🧱 {table}: {cur.rowcount} rows in {time.perf_counter() - started:.1f}s")
+    conn.commit()
+
+    # VACUUM sets the visibility map (index-only scans) and ANALYZE the statistics, as in a settled database
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for table in tables:
+                cur.execute(sql.SQL("VACUUM (ANALYZE) {}").format(sql.Identifier(BENCH_SCHEMA, table)))
+    finally:
+        conn.autocommit = False
+    return tables
+
+
+def bench_tables(cur) -> List[str]:
+    cur.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = %s", (BENCH_SCHEMA,))
+    return [row[0] for row in cur.fetchall()]
+
+
+def plan_shape(node: Dict[str, object]) -> str:
+    """Node types with their relation/index, nested; costs and row counts are left out."""
+    label = str(node["Node Type"])
+    if node.get("Join Type") not in (None, "Inner"):
+        label += f" {node['Join Type']}"
+    if "Strategy" in node:
+        label += f" {node['Strategy']}"
+    if "Relation Name" in node:
+        label += f" on {node['Relation Name']}"
+    if "Index Name" in node:
+        label += f" using {node['Index Name']}"
+    children = node.get("Plans") or []
+    if children:
+        label += "(" + ", ".join(plan_shape(child) for child in children) + ")"
+    return label
+
+
+def explain(cur, query: Dict[str, object], params: Dict[str, str], repeat: int) -> Dict[str, object]:
+    statement = cur.mogrify(query["sql"], params).decode("utf-8")
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement)  # warm-up, not counted
+    runs = []
+    for _ in range(repeat):
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement)
+        document = cur.fetchone()[0]
+        runs.append(document[0] if isinstance(document, list) else json.loads(document)[0])
+    timings = sorted(run["Execution Time"] for run in runs)
+    last = runs[-1]
+    top = last["Plan"]
+    return {
+        "shape": plan_shape(top),
+        "executionMs": round(statistics.median(timings), 3),
+        "minMs": round(timings[0], 3),
+        "planningMs": round(statistics.median(run["Planning Time"] for run in runs), 3),
+        "rows": top.get("Actual Rows"),
+        "sharedHit": top.get("Shared Hit Blocks", 0),
+        "sharedRead": top.get("Shared Read Blocks", 0),
+        "plan": top,
+    }
+
+
+def run_catalogue(conn, sizes: Dict[str, int], repeat: int, only: Optional[List[str]]) -> Dict[str, Dict]:
+    params = query_parameters(sizes)
+    results: Dict[str, Dict] = {}
+    with conn.cursor() as cur:
+        tables = bench_tables(cur)
+        cur.execute(sql.SQL("SET search_path = {}").format(sql.Identifier(BENCH_SCHEMA)))
+        cur.execute("SET max_parallel_workers_per_gather = 0")
+        cur.execute("SET jit = off")
+        for query in CATALOGUE:
+            if only and query["name"] not in only:
+                continue
+            if query["table"] not in tables:
+                print(f"   ⏭️  {query['name']}: table {query['table']} does not exist, skipped")
+                continue
+            results[query["name"]] = explain(cur, query, params, repeat)
+        cur.execute("RESET ALL")
+    conn.rollback()
+    return results
+
+
+def prepare(conn, args) -> Dict[str, int]:
+    sizes = scaled_sizes(args.scale)
+    with conn.cursor() as cur:
+        have = bench_tables(cur)
+    if args.reuse_dataset and have:
+        print(f"♻️  Reusing the existing {BENCH_SCHEMA} dataset (assumed to be --scale {args.scale:g})")
+        return sizes
+    print(f"🏗️  Generating the {BENCH_SCHEMA} dataset at --scale {args.scale:g}")
+    build_dataset(conn, sizes)
+    return sizes
+
+
+def drop_dataset(conn):
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(BENCH_SCHEMA)))
+    conn.commit()
+
+
+def server_version(conn) -> str:
+    with conn.cursor() as cur:
+        cur.execute("SHOW server_version")
+        return cur.fetchone()[0]
+
+
+def print_result(name: str, result: Dict[str, object], marker: str = "  ", note: str = ""):
+    print(f"{marker} {name:<28} {result['executionMs']:>9.3f} ms  {result['rows']!s:>5} rows  "
+          f"{result['sharedHit'] + result['sharedRead']:>6} buffers{note}")
+
+
+def compare(baseline: Dict[str, Dict], current: Dict[str, Dict], threshold: float, min_ms: float) -> int:
+    regressions = 0
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None:
+            print_result(name, result, "🆕", "  (no baseline)")
+            continue
+        changes = []
+        if result["shape"] != before["shape"]:
+            changes.append("plan changed")
+        slower = result["executionMs"] - before["executionMs"]
+        if before["executionMs"] and slower > min_ms and result["executionMs"] > before["executionMs"] * (1 + threshold):
+            changes.append(f"{result['executionMs'] / before['executionMs']:.1f}x slower")
+        if changes:
+            regressions += 1
+            print_result(name, result, "❌", f"  vs {before['executionMs']:.3f} ms: {', '.join(changes)}")
+            if "plan changed" in changes:
+                print(f"      before: {before['shape']}")
+                print(f"      now:    {result['shape']}")
+        else:
+            delta = (result["executionMs"] / before["executionMs"] - 1) * 100 if before["executionMs"] else 0.0
+            print_result(name, result, "✅", f"  ({delta:+.0f}%)")
+    for name in sorted(set(baseline) - set(current)):
+        print(f"⚠️  {name}: in the baseline but not run")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Record and check query plans of the hot queries")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("record", "Run the catalogue and save it as the baseline"),
+                            ("check", "Run the catalogue and compare it with the baseline")):
+        command = sub.add_parser(name, help=help_text)
+        command.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+        command.add_argument("--scale", type=float, default=None,
+                             help="Dataset size multiplier (default 1, or the baseline's for check)")
+        command.add_argument("--repeat", type=int, default=7, help="Timed runs per query; the median is kept")
+        command.add_argument("--only", help="Comma-separated query names")
+        command.add_argument("--keep-dataset", action="store_true", help=f"Leave the {BENCH_SCHEMA} schema in place")
+        command.add_argument("--reuse-dataset", action="store_true", help=f"Use an existing {BENCH_SCHEMA} schema")
+        if name == "check":
+            command.add_argument("--threshold", type=float, default=0.25,
+                                 help="Allowed relative slowdown of the median time (0.25 = 25%%)")
+            command.add_argument("--min-ms", type=float, default=0.5,
+                                 help="Ignore slowdowns smaller than this many milliseconds")
+    sub.add_parser("drop", help=f"Drop the {BENCH_SCHEMA} schema")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        if args.command == "drop":
+            drop_dataset(conn)
+            print(f"🗑️  Dropped {BENCH_SCHEMA}")
+            return 0
+
+        baseline = None
+        if args.command == "check":
+            try:
+                with open(args.baseline, "r", encoding="utf-8") as f:
+                    baseline = json.load(f)
+            except FileNotFoundError:
+                print(f"❌ No baseline at {args.baseline}; run `record` first")
+                return 1
+        if args.scale is None:
+            args.scale = baseline["scale"] if baseline else 1.0
+        elif baseline and args.scale != baseline["scale"]:
+            print(f"⚠️  Baseline was recorded at --scale {baseline['scale']:g}; timings won't be comparable")
+
+        only = [name.strip() for name in args.only.split(",")] if args.only else None
+        try:
+            sizes = prepare(conn, args)
+            current = run_catalogue(conn, sizes, args.repeat, only)
+        finally:
+            if not args.keep_dataset:
+                drop_dataset(conn)
+
+        if args.command == "record":
+            document = {
+                "recordedAt": datetime.now().isoformat(timespec="seconds"),
+                "postgres": server_version(conn),
+                "scale": args.scale,
+                "queries": current,
+            }
+            if only:
+                # A partial record updates those queries and keeps the rest
+                try:
+                    with open(args.baseline, "r", encoding="utf-8") as f:
+                        document["queries"] = dict(json.load(f).get("queries", {}), **current)
+                except FileNotFoundError:
+                    pass
+            with open(args.baseline, "w", encoding="utf-8") as f:
+                json.dump(document, f, indent=2)
+            for name, result in current.items():
+                print_result(name, result)
+            print(f"💾 Recorded {len(current)} query plans to {args.baseline}")
+            return 0
+
+        print(f"🔍 Comparing with {args.baseline} (recorded {baseline['recordedAt']}, "
+              f"PostgreSQL {baseline['postgres']}; now {server_version(conn)})")
+        queries = baseline["queries"]
+        if only:
+            queries = {name: value for name, value in queries.items() if name in only}
+        regressions = compare(queries, current, args.threshold, args.min_ms)
+        if regressions:
+            print(f"\n❌ {regressions} of {len(current)} queries changed plan or got slower")
+            return 1
+        print(f"\n✅ No plan changes or slowdowns beyond {args.threshold:.0%}")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
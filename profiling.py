@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Profiling Switch for School Management System Tooling
+
+Wraps any tooling command and writes what it finds to a run directory
+(profiles/<timestamp>-<command>/ by default):
+
+--profile:
+    profile.pstats   cProfile stats of every thread (open with pstats or snakeviz)
+    profile.txt      top functions by cumulative and by own time
+    stacks.folded    sampled call stacks in collapsed format, one line per
+                     unique stack, for flamegraph.pl / speedscope / inferno
+--trace-memory:
+    memory.txt       tracemalloc peak plus the top allocation sites and
+                     tracebacks still holding memory at the end of the run
+
+Nothing here is imported unless one of the flags is given, so the switch
+costs nothing when it is off. The usual entry point is school_cli.py, which
+takes the flags before the command name; any script can also be run under
+it directly.
+
+Usage:
+    python school_cli.py --profile [--trace-memory] [--profile-dir DIR] <command> [args...]
+    python profiling.py [--profile] [--trace-memory] [--profile-dir DIR] script.py [args...]
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import runpy
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+MEMORY_FRAMES = 10
+
+
+def split_options(argv: List[str]) -> Tuple[dict, List[str]]:
+    """Take the profiling options off the front of argv; the rest is the command."""
+    options = {"profile": False, "trace_memory": False, "profile_dir": None}
+    rest = list(argv)
+    while rest:
+        if rest[0] == "--profile":
+            options["profile"] = True
+        elif rest[0] == "--trace-memory":
+            options["trace_memory"] = True
+        elif rest[0] == "--profile-dir" and len(rest) > 1:
+            options["profile_dir"] = rest.pop(1)
+        elif rest[0].startswith("--profile-dir="):
+            options["profile_dir"] = rest[0].split("=", 1)[1]
+        else:
+            break
+        rest.pop(0)
+    return options, rest
+
+
+class ThreadProfilers:
+    """
+    cProfile only sees the thread that enabled it before Python 3.12, and the
+    tooling does its work in thread pools. On older versions every thread
+    started while this is active gets its own profiler; 3.12+ profiles all
+    threads with the one profiler.
+    """
+
+    def __init__(self):
+        self.main = cProfile.Profile()
+        self.profilers = [self.main]
+        self.lock = threading.Lock()
+        self.per_thread = sys.version_info < (3, 12)
+
+    def _start_thread(self, frame, event, arg):
+        profiler = cProfile.Profile()
+        with self.lock:
+            self.profilers.append(profiler)
+        profiler.enable()  # replaces this hook for the rest of the thread
+
+    def enable(self):
+        if self.per_thread:
+            threading.setprofile(self._start_thread)
+        self.main.enable()
+
+    def disable(self):
+        self.main.disable()
+        if self.per_thread:
+            # Worker profilers stop when pstats snapshots them
+            threading.setprofile(None)
+
+    def stats(self) -> pstats.Stats:
+        stats = pstats.Stats(self.main)
+        for profiler in self.profilers[1:]:
+            try:
+                stats.add(profiler)
+            except TypeError:
+                # A thread that never made a call has no stats
+                continue
+        return stats
+
+
+class StackSampler:
+    """Samples every thread's stack on a timer and counts identical stacks."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    @staticmethod
+    def _label(code) -> str:
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}").replace(";", ":"))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def write(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def run_directory(label: str, base: Optional[str]) -> str:
+    safe = "".join(ch if ch.isalnum() or ch in "-_" else "-" for ch in label) or "run"
+    path = os.path.join(base or "profiles", f"{datetime.now():%Y%m%d-%H%M%S}-{safe}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_profile_report(stats: pstats.Stats, path: str):
+    stream = io.StringIO()
+    stats.stream = stream
+    stream.write("Top functions by cumulative time\n\n")
+    stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    stream.write("\nTop functions by own time\n\n")
+    stats.sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(stream.getvalue())
+
+
+def write_memory_report(snapshot: tracemalloc.Snapshot, peak: int, path: str):
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+    by_line = snapshot.statistics("lineno")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"Peak traced memory: {peak / 1e6:.1f} MB\n")
+        f.write(f"Still allocated at exit: {sum(stat.size for stat in by_line) / 1e6:.1f} MB\n\n")
+        f.write(f"Top {TOP_ALLOCATIONS} allocation sites\n\n")
+        for stat in by_line[:TOP_ALLOCATIONS]:
+            f.write(f"{stat}\n")
+        f.write(f"\nTop {TOP_ALLOCATIONS // 5} allocation tracebacks\n")
+        for stat in snapshot.statistics("traceback")[:TOP_ALLOCATIONS // 5]:
+            f.write(f"\n{stat.size / 1e3:.1f} kB in {stat.count} blocks\n")
+            for line in stat.traceback.format():
+                f.write(f"{line}\n")
+
+
+def run_profiled(label: str, target: Callable[[], Optional[int]], profile: bool = False,
+                 trace_memory: bool = False, profile_dir: Optional[str] = None) -> Optional[int]:
+    """Run target() under the requested instruments; reports are written even if it exits or fails."""
+    if not (profile or trace_memory):
+        return target()
+
+    directory = run_directory(label, profile_dir)
+    profilers = ThreadProfilers() if profile else None
+    sampler = StackSampler() if profile else None
+    if trace_memory:
+        tracemalloc.start(MEMORY_FRAMES)
+    if sampler:
+        sampler.start()
+    if profilers:
+        profilers.enable()
+    started = time.perf_counter()
+    try:
+        return target()
+    finally:
+        elapsed = time.perf_counter() - started
+        if profilers:
+            profilers.disable()
+        if sampler:
+            sampler.stop()
+        written = []
+        # Memory first, so building the profile reports doesn't show up in it
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            write_memory_report(snapshot, peak, os.path.join(directory, "memory.txt"))
+            written.append("memory.txt")
+        if profilers:
+            stats = profilers.stats()
+            stats.dump_stats(os.path.join(directory, "profile.pstats"))
+            write_profile_report(stats, os.path.join(directory, "profile.txt"))
+            sampler.write(os.path.join(directory, "stacks.folded"))
+            written += ["profile.pstats", "profile.txt", "stacks.folded"]
+        sys.stderr.write(f"\n🔬 {label} took {elapsed:.2f}s; wrote {', '.join(written)} to {directory}/\n")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options, rest = split_options(sys.argv[1:] if argv is None else argv)
+    if not rest or rest[0] in ("-h", "--help"):
+        print(__doc__)
+        return 0 if rest else 2
+    if not (options["profile"] or options["trace_memory"]):
+        options["profile"] = True  # running under this script means profiling was wanted
+
+    script, args = rest[0], rest[1:]
+    sys.argv = [script] + args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+
+    def target() -> Optional[int]:
+        try:
+            runpy.run_path(script, run_name="__main__")
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        return 0
+
+    label = os.path.splitext(os.path.basename(script))[0]
+    return run_profiled(label, target, **options) or 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
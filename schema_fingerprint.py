@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Schema Fingerprint for School Management System
+
+Describes the tables DatabaseSetup manages as one sorted list of entries
+(tables, columns with type/nullability/default, constraints, indexes and
+triggers, as PostgreSQL itself renders them) and hashes that list in the
+same catalog query. Comparing the hash with the expected one in
+schema_fingerprint.json costs a single round trip; the entries are only
+fetched, and diffed against the recorded ones, when the hashes differ.
+
+The lowercase tests/test_comments/test_submissions tables created by
+setup_database.py are tracked as well: the routes read Sequelize's "Tests",
+"TestComments" and "TestSubmissions", so finding the lowercase ones means
+the two setups have diverged.
+
+After an intentional schema change, run `record` against a freshly set-up
+database and commit the updated schema_fingerprint.json.
+
+Usage:
+    python schema_fingerprint.py check [--json]     # exit 1 on drift
+    python schema_fingerprint.py record [--output schema_fingerprint.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+
+from create_user import get_db_config
+
+EXPECTED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema_fingerprint.json")
+
+# Everything DatabaseSetup.create_new_schema, create_message_counters and create_email_outbox create
+TRACKED_TABLES = [
+    "users", "subjects", "courses", "assignments", "grades", "attendance", "messages", "events", "fees",
+    "message_counters", "user_message_counters", "email_outbox",
+]
+
+# Tables that must not exist next to the tracked ones
+SHADOW_TABLES = ["tests", "test_comments", "test_submissions"]
+
+ENTRIES_SQL = """
+    WITH tracked AS (
+        SELECT c.oid, c.relname
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p') AND c.relname = ANY(%(tables)s)
+    ), entries AS (
+        SELECT 'table' AS kind, relname AS tbl, relname AS name, '' AS definition FROM tracked
+        UNION ALL
+        SELECT 'column', t.relname, a.attname,
+               format_type(a.atttypid, a.atttypmod)
+               || CASE WHEN a.attnotnull THEN ' not null' ELSE '' END
+               || coalesce(' default ' || pg_get_expr(d.adbin, d.adrelid), '')
+        FROM tracked t
+        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum > 0 AND NOT a.attisdropped
+        LEFT JOIN pg_attrdef d ON d.adrelid = t.oid AND d.adnum = a.attnum
+        UNION ALL
+        SELECT 'constraint', t.relname, con.conname, pg_get_constraintdef(con.oid)
+        FROM tracked t JOIN pg_constraint con ON con.conrelid = t.oid
+        UNION ALL
+        SELECT 'index', t.relname, i.relname, pg_get_indexdef(i.oid)
+        FROM tracked t JOIN pg_index x ON x.indrelid = t.oid JOIN pg_class i ON i.oid = x.indexrelid
+        UNION ALL
+        SELECT 'trigger', t.relname, tg.tgname, pg_get_triggerdef(tg.oid)
+        FROM tracked t JOIN pg_trigger tg ON tg.tgrelid = t.oid AND NOT tg.tgisinternal
+    )
+"""
+
+FINGERPRINT_SQL = ENTRIES_SQL + """
+    SELECT md5(coalesce(string_agg(concat_ws(' ', kind, tbl, name, definition), E'\\n'
+                                   ORDER BY kind COLLATE "C", tbl COLLATE "C", name COLLATE "C"), '')),
+           count(*)
+    FROM entries
+"""
+
+LIST_SQL = ENTRIES_SQL + """
+    SELECT kind, tbl, name, definition FROM entries
+    ORDER BY kind COLLATE "C", tbl COLLATE "C", name COLLATE "C"
+"""
+
+
+def connect():
+    cfg = get_db_config()
+    return psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+
+
+def query_params() -> Dict[str, List[str]]:
+    return {"tables": TRACKED_TABLES + SHADOW_TABLES}
+
+
+def fingerprint(cur) -> Tuple[str, int]:
+    """Hash and entry count of the live schema, in one round trip."""
+    cur.execute(FINGERPRINT_SQL, query_params())
+    digest, count = cur.fetchone()
+    return digest, count
+
+
+def schema_entries(cur) -> List[List[str]]:
+    cur.execute(LIST_SQL, query_params())
+    return [list(row) for row in cur.fetchall()]
+
+
+def load_expected(path: str = EXPECTED_PATH) -> Optional[Dict[str, object]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def diff_schema(expected: List[List[str]], actual: List[List[str]]) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Missing, unexpected and changed entries. The columns, constraints and
+    indexes of a table that is missing or unexpected as a whole are folded
+    into that table's entry.
+    """
+    before = {(kind, table, name): definition for kind, table, name, definition in expected}
+    after = {(kind, table, name): definition for kind, table, name, definition in actual}
+    tables_before = {table for kind, table, _ in before if kind == "table"}
+    tables_after = {table for kind, table, _ in after if kind == "table"}
+
+    def entry(key, **extra):
+        return dict({"kind": key[0], "table": key[1], "name": key[2]}, **extra)
+
+    missing = [entry(key, expected=before[key]) for key in sorted(before.keys() - after.keys())
+               if key[0] == "table" or key[1] in tables_after]
+    unexpected = [entry(key, actual=after[key]) for key in sorted(after.keys() - before.keys())
+                  if key[0] == "table" or key[1] in tables_before]
+    changed = [entry(key, expected=before[key], actual=after[key])
+               for key in sorted(before.keys() & after.keys()) if before[key] != after[key]]
+    return {"missing": missing, "unexpected": unexpected, "changed": changed}
+
+
+def print_diff(differences: Dict[str, List[Dict[str, str]]]):
+    for item in differences["missing"]:
+        target = item["table"] if item["kind"] == "table" else f"{item['table']}.{item['name']}"
+        print(f"   ➖ missing {item['kind']} {target}" + (f": {item['expected']}" if item["expected"] else ""))
+    for item in differences["unexpected"]:
+        target = item["table"] if item["kind"] == "table" else f"{item['table']}.{item['name']}"
+        note = " (the app uses the Sequelize tables)" if item["table"] in SHADOW_TABLES else ""
+        print(f"   ➕ unexpected {item['kind']} {target}" + (f": {item['actual']}" if item["actual"] else "") + note)
+    for item in differences["changed"]:
+        print(f"   ✏️  {item['kind']} {item['table']}.{item['name']}")
+        print(f"        expected: {item['expected']}")
+        print(f"        actual:   {item['actual']}")
+
+
+def check(cur, path: str = EXPECTED_PATH) -> Tuple[bool, Optional[Dict[str, List[Dict[str, str]]]]]:
+    """(matches, diff); the diff is only computed, with a second query, on a mismatch."""
+    expected = load_expected(path)
+    if expected is None:
+        raise FileNotFoundError(f"no expected fingerprint at {path}; run `python schema_fingerprint.py record`")
+    digest, _ = fingerprint(cur)
+    if digest == expected["fingerprint"]:
+        return True, None
+    return False, diff_schema(expected["entries"], schema_entries(cur))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare the database schema with the expected fingerprint")
+    sub = parser.add_subparsers(dest="command", required=True)
+    check_parser = sub.add_parser("check", help="Compare the live schema with the expected fingerprint")
+    check_parser.add_argument("--expected", default=EXPECTED_PATH, help="Expected fingerprint file")
+    check_parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    record_parser = sub.add_parser("record", help="Write the live schema as the expected fingerprint")
+    record_parser.add_argument("--output", default=EXPECTED_PATH, help="Fingerprint file to write")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            if args.command == "record":
+                digest, count = fingerprint(cur)
+                entries = schema_entries(cur)
+                # One entry per line, so changes to the file review like changes to the schema
+                with open(args.output, "w", encoding="utf-8") as f:
+                    f.write("{\n")
+                    f.write(f'  "recordedAt": {json.dumps(datetime.now().isoformat(timespec="seconds"))},\n')
+                    f.write(f'  "fingerprint": {json.dumps(digest)},\n')
+                    f.write('  "entries": [\n')
+                    f.write(",\n".join(f"    {json.dumps(entry)}" for entry in entries))
+                    f.write("\n  ]\n}\n")
+                print(f"💾 Recorded {count} schema entries ({digest}) to {args.output}")
+                return 0
+
+            matches, differences = check(cur, args.expected)
+    finally:
+        conn.close()
+
+    if args.json:
+        print(json.dumps({"matches": matches, "differences": differences}))
+    elif matches:
+        print("✅ Schema matches the expected fingerprint")
+    else:
+        print("⚠️  Schema differs from the expected fingerprint:")
+        print_diff(differences)
+    return 0 if matches else 1
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Unified Command Line for School Management System
+
+One entry point for every tooling script in the project root. Subcommands
+map to the existing scripts and the script's module (with psycopg2, bcrypt,
+requests, Pillow, ...) is imported only when that subcommand runs, so
+`--help`, `health` and `stats` start in a few tens of milliseconds and
+nothing connects anywhere at import time.
+
+Usage:
+    python school_cli.py                      # list commands
+    python school_cli.py <command> [args...]  # e.g. timetable 2024-2025 fall
+    python school_cli.py health [--url http://localhost:5000] [--db]
+    python school_cli.py stats
+    python school_cli.py bench-startup [--runs 20]
+    python school_cli.py --profile [--trace-memory] [--profile-dir DIR] <command> [args...]
+
+--profile and --trace-memory go before the command and write cProfile
+stats, flamegraph stacks and tracemalloc reports for that run; see
+profiling.py.
+"""
+
+import os
+import sys
+import time
+from typing import List, Optional
+
+# command -> (module, description, whether main() takes an argv list)
+COMMANDS = {
+    "setup-db": ("database_setup", "Drop and recreate the whole schema with demo data (interactive)", False),
+    "fix-db": ("fix_db", "Recreate the users table with Sequelize column names (interactive)", False),
+    "setup-tables": ("setup_database", "Create the users/tests tables when they are missing", False),
+    "create-users": ("create_user", "Insert the default admin, teacher, student and parent users", False),
+    "check-tests": ("check_tests", "Show test and user counts", False),
+    "seed-tests": ("test_seed", "Seed sample tests, comments and submissions (idempotent)", True),
+    "backend": ("backend_updater", "User management through the API (menu, or `plan FILE`)", True),
+    "timetable": ("timetable_conflicts", "Report timetable clashes for a term", True),
+    "enroll": ("enrollment_engine", "Process queued enrolment requests", True),
+    "message-counters": ("message_counters", "Install, backfill or verify unread-message counters", True),
+    "grade-columns": ("grade_columns", "Install, backfill or verify derived grade percentage/letter", True),
+    "archive": ("archive_cold_data", "Archive, export or restore cold rows", True),
+    "email": ("email_worker", "Deliver queued outbox emails", True),
+    "uploads": ("upload_store", "Deduplicate uploads into the content-addressed store", True),
+    "renditions": ("image_renditions", "Render WebP thumbnails of uploaded images", True),
+    "auth-maintenance": ("auth_maintenance", "Clear expired locks and auth tokens", True),
+    "integrity": ("integrity_scan", "Find and repair orphaned references", True),
+    "fleet": ("tenant_fleet", "Run setup, migrations or provisioning across tenant databases", True),
+    "db-maintenance": ("db_maintenance", "ANALYZE/VACUUM tables with stale planner statistics", True),
+    "metrics": ("metrics_exporter", "Serve database and API health metrics for Prometheus", True),
+    "codemod": ("codemod", "Structural rewrites of server/routes (dry-run diffs, cached)", True),
+    "schema": ("schema_fingerprint", "Check the schema against the expected fingerprint", True),
+    "plans": ("plan_regression", "Record or check query plans of the hot queries", True),
+    "calendar": ("ical_feeds", "Regenerate the per-user iCalendar feeds incrementally", True),
+    "bench": ("api_bench", "Benchmark a running backend (auth throughput, attendance burst)", True),
+}
+
+BUILTINS = {
+    "health": "Check the backend /api/health endpoint (and the database with --db)",
+    "stats": "Approximate row counts of the main tables from pg_stat_user_tables",
+    "bench-startup": "Measure cold start time of the quick commands",
+}
+
+# Modules that must not be loaded by `import school_cli` or the quick commands
+HEAVY_MODULES = ("psycopg2", "bcrypt", "requests", "PIL")
+
+STATS_TABLES = ("users", "courses", "course_enrollments", "tests", "grades", "attendance",
+                "messages", "attachments", "events", "assignments")
+
+
+def print_commands():
+    print("🚀 School Management System - Tools")
+    print("\nUsage: python school_cli.py <command> [args...]\n")
+    width = max(len(name) for name in list(COMMANDS) + list(BUILTINS))
+    for name, (_, description, _) in COMMANDS.items():
+        print(f"  {name:<{width}}  {description}")
+    print()
+    for name, description in BUILTINS.items():
+        print(f"  {name:<{width}}  {description}")
+
+
+def connect():
+    # Deferred: only commands that talk to PostgreSQL pay for psycopg2
+    import psycopg2
+    from create_user import get_db_config
+    cfg = get_db_config()
+    return psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+
+
+def health(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="school_cli.py health", description=BUILTINS["health"])
+    parser.add_argument("--url", default=os.getenv("BACKEND_URL", "http://localhost:5000"))
+    parser.add_argument("--db", action="store_true", help="Also run SELECT 1 against the database")
+    parser.add_argument("--timeout", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    # http.client rather than urllib.request/requests: a fraction of the import cost
+    import http.client
+    from urllib.parse import urlsplit
+
+    url = urlsplit(args.url)
+    connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+    ok = True
+    started = time.perf_counter()
+    try:
+        connection = connection_class(url.netloc, timeout=args.timeout)
+        try:
+            connection.request("GET", url.path.rstrip("/") + "/api/health")
+            status = connection.getresponse().status
+        finally:
+            connection.close()
+    except (OSError, http.client.HTTPException) as e:
+        print(f"❌ Backend unreachable at {args.url}: {e}")
+        status = None
+    elapsed = (time.perf_counter() - started) * 1000
+    if status is not None:
+        ok = status == 200
+        print(f"{'✅' if ok else '⚠️ '} Backend {args.url}: HTTP {status} in {elapsed:.0f} ms")
+    else:
+        ok = False
+
+    if args.db:
+        started = time.perf_counter()
+        try:
+            conn = connect()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                    cur.fetchone()
+            finally:
+                conn.close()
+            print(f"✅ Database reachable in {(time.perf_counter() - started) * 1000:.0f} ms")
+        except Exception as e:
+            print(f"❌ Database error: {e}")
+            ok = False
+    return 0 if ok else 1
+
+
+def stats(argv: List[str]) -> int:
+    if argv:
+        print("❌ stats takes no arguments")
+        return 2
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            # Planner statistics instead of count(*): one cheap catalog query
+            cur.execute("""
+                SELECT relname, n_live_tup, pg_total_relation_size(relid)
+                FROM pg_stat_user_tables
+                WHERE schemaname = 'public' AND relname = ANY(%s)
+                ORDER BY relname
+            """, (list(STATS_TABLES),))
+            rows = cur.fetchall()
+        conn.commit()
+    finally:
+        conn.close()
+    print("📊 Table sizes (approximate):")
+    for name, live, size in rows:
+        print(f"  - {name}: ~{live} rows, {size / 1e6:.1f} MB")
+    return 0
+
+
+def bench_startup(argv: List[str]) -> int:
+    import argparse
+    import statistics
+    import subprocess
+
+    parser = argparse.ArgumentParser(prog="school_cli.py bench-startup", description=BUILTINS["bench-startup"])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    script = os.path.abspath(__file__)
+    probe = (f"import sys; sys.path.insert(0, {os.path.dirname(script)!r}); import school_cli; "
+             f"print(','.join(m for m in school_cli.HEAVY_MODULES if m in sys.modules))")
+    loaded = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True).stdout.strip()
+    if loaded:
+        print(f"❌ Importing school_cli pulled in: {loaded}")
+    else:
+        print("✅ Importing school_cli loads none of: " + ", ".join(HEAVY_MODULES))
+
+    cases = [
+        ("python -c pass (interpreter floor)", [sys.executable, "-c", "pass"]),
+        ("school_cli.py", [sys.executable, script]),
+        ("school_cli.py health --help", [sys.executable, script, "health", "--help"]),
+    ]
+    print(f"⏱️  Cold start over {args.runs} runs:")
+    for label, command in cases:
+        timings = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"  - {label}: median {statistics.median(timings):.1f} ms, max {max(timings):.1f} ms")
+    return 1 if loaded else 0
+
+
+def run_script(name: str, argv: List[str]) -> Optional[int]:
+    import importlib
+
+    module_name, _, takes_args = COMMANDS[name]
+    if argv and not takes_args:
+        print(f"❌ {name} takes no arguments")
+        return 2
+    sys.argv = [f"school_cli.py {name}"] + argv  # argparse uses this for its usage line
+    module = importlib.import_module(module_name)
+    return module.main(argv) if takes_args else module.main()
+
+
+def dispatch(name: str, rest: List[str]) -> int:
+    if name == "health":
+        return health(rest)
+    if name == "stats":
+        return stats(rest)
+    if name == "bench-startup":
+        return bench_startup(rest)
+    if name not in COMMANDS:
+        print(f"❌ Unknown command: {name}\n")
+        print_commands()
+        return 2
+    return run_script(name, rest) or 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    options = None
+    if argv and (argv[0].startswith("--profile") or argv[0] == "--trace-memory"):
+        # Only imported when asked for, so the switch costs nothing when off
+        from profiling import split_options
+        options, argv = split_options(argv)
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print_commands()
+        return 0
+    name, rest = argv[0], argv[1:]
+    if options is None:
+        return dispatch(name, rest)
+    from profiling import run_profiled
+    return run_profiled(name, lambda: dispatch(name, rest), **options) or 0
+
+
+if __name__ == "__main__":
+    # Run from any directory: the scripts import each other by module name
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
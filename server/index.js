@@ -97,8 +97,8 @@ app.use(cors({
 
 // Rate limiting
 const limiter = rateLimit({
-	windowMs: 15 * 60 * 1000,
-	max: 100,
+	windowMs: parseInt(process.env.RATE_LIMIT_WINDOW_MS, 10) || 15 * 60 * 1000,
+	max: parseInt(process.env.RATE_LIMIT_MAX_REQUESTS, 10) || 100,
 	message: 'Too many requests from this IP, please try again later.'
 });
 app.use('/api/', limiter);
@@ -120,6 +120,19 @@ try {
 // Static files
 app.use('/uploads', express.static(uploadsDir));
 
+// iCalendar feeds written by ical_feeds.py; file names are unguessable tokens,
+// so polls are plain file reads answered with 304 while a feed is unchanged
+const calendarDir = path.resolve(__dirname, '..', process.env.CALENDAR_FEED_PATH || 'calendar_feeds');
+app.use('/calendar', express.static(calendarDir, {
+	etag: true,
+	lastModified: true,
+	index: false,
+	dotfiles: 'ignore',
+	setHeaders: (res) => {
+		res.setHeader('Cache-Control', 'private, max-age=300');
+	}
+}));
+
 // Test the database connection
 sequelize.authenticate()
 	.then(() => {
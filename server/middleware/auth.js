@@ -1,5 +1,25 @@
 const jwt = require('jsonwebtoken');
 const User = require('../models/User');
+const { principalCache, PRINCIPAL_ATTRIBUTES, toPrincipal } = require('../services/principalCache');
+
+// Per-request tracing only with LOG_LEVEL=debug; it used to print on every call
+const debugEnabled = (process.env.LOG_LEVEL || '').toLowerCase() === 'debug';
+const debug = debugEnabled ? (...args) => console.log('[auth]', ...args) : () => {};
+
+// Cached { id, role, isActive, lockUntil } for a user id, loading it on a miss
+const loadPrincipal = async (userId) => {
+  const cached = principalCache.get(userId);
+  if (cached) {
+    return cached;
+  }
+  const user = await User.findByPk(userId, { attributes: PRINCIPAL_ATTRIBUTES, raw: true });
+  if (!user) {
+    return null;
+  }
+  const principal = toPrincipal(user);
+  principalCache.set(userId, principal);
+  return principal;
+};
 
 // Verify JWT token
 const authenticateToken = async (req, res, next) => {
@@ -7,10 +27,6 @@ const authenticateToken = async (req, res, next) => {
     const authHeader = req.headers['authorization'];
     const token = authHeader && authHeader.split(' ')[1]; // Bearer TOKEN
 
-    console.log('=== AUTH DEBUG ===');
-    console.log('Auth header:', authHeader);
-    console.log('Token:', token ? `${token.substring(0, 20)}...` : 'No token');
-
     if (!token) {
       return res.status(401).json({ 
         success: false, 
@@ -19,20 +35,11 @@ const authenticateToken = async (req, res, next) => {
     }
 
     const decoded = jwt.verify(token, process.env.JWT_SECRET);
-    console.log('Decoded token:', decoded);
-    
+
     // Find user and check if active
-    const user = await User.findByPk(decoded.userId, {
-      attributes: { exclude: ['password'] }
-    });
-    
-    console.log('Found user:', user ? {
-      id: user.id,
-      role: user.role,
-      email: user.email,
-      isActive: user.isActive
-    } : 'No user found');
-    
+    const user = await loadPrincipal(decoded.userId);
+    debug('principal', decoded.userId, user ? { role: user.role, isActive: user.isActive } : 'not found');
+
     if (!user) {
       return res.status(401).json({ 
         success: false, 
@@ -48,7 +55,7 @@ const authenticateToken = async (req, res, next) => {
     }
 
     // Check if account is locked
-    if (user.isLocked && user.lockUntil > Date.now()) {
+    if (user.lockUntil && user.lockUntil > Date.now()) {
       return res.status(423).json({ 
         success: false, 
         message: 'Account is temporarily locked due to multiple failed login attempts' 
@@ -56,15 +63,8 @@ const authenticateToken = async (req, res, next) => {
     }
 
     req.user = user;
-    console.log('Set req.user:', {
-      id: req.user.id,
-      role: req.user.role,
-      email: req.user.email
-    });
-    console.log('==================');
     next();
   } catch (error) {
-    console.error('Auth middleware error:', error);
     if (error.name === 'JsonWebTokenError') {
       return res.status(401).json({ 
         success: false, 
@@ -77,6 +77,7 @@ const authenticateToken = async (req, res, next) => {
         message: 'Token expired' 
       });
     }
+    console.error('Auth middleware error:', error);
     return res.status(500).json({ 
       success: false, 
       message: 'Authentication error' 
@@ -87,36 +88,21 @@ const authenticateToken = async (req, res, next) => {
 // Role-based authorization middleware
 const authorizeRoles = (...roles) => {
   return (req, res, next) => {
-    console.log('=== ROLE CHECK DEBUG ===');
-    console.log('Required roles:', roles);
-    console.log('req.user:', req.user ? {
-      id: req.user.id,
-      role: req.user.role,
-      email: req.user.email
-    } : 'No user');
-    
     if (!req.user) {
-      console.log('No user found in req.user');
       return res.status(401).json({ 
         success: false, 
         message: 'Authentication required' 
       });
     }
 
-    console.log('User role:', req.user.role);
-    console.log('Checking if role is in:', roles);
-    console.log('Result:', roles.includes(req.user.role));
-    
     if (!roles.includes(req.user.role)) {
-      console.log('Access denied - role not in required roles');
+      debug('role check failed', req.user.id, req.user.role, 'not in', roles);
       return res.status(403).json({ 
         success: false, 
         message: `Access denied. Required roles: ${roles.join(', ')}` 
       });
     }
 
-    console.log('Role check passed - proceeding');
-    console.log('==================');
     next();
   };
 };
@@ -75,6 +75,12 @@ const Test = sequelize.define('Test', {
     {
       fields: ['conductDate']
     },
+    {
+      // Keyset order of GET /api/tests
+      name: 'tests_active_conduct_date_id',
+      fields: ['conductDate', 'id'],
+      where: { isActive: true }
+    },
     {
       fields: ['status']
     }
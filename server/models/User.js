@@ -1,6 +1,7 @@
 const { DataTypes } = require('sequelize');
 const bcrypt = require('bcryptjs');
 const { sequelize } = require('../config/database');
+const { principalCache } = require('../services/principalCache');
 
 const User = sequelize.define('User', {
   id: {
@@ -144,6 +145,20 @@ const User = sequelize.define('User', {
       if (user.changed('password')) {
         user.password = await bcrypt.hash(user.password, 12);
       }
+    },
+    // Role, deactivation and locks must take effect on the next request
+    afterUpdate: (user) => {
+      principalCache.invalidate(user.id);
+    },
+    afterDestroy: (user) => {
+      principalCache.invalidate(user.id);
+    },
+    // Bulk statements don't say which rows changed
+    afterBulkUpdate: () => {
+      principalCache.clear();
+    },
+    afterBulkDestroy: () => {
+      principalCache.clear();
     }
   }
 });
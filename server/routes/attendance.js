@@ -4,6 +4,8 @@ const Attendance = require('../models/Attendance');
 const Class = require('../models/Class');
 const Course = require('../models/Course');
 const User = require('../models/User');
+const { QueryTypes } = require('sequelize');
+const { sequelize } = require('../config/database');
 const { authorizeTeacher, authorizeResource } = require('../middleware/auth');
 
 const router = express.Router();
@@ -503,15 +505,43 @@ router.post('/:id/lock', authorizeTeacher, async (req, res) => {
   }
 });
 
-// Bulk mark attendance
+// Mark a whole roll against the Postgres attendance table. One statement
+// checks the course, upserts every row on ("studentId", "courseId", date)
+// and counts the statuses, so a 30-student roll is a single round trip.
+const BULK_ATTENDANCE_SQL = `
+  WITH course AS (
+    SELECT id FROM courses
+    WHERE id = CAST(:courseId AS uuid) AND (:isAdmin OR "instructorId" = CAST(:userId AS uuid))
+  ), roll AS (
+    SELECT * FROM jsonb_to_recordset(CAST(:roll AS jsonb)) AS r("studentId" uuid, status varchar(20), notes text)
+  ), written AS (
+    INSERT INTO attendance ("studentId", "courseId", date, status, notes, "markedBy", "markedAt", "updatedAt")
+    SELECT roll."studentId", course.id, CAST(:date AS date), roll.status, roll.notes, CAST(:userId AS uuid), now(), now()
+    FROM roll CROSS JOIN course
+    ON CONFLICT ("studentId", "courseId", date) DO UPDATE
+    SET status = EXCLUDED.status, notes = EXCLUDED.notes, "markedBy" = EXCLUDED."markedBy",
+        "markedAt" = EXCLUDED."markedAt", "updatedAt" = EXCLUDED."updatedAt"
+    RETURNING (xmax = 0) AS inserted, status
+  )
+  SELECT (SELECT count(*) FROM course)::int AS "courseFound",
+         count(*)::int AS total,
+         count(*) FILTER (WHERE inserted)::int AS inserted,
+         count(*) FILTER (WHERE status = 'present')::int AS present,
+         count(*) FILTER (WHERE status = 'absent')::int AS absent,
+         count(*) FILTER (WHERE status = 'late')::int AS late,
+         count(*) FILTER (WHERE status = 'excused')::int AS excused
+  FROM written
+`;
+
+// Mark bulk attendance
 router.post('/bulk', [
   authorizeTeacher,
-  body('classId').isMongoId().withMessage('Valid class ID is required'),
-  body('courseId').isMongoId().withMessage('Valid course ID is required'),
+  body('courseId').isUUID().withMessage('Valid course ID is required'),
   body('date').isISO8601().withMessage('Valid date is required'),
-  body('attendanceData').isArray().withMessage('Attendance data must be an array'),
-  body('attendanceData.*.studentId').isMongoId().withMessage('Valid student ID is required'),
-  body('attendanceData.*.status').isIn(['present', 'absent', 'late', 'excused']).withMessage('Valid status is required')
+  body('attendanceData').isArray({ min: 1 }).withMessage('Attendance data must be a non-empty array'),
+  body('attendanceData.*.studentId').isUUID().withMessage('Valid student ID is required'),
+  body('attendanceData.*.status').isIn(['present', 'absent', 'late', 'excused']).withMessage('Valid status is required'),
+  body('attendanceData.*.notes').optional({ nullable: true }).isString().isLength({ max: 500 })
 ], async (req, res) => {
   try {
     const errors = validationResult(req);
@@ -525,92 +555,63 @@ router.post('/bulk', [
       });
     }
 
-    const { classId, courseId, date, attendanceData } = req.body;
-
-    // Check if class exists and teacher is assigned
-    const classDoc = await Class.findById(classId);
-    if (!classDoc) {
-      return res.status(404).json({
-        success: false,
-        error: {
-          message: 'Class not found'
-        }
-      });
-    }
-
-    if (classDoc.teacherId.toString() !== req.user.id) {
-      return res.status(403).json({
-        success: false,
-        error: {
-          message: 'You can only take attendance for your own classes'
-        }
-      });
-    }
+    const { courseId, date, attendanceData } = req.body;
 
-    // Check if attendance already exists
-    let attendance = await Attendance.findOne({
-      classId,
-      date: new Date(date)
+    // One row per student (the last entry wins); ON CONFLICT can't touch a row twice
+    const roll = new Map();
+    attendanceData.forEach(({ studentId, status, notes }) => {
+      roll.set(studentId, { studentId, status, notes: notes || null });
     });
 
-    if (attendance) {
-      // Update existing attendance
-      if (attendance.isLocked) {
-        return res.status(400).json({
-          success: false,
-          error: {
-            message: 'Attendance record is locked and cannot be modified'
-          }
-        });
-      }
-
-      attendance.studentRecords = attendanceData;
-      attendance.statistics = {
-        present: attendanceData.filter(r => r.status === 'present').length,
-        absent: attendanceData.filter(r => r.status === 'absent').length,
-        late: attendanceData.filter(r => r.status === 'late').length,
-        excused: attendanceData.filter(r => r.status === 'excused').length
-      };
-    } else {
-      // Create new attendance
-      const statistics = {
-        present: attendanceData.filter(r => r.status === 'present').length,
-        absent: attendanceData.filter(r => r.status === 'absent').length,
-        late: attendanceData.filter(r => r.status === 'late').length,
-        excused: attendanceData.filter(r => r.status === 'excused').length
-      };
-
-      attendance = new Attendance({
-        classId,
+    const [result] = await sequelize.query(BULK_ATTENDANCE_SQL, {
+      replacements: {
         courseId,
-        teacherId: req.user.id,
-        date: new Date(date),
-        studentRecords: attendanceData,
-        statistics,
-        status: 'completed'
-      });
+        userId: req.user.id,
+        isAdmin: req.user.role === 'admin',
+        date: String(date).slice(0, 10),
+        roll: JSON.stringify([...roll.values()])
+      },
+      type: QueryTypes.SELECT
+    });
 
-      // Update class with attendance reference
-      await Class.findByIdAndUpdate(classId, {
-        attendanceId: attendance._id
+    if (!result.courseFound) {
+      return res.status(req.user.role === 'admin' ? 404 : 403).json({
+        success: false,
+        error: {
+          message: req.user.role === 'admin'
+            ? 'Course not found'
+            : 'You can only take attendance for your own courses'
+        }
       });
     }
 
-    await attendance.save();
-
-    await attendance.populate('classId', 'title date startTime endTime');
-    await attendance.populate('courseId', 'code title');
-    await attendance.populate('teacherId', 'name email');
-    await attendance.populate('studentRecords.studentId', 'name email studentId');
-
     res.json({
       success: true,
       message: 'Bulk attendance marked successfully',
       data: {
-        attendance
+        courseId,
+        date: String(date).slice(0, 10),
+        total: result.total,
+        inserted: result.inserted,
+        updated: result.total - result.inserted,
+        statistics: {
+          present: result.present,
+          absent: result.absent,
+          late: result.late,
+          excused: result.excused
+        }
       }
     });
   } catch (error) {
+    if (error.name === 'SequelizeForeignKeyConstraintError') {
+      return res.status(422).json({
+        success: false,
+        error: {
+          message: 'Unknown student in attendance data',
+          details: error.message
+        }
+      });
+    }
     res.status(500).json({
       success: false,
       error: {
@@ -440,7 +440,7 @@ router.post('/change-password', validatePasswordChange, async (req, res) => {
 // @route   POST /api/auth/refresh-token
 // @desc    Refresh JWT token
 // @access  Private
-router.post('/refresh-token', async (req, res) => {
+router.post('/refresh-token', authenticateToken, async (req, res) => {
   try {
     const userId = req.user.id;
     const user = await User.findByPk(userId);
@@ -1,9 +1,16 @@
+const crypto = require('crypto');
 const express = require('express');
 const { body, validationResult } = require('express-validator');
 const { authenticateToken, authorizeRoles } = require('../middleware/auth');
 
 const router = express.Router();
 
+// Same derivation as feed_token() in ical_feeds.py
+const feedToken = (userId) => {
+  const secret = process.env.CALENDAR_FEED_SECRET || process.env.JWT_SECRET;
+  return crypto.createHmac('sha256', secret).update(String(userId)).digest('hex').slice(0, 32);
+};
+
 // Get all events
 router.get('/', authenticateToken, async (req, res) => {
   try {
@@ -285,6 +292,16 @@ router.get('/calendar/events', authenticateToken, async (req, res) => {
   }
 });
 
+// Get the caller's iCalendar subscription URL
+router.get('/calendar/feed', authenticateToken, (req, res) => {
+  try {
+    res.json({ url: `/calendar/${feedToken(req.user.id)}.ics` });
+  } catch (error) {
+    console.error('Error building calendar feed URL:', error);
+    res.status(500).json({ message: 'Internal server error' });
+  }
+});
+
 // Get upcoming events
 router.get('/upcoming/list', authenticateToken, async (req, res) => {
   try {
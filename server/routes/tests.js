@@ -1,83 +1,105 @@
 const express = require('express');
 const { body, validationResult } = require('express-validator');
 const { authenticateToken, authorizeRoles } = require('../middleware/auth');
-const { Test, TestComment, TestSubmission, User } = require('../models');
-const { Op } = require('sequelize');
+const { sequelize, Test, TestComment, TestSubmission, User } = require('../models');
+const { QueryTypes } = require('sequelize');
 
 const router = express.Router();
 
-// Get all tests (filtered by role)
+const LIST_LIMIT = 50;
+const MAX_LIST_LIMIT = 200;
+
+// Keyset cursor: the last row's ("conductDate", id). The date is kept as the
+// database's own text so no precision is lost in a JS Date round trip.
+const encodeCursor = (row) => Buffer.from(JSON.stringify([row.cursorDate, row.id])).toString('base64url');
+
+const decodeCursor = (value) => {
+  try {
+    const [conductDate, id] = JSON.parse(Buffer.from(String(value), 'base64url').toString('utf8'));
+    if (typeof conductDate === 'string' && typeof id === 'string') {
+      return { conductDate, id };
+    }
+  } catch (_) {
+    // fall through
+  }
+  return null;
+};
+
+// Get tests (filtered by role). Returns one page of slim rows with comment and
+// submission counts; GET /:id has the nested comments and submissions.
+// Search matches title, subject and topic in SQL, backed by the trigram index
+// from migrations/001_tests_listing_indexes.sql.
 router.get('/', authenticateToken, async (req, res) => {
   try {
-    const { status, subject, search } = req.query;
+    const { status, subject, search, cursor } = req.query;
+    const limit = Math.min(Math.max(parseInt(req.query.limit || LIST_LIMIT, 10) || LIST_LIMIT, 1), MAX_LIST_LIMIT);
+    const { role, id: userId } = req.user;
 
-    let tests;
-    if (req.user.role === 'teacher') {
-      // Teachers see their own tests
-      tests = await Test.findAll({
-        where: {
-          isActive: true,
-          teacherId: req.user.id
-        },
-        include: [
-          { model: User, as: 'teacher', attributes: ['id', 'firstName', 'lastName', 'email'] },
-          { model: TestComment, as: 'comments', include: [{ model: User, as: 'user', attributes: ['id', 'firstName', 'lastName', 'role'] }] },
-          { model: TestSubmission, as: 'submissions', include: [{ model: User, as: 'student', attributes: ['id', 'firstName', 'lastName', 'email'] }] }
-        ],
-        order: [['conductDate', 'ASC']]
-      });
-    } else if (req.user.role === 'student') {
-      // Students see all active tests with status upcoming or active
-      console.log('🔍 Student requesting tests...');
-      
-      // Simple approach: get all active tests with upcoming/active status
-             tests = await Test.findAll({
-         where: {
-           isActive: true,
-           status: { [Op.in]: ['upcoming', 'active'] }
-         },
-         include: [
-           { model: User, as: 'teacher', attributes: ['id', 'firstName', 'lastName', 'email'] },
-           { model: TestComment, as: 'comments', include: [{ model: User, as: 'user', attributes: ['id', 'firstName', 'lastName', 'role'] }] },
-           { model: TestSubmission, as: 'submissions', where: { studentId: req.user.id }, required: false }
-         ],
-         order: [['conductDate', 'ASC']]
-       });
-      
-      console.log('🔍 Tests found for student:', tests.length);
-      console.log('🔍 Test IDs:', tests.map(t => t.id));
-      console.log('🔍 Test titles:', tests.map(t => t.title));
-    } else if (req.user.role === 'admin') {
-      // Admins see all tests
-      tests = await Test.findAll({
-        where: {
-          isActive: true
-        },
-        include: [
-          { model: User, as: 'teacher', attributes: ['id', 'firstName', 'lastName', 'email'] },
-          { model: TestComment, as: 'comments', include: [{ model: User, as: 'user', attributes: ['id', 'firstName', 'lastName', 'role'] }] },
-          { model: TestSubmission, as: 'submissions', include: [{ model: User, as: 'student', attributes: ['id', 'firstName', 'lastName', 'email'] }] }
-        ],
-        order: [['conductDate', 'ASC']]
-      });
+    if (!['admin', 'teacher', 'student'].includes(role)) {
+      return res.json({ success: true, tests: [], nextCursor: null });
     }
 
-    // Filter by search if provided
+    const conditions = ['t."isActive" = true'];
+    const replacements = { userId, limit: limit + 1 };
+    if (role === 'teacher') {
+      // Teachers see their own tests
+      conditions.push('t."teacherId" = :userId');
+    } else if (role === 'student') {
+      // Students see tests that are upcoming or active
+      conditions.push(`t.status IN ('upcoming', 'active')`);
+    }
+    if (status) {
+      conditions.push('t.status = :status');
+      replacements.status = status;
+    }
+    if (subject) {
+      conditions.push('t.subject = :subject');
+      replacements.subject = subject;
+    }
     if (search) {
-      tests = tests.filter(test => 
-        test.title.toLowerCase().includes(search.toLowerCase()) ||
-        test.subject.toLowerCase().includes(search.toLowerCase()) ||
-        test.topic.toLowerCase().includes(search.toLowerCase())
-      );
+      // Same expression as the trigram index; escape LIKE wildcards in the term
+      conditions.push(`(t.title || ' ' || t.subject || ' ' || t.topic) ILIKE :pattern`);
+      replacements.pattern = `%${String(search).replace(/[\\%_]/g, '\\$&')}%`;
+    }
+    if (cursor) {
+      const position = decodeCursor(cursor);
+      if (!position) {
+        return res.status(400).json({
+          success: false,
+          message: 'Invalid cursor'
+        });
+      }
+      conditions.push('(t."conductDate", t.id) > (:cursorDate, :cursorId)');
+      replacements.cursorDate = position.conductDate;
+      replacements.cursorId = position.id;
     }
 
-    console.log('🔍 Final tests count:', tests.length);
-    console.log('🔍 Tests for role:', req.user.role);
-    console.log('🔍 User ID:', req.user.id);
+    // Students only count their own submissions, as before
+    const submissionFilter = role === 'student' ? 'AND s."studentId" = :userId' : '';
+    const rows = await sequelize.query(`
+      SELECT t.id, t.title, t.subject, t.topic, t."totalMarks", t.duration, t."announcementDate",
+             t."conductDate", t.status, t.instructions, t."teacherId", t."conductDate"::text AS "cursorDate",
+             CASE WHEN u.id IS NULL THEN NULL
+                  ELSE json_build_object('id', u.id, 'firstName', u."firstName", 'lastName', u."lastName")
+             END AS teacher,
+             (SELECT count(*) FROM "${TestComment.getTableName()}" c WHERE c."testId" = t.id)::int AS "commentCount",
+             (SELECT count(*) FROM "${TestSubmission.getTableName()}" s
+              WHERE s."testId" = t.id ${submissionFilter})::int AS "submissionCount"
+      FROM "${Test.getTableName()}" t
+      LEFT JOIN "${User.getTableName()}" u ON u.id = t."teacherId"
+      WHERE ${conditions.join(' AND ')}
+      ORDER BY t."conductDate", t.id
+      LIMIT :limit
+    `, { replacements, type: QueryTypes.SELECT });
+
+    const hasMore = rows.length > limit;
+    const page = hasMore ? rows.slice(0, limit) : rows;
+    const nextCursor = hasMore ? encodeCursor(page[page.length - 1]) : null;
 
     res.json({
       success: true,
-      tests: tests || []
+      tests: page.map(({ cursorDate, ...test }) => test),
+      nextCursor
     });
   } catch (error) {
     console.error('Error fetching tests:', error);
@@ -88,15 +110,18 @@ router.get('/', authenticateToken, async (req, res) => {
   }
 });
 
-// Get test by ID
+// Get test by ID, with its comments and submissions
 router.get('/:id', authenticateToken, async (req, res) => {
   try {
+    // Students only get their own submission, as in the listing
+    const submissionWhere = req.user.role === 'student' ? { studentId: req.user.id } : undefined;
     const test = await Test.findByPk(req.params.id, {
       include: [
         { model: User, as: 'teacher', attributes: ['id', 'firstName', 'lastName', 'email'] },
         { model: TestComment, as: 'comments', include: [{ model: User, as: 'user', attributes: ['id', 'firstName', 'lastName', 'role'] }] },
-        { model: TestSubmission, as: 'submissions', include: [{ model: User, as: 'student', attributes: ['id', 'firstName', 'lastName', 'email'] }] }
-      ]
+        { model: TestSubmission, as: 'submissions', where: submissionWhere, required: false, include: [{ model: User, as: 'student', attributes: ['id', 'firstName', 'lastName', 'email'] }] }
+      ],
+      order: [[{ model: TestComment, as: 'comments' }, 'createdAt', 'ASC']]
     });
 
     if (!test) {
@@ -1,6 +1,7 @@
 const nodemailer = require('nodemailer');
 const path = require('path');
 const fs = require('fs').promises;
+const { sequelize } = require('../config/database');
 
 class EmailService {
   constructor() {
@@ -38,6 +39,11 @@ class EmailService {
   }
 
   async sendEmail({ to, subject, html, text, attachments = [] }) {
+    // Outbox mode: queue for email_worker.py instead of sending inline
+    if (process.env.EMAIL_DELIVERY === 'outbox' && attachments.length === 0) {
+      return this.enqueueEmail({ to, subject, html, text });
+    }
+
     if (!this.transporter) {
       console.error('Email service not initialized');
       return false;
@@ -62,6 +68,32 @@ class EmailService {
     }
   }
 
+  async enqueueEmail({ to, subject, html, text }) {
+    try {
+      const recipients = (Array.isArray(to) ? to : String(to).split(','))
+        .map(r => String(r).trim())
+        .filter(Boolean);
+      if (recipients.length === 0) {
+        return false;
+      }
+
+      // One multi-row INSERT, so a send is queued for every recipient or none
+      const replacements = { subject, html: html || null, text: text || null };
+      const rows = recipients.map((recipient, index) => {
+        replacements[`to${index}`] = recipient;
+        return `(:to${index}, :subject, :html, :text)`;
+      });
+      await sequelize.query(
+        `INSERT INTO email_outbox ("toAddress", subject, html, text) VALUES ${rows.join(', ')}`,
+        { replacements }
+      );
+      return true;
+    } catch (error) {
+      console.error('❌ Queueing email failed:', error);
+      return false;
+    }
+  }
+
   async sendEmailWithTemplate({ to, subject, template, data, attachments = [] }) {
     try {
       const html = await this.renderTemplate(template, data);
@@ -0,0 +1,87 @@
+// In-process cache of the fields authenticateToken needs per request
+// (id, role, isActive, lockUntil), so authenticated calls don't each cost a
+// users lookup. Entries expire after PRINCIPAL_CACHE_TTL_MS and the map is
+// capped at PRINCIPAL_CACHE_MAX entries, evicting the least recently used.
+//
+// The User model hooks invalidate entries on update/destroy in this process.
+// Changes made elsewhere (another Node instance, the Python tools) are picked
+// up once the TTL runs out, so keep it short. PRINCIPAL_CACHE_TTL_MS=0
+// disables caching.
+
+const DEFAULT_TTL_MS = 30 * 1000;
+const DEFAULT_MAX_ENTRIES = 10000;
+
+const parseLimit = (value, fallback) => {
+  const parsed = parseInt(value, 10);
+  return Number.isNaN(parsed) || parsed < 0 ? fallback : parsed;
+};
+
+class PrincipalCache {
+  constructor({ ttlMs, maxEntries } = {}) {
+    this.ttlMs = ttlMs ?? parseLimit(process.env.PRINCIPAL_CACHE_TTL_MS, DEFAULT_TTL_MS);
+    this.maxEntries = maxEntries ?? parseLimit(process.env.PRINCIPAL_CACHE_MAX, DEFAULT_MAX_ENTRIES);
+    // Map keeps insertion order: re-inserting on hit makes the first key the LRU one
+    this.entries = new Map();
+    this.hits = 0;
+    this.misses = 0;
+  }
+
+  get enabled() {
+    return this.ttlMs > 0 && this.maxEntries > 0;
+  }
+
+  get(userId) {
+    const key = String(userId);
+    const entry = this.entries.get(key);
+    if (!entry || entry.expiresAt <= Date.now()) {
+      if (entry) this.entries.delete(key);
+      this.misses += 1;
+      return null;
+    }
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    this.hits += 1;
+    return entry.principal;
+  }
+
+  set(userId, principal) {
+    if (!this.enabled) return;
+    const key = String(userId);
+    this.entries.delete(key);
+    this.entries.set(key, { principal, expiresAt: Date.now() + this.ttlMs });
+    while (this.entries.size > this.maxEntries) {
+      this.entries.delete(this.entries.keys().next().value);
+    }
+  }
+
+  invalidate(userId) {
+    this.entries.delete(String(userId));
+  }
+
+  clear() {
+    this.entries.clear();
+  }
+
+  stats() {
+    return { size: this.entries.size, hits: this.hits, misses: this.misses, ttlMs: this.ttlMs };
+  }
+}
+
+// Only these columns are loaded and cached; routes read req.user.id and req.user.role
+const PRINCIPAL_ATTRIBUTES = ['id', 'role', 'isActive', 'lockUntil'];
+
+const toPrincipal = (user) => ({
+  id: user.id,
+  role: user.role,
+  isActive: user.isActive,
+  lockUntil: user.lockUntil ? new Date(user.lockUntil) : null,
+});
+
+const principalCache = new PrincipalCache();
+
+module.exports = {
+  PrincipalCache,
+  PRINCIPAL_ATTRIBUTES,
+  toPrincipal,
+  principalCache,
+};
@@ -1,201 +1,318 @@
-import psycopg2
-from datetime import datetime, timedelta
+#!/usr/bin/env python3
+"""
+Test Data Seeder for School Management System
+
+Seeds sample tests, comments and submissions. Seeding is idempotent:
+
+- every row gets a UUIDv5 id derived from its natural key (test title,
+  comment position, submitting student), so re-runs address the same rows
+- each seed set is hashed; if the hash matches the one recorded in
+  seed_runs the set is skipped without touching its table
+- rows are written with one multi-row INSERT ... ON CONFLICT (id) DO UPDATE
+  per set, which only rewrites rows whose content actually changed
+
+Dates are stored as offsets from the time the set is applied, so an
+unchanged set keeps the dates from its first run; use --force to re-apply.
+
+Usage:
+    python test_seed.py [--force] [--dry-run]
+"""
+
+import argparse
+import hashlib
+import json
+import sys
 import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
 
-# Database connection
-conn = psycopg2.connect(
-    host="dpg-d2feoiruibrs739se2lg-a.singapore-postgres.render.com",
-    database="app_db_321n",
-    user="app_db_321n_user",
-    password="CRjBloZDcIp0ohrQVxNjE0h1s0vEK9L2",
-    port=5432
-)
-
-cur = conn.cursor()
-
-try:
-    # Create test tables if they don't exist
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS "Tests" (
-            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-            title VARCHAR(255) NOT NULL,
-            subject VARCHAR(100) NOT NULL,
-            topic TEXT NOT NULL,
-            "totalMarks" INTEGER NOT NULL,
-            duration INTEGER NOT NULL,
-            "announcementDate" TIMESTAMP NOT NULL,
-            "conductDate" TIMESTAMP NOT NULL,
-            status VARCHAR(20) DEFAULT 'upcoming',
-            instructions TEXT,
-            "isActive" BOOLEAN DEFAULT true,
-            "teacherId" UUID REFERENCES "Users"(id),
-            "createdAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            "updatedAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        
-        CREATE TABLE IF NOT EXISTS "TestComments" (
-            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-            content TEXT NOT NULL,
-            "isTeacherReply" BOOLEAN DEFAULT false,
-            "isActive" BOOLEAN DEFAULT true,
-            "testId" UUID REFERENCES "Tests"(id),
-            "userId" UUID REFERENCES "Users"(id),
-            "createdAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            "updatedAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        
-        CREATE TABLE IF NOT EXISTS "TestSubmissions" (
-            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-            "submittedAt" TIMESTAMP NOT NULL,
-            score INTEGER,
-            status VARCHAR(20) DEFAULT 'submitted',
-            feedback TEXT,
-            "isActive" BOOLEAN DEFAULT true,
-            "testId" UUID REFERENCES "Tests"(id),
-            "studentId" UUID REFERENCES "Users"(id),
-            "createdAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            "updatedAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-    """)
-    
-    # Get teacher and student IDs
-    cur.execute('SELECT id FROM "Users" WHERE role = \'teacher\' LIMIT 1;')
-    teacher_result = cur.fetchone()
-    
-    cur.execute('SELECT id FROM "Users" WHERE role = \'student\' LIMIT 1;')
-    student_result = cur.fetchone()
-    
-    if teacher_result and student_result:
-        teacher_id = teacher_result[0]
-        student_id = student_result[0]
-        
-        # Create sample tests
-        now = datetime.now()
-        
-        # Upcoming test
-        upcoming_test = (
-            str(uuid.uuid4()),
-            'Mathematics Midterm',
-            'Mathematics',
-            'Algebra and Calculus fundamentals including linear equations, derivatives, and basic integration',
-            50,
-            90,
-            now,
-            now + timedelta(days=7),
-            'upcoming',
-            'Bring calculator and show all work. No phones allowed.',
-            True,
-            teacher_id
-        )
-        
-        # Active test
-        active_test = (
-            str(uuid.uuid4()),
-            'Physics Quiz',
-            'Physics',
-            'Mechanics: Newton\'s laws, momentum, and energy conservation',
-            25,
-            45,
-            now - timedelta(days=1),
-            now + timedelta(hours=2),
-            'active',
-            'Multiple choice questions. Choose the best answer.',
-            True,
-            teacher_id
-        )
-        
-        # Completed test
-        completed_test = (
-            str(uuid.uuid4()),
-            'English Literature Final',
-            'English',
-            'Shakespeare\'s Hamlet: themes, character analysis, and literary devices',
-            100,
-            120,
-            now - timedelta(days=5),
-            now - timedelta(days=3),
-            'completed',
-            'Essay format. Support your arguments with textual evidence.',
-            True,
-            teacher_id
-        )
-        
-        # Insert tests
-        cur.execute("""
-            INSERT INTO "Tests" (id, title, subject, topic, "totalMarks", duration, 
-                               "announcementDate", "conductDate", status, instructions, 
-                               "isActive", "teacherId")
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (id) DO NOTHING;
-        """, upcoming_test)
-        
-        cur.execute("""
-            INSERT INTO "Tests" (id, title, subject, topic, "totalMarks", duration, 
-                               "announcementDate", "conductDate", status, instructions, 
-                               "isActive", "teacherId")
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (id) DO NOTHING;
-        """, active_test)
-        
-        cur.execute("""
-            INSERT INTO "Tests" (id, title, subject, topic, "totalMarks", duration, 
-                               "announcementDate", "conductDate", status, instructions, 
-                               "isActive", "teacherId")
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (id) DO NOTHING;
-        """, completed_test)
-        
-        # Get test IDs for comments and submissions
-        cur.execute('SELECT id FROM "Tests" WHERE title = \'Mathematics Midterm\';')
-        upcoming_test_id = cur.fetchone()[0]
-        
-        cur.execute('SELECT id FROM "Tests" WHERE title = \'Physics Quiz\';')
-        active_test_id = cur.fetchone()[0]
-        
-        cur.execute('SELECT id FROM "Tests" WHERE title = \'English Literature Final\';')
-        completed_test_id = cur.fetchone()[0]
-        
-        # Create sample comments
-        comments = [
-            (str(uuid.uuid4()), 'Can we use calculators for the algebra section?', False, upcoming_test_id, student_id),
-            (str(uuid.uuid4()), 'Yes, calculators are allowed for all sections. Make sure to show your work though.', True, upcoming_test_id, teacher_id),
-            (str(uuid.uuid4()), 'What topics should I focus on most?', False, upcoming_test_id, student_id),
-            (str(uuid.uuid4()), 'Focus on derivatives and basic integration. The algebra section is straightforward.', True, upcoming_test_id, teacher_id),
-        ]
-        
-        for comment in comments:
-            cur.execute("""
-                INSERT INTO "TestComments" (id, content, "isTeacherReply", "testId", "userId")
-                VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT (id) DO NOTHING;
-            """, comment)
-        
-        # Create sample submissions
-        submissions = [
-            (str(uuid.uuid4()), now - timedelta(hours=1), 18, 'graded', 'Good work on mechanics. Review energy conservation.', active_test_id, student_id),
-            (str(uuid.uuid4()), now - timedelta(days=2), 85, 'graded', 'Excellent analysis of Hamlet\'s character development.', completed_test_id, student_id),
-        ]
-        
-        for submission in submissions:
+import psycopg2
+from psycopg2.extras import execute_values
+
+from create_user import get_db_config
+from db_maintenance import maintain
+
+# Fixed namespace: the same natural key yields the same id in every database
+SEED_NAMESPACE = uuid.UUID("6f1c2a4e-8d3b-5e7f-9a0c-1b2d3e4f5a6b")
+
+# Tables SCHEMA_SQL creates, checked instead of created on a dry run
+SCHEMA_TABLES = ["Tests", "TestComments", "TestSubmissions", "seed_runs"]
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS "Tests" (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    title VARCHAR(255) NOT NULL,
+    subject VARCHAR(100) NOT NULL,
+    topic TEXT NOT NULL,
+    "totalMarks" INTEGER NOT NULL,
+    duration INTEGER NOT NULL,
+    "announcementDate" TIMESTAMP NOT NULL,
+    "conductDate" TIMESTAMP NOT NULL,
+    status VARCHAR(20) DEFAULT 'upcoming',
+    instructions TEXT,
+    "isActive" BOOLEAN DEFAULT true,
+    "teacherId" UUID REFERENCES "Users"(id),
+    "createdAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS "TestComments" (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    content TEXT NOT NULL,
+    "isTeacherReply" BOOLEAN DEFAULT false,
+    "isActive" BOOLEAN DEFAULT true,
+    "testId" UUID REFERENCES "Tests"(id),
+    "userId" UUID REFERENCES "Users"(id),
+    "createdAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS "TestSubmissions" (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    "submittedAt" TIMESTAMP NOT NULL,
+    score INTEGER,
+    status VARCHAR(20) DEFAULT 'submitted',
+    feedback TEXT,
+    "isActive" BOOLEAN DEFAULT true,
+    "testId" UUID REFERENCES "Tests"(id),
+    "studentId" UUID REFERENCES "Users"(id),
+    "createdAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS seed_runs (
+    name VARCHAR(100) PRIMARY KEY,
+    "contentHash" CHAR(64) NOT NULL,
+    "rowCount" INTEGER NOT NULL,
+    "appliedAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Offsets are in hours relative to the time a set is applied.
+TESTS = [
+    {
+        "title": "Mathematics Midterm",
+        "subject": "Mathematics",
+        "topic": "Algebra and Calculus fundamentals including linear equations, derivatives, and basic integration",
+        "totalMarks": 50,
+        "duration": 90,
+        "announcedHours": 0,
+        "conductHours": 7 * 24,
+        "status": "upcoming",
+        "instructions": "Bring calculator and show all work. No phones allowed.",
+    },
+    {
+        "title": "Physics Quiz",
+        "subject": "Physics",
+        "topic": "Mechanics: Newton's laws, momentum, and energy conservation",
+        "totalMarks": 25,
+        "duration": 45,
+        "announcedHours": -24,
+        "conductHours": 2,
+        "status": "active",
+        "instructions": "Multiple choice questions. Choose the best answer.",
+    },
+    {
+        "title": "English Literature Final",
+        "subject": "English",
+        "topic": "Shakespeare's Hamlet: themes, character analysis, and literary devices",
+        "totalMarks": 100,
+        "duration": 120,
+        "announcedHours": -5 * 24,
+        "conductHours": -3 * 24,
+        "status": "completed",
+        "instructions": "Essay format. Support your arguments with textual evidence.",
+    },
+]
+
+# (test title, author role, is teacher reply, content)
+COMMENTS = [
+    ("Mathematics Midterm", "student", False, "Can we use calculators for the algebra section?"),
+    ("Mathematics Midterm", "teacher", True,
+     "Yes, calculators are allowed for all sections. Make sure to show your work though."),
+    ("Mathematics Midterm", "student", False, "What topics should I focus on most?"),
+    ("Mathematics Midterm", "teacher", True,
+     "Focus on derivatives and basic integration. The algebra section is straightforward."),
+]
+
+# (test title, submitted offset in hours, score, status, feedback)
+SUBMISSIONS = [
+    ("Physics Quiz", -1, 18, "graded", "Good work on mechanics. Review energy conservation."),
+    ("English Literature Final", -2 * 24, 85, "graded", "Excellent analysis of Hamlet's character development."),
+]
+
+
+def connect():
+    cfg = get_db_config()
+    return psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+
+
+def seed_id(kind: str, *key: Any) -> str:
+    return str(uuid.uuid5(SEED_NAMESPACE, ":".join([kind] + [str(part) for part in key])))
+
+
+def build_seed_sets(teacher_id: str, student_id: str) -> List[Dict[str, Any]]:
+    """
+    Each set lists its table, columns and rows. Rows hold offsets rather than
+    timestamps so the content hash only changes when the seed data does.
+    """
+    authors = {"teacher": teacher_id, "student": student_id}
+    return [
+        {
+            "name": "tests",
+            "table": "Tests",
+            "columns": ["id", "title", "subject", "topic", "totalMarks", "duration", "announcementDate",
+                        "conductDate", "status", "instructions", "isActive", "teacherId"],
+            "timestamps": {"announcementDate", "conductDate"},
+            "rows": [
+                [seed_id("test", t["title"]), t["title"], t["subject"], t["topic"], t["totalMarks"],
+                 t["duration"], t["announcedHours"], t["conductHours"], t["status"], t["instructions"],
+                 True, teacher_id]
+                for t in TESTS
+            ],
+        },
+        {
+            "name": "test_comments",
+            "table": "TestComments",
+            "columns": ["id", "content", "isTeacherReply", "testId", "userId"],
+            "timestamps": set(),
+            "rows": [
+                [seed_id("test_comment", title, position), content, reply, seed_id("test", title), authors[role]]
+                for position, (title, role, reply, content) in enumerate(COMMENTS)
+            ],
+        },
+        {
+            "name": "test_submissions",
+            "table": "TestSubmissions",
+            "columns": ["id", "submittedAt", "score", "status", "feedback", "testId", "studentId"],
+            "timestamps": {"submittedAt"},
+            "rows": [
+                [seed_id("test_submission", title, student_id), hours, score, status, feedback,
+                 seed_id("test", title), student_id]
+                for title, hours, score, status, feedback in SUBMISSIONS
+            ],
+        },
+    ]
+
+
+def content_hash(seed_set: Dict[str, Any]) -> str:
+    payload = json.dumps([seed_set["table"], seed_set["columns"], seed_set["rows"]], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def materialize(seed_set: Dict[str, Any], now: datetime) -> List[tuple]:
+    """Turn hour offsets into timestamps at apply time."""
+    positions = [i for i, column in enumerate(seed_set["columns"]) if column in seed_set["timestamps"]]
+    rows = []
+    for row in seed_set["rows"]:
+        row = list(row)
+        for i in positions:
+            row[i] = now + timedelta(hours=row[i])
+        rows.append(tuple(row))
+    return rows
+
+
+def upsert(cur, seed_set: Dict[str, Any], rows: List[tuple]):
+    columns = seed_set["columns"]
+    quoted = ", ".join(f'"{column}"' for column in columns)
+    updated = [column for column in columns if column != "id"]
+    assignments = ", ".join(f'"{column}" = EXCLUDED."{column}"' for column in updated)
+    current = ", ".join(f't."{column}"' for column in updated)
+    incoming = ", ".join(f'EXCLUDED."{column}"' for column in updated)
+    # The WHERE clause skips rows that are already identical, so re-runs write nothing
+    execute_values(cur, f"""
+        INSERT INTO "{seed_set['table']}" AS t ({quoted}) VALUES %s
+        ON CONFLICT (id) DO UPDATE SET {assignments}, "updatedAt" = now()
+        WHERE ({current}) IS DISTINCT FROM ({incoming})
+    """, rows)
+
+
+def first_user(cur, role: str) -> Optional[str]:
+    # Ordered, so every run picks the same user
+    cur.execute('SELECT id FROM "Users" WHERE role = %s ORDER BY "createdAt", id LIMIT 1', (role,))
+    row = cur.fetchone()
+    return str(row[0]) if row else None
+
+
+def seed(conn, force: bool, dry_run: bool) -> List[str]:
+    """Apply changed seed sets; returns the tables that were written."""
+    missing: Set[str] = set()
+    with conn.cursor() as cur:
+        if dry_run:
+            # Report only: leave the schema alone
+            cur.execute("SELECT name FROM unnest(%s::text[]) name WHERE to_regclass(quote_ident(name)) IS NULL",
+                        (SCHEMA_TABLES,))
+            for (table,) in cur.fetchall():
+                print(f"🔎 {table}: table would be created")
+                missing.add(table)
+        else:
+            cur.execute(SCHEMA_SQL)
+        teacher_id = first_user(cur, "teacher")
+        student_id = first_user(cur, "student")
+        if not teacher_id or not student_id:
+            conn.rollback()
+            print("❌ No teacher or student found in database")
+            print("   Please run the user setup first")
+            raise LookupError("no teacher or student to seed for")
+        applied = {}
+        if "seed_runs" not in missing:
+            cur.execute('SELECT name, "contentHash" FROM seed_runs')
+            applied = dict(cur.fetchall())
+    conn.commit()
+
+    now = datetime.now()
+    written = []
+    for seed_set in build_seed_sets(teacher_id, student_id):
+        digest = content_hash(seed_set)
+        name, count = seed_set["name"], len(seed_set["rows"])
+        if applied.get(name) == digest and not force:
+            print(f"⏭️  {name}: unchanged, skipped")
+            continue
+        if dry_run:
+            print(f"🔎 {name}: would upsert {count} rows")
+            continue
+        # The rows and the recorded hash commit together
+        with conn.cursor() as cur:
+            upsert(cur, seed_set, materialize(seed_set, now))
             cur.execute("""
-                INSERT INTO "TestSubmissions" (id, "submittedAt", score, status, feedback, "testId", "studentId")
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (id) DO NOTHING;
-            """, submission)
-        
+                INSERT INTO seed_runs (name, "contentHash", "rowCount", "appliedAt") VALUES (%s, %s, %s, now())
+                ON CONFLICT (name) DO UPDATE
+                SET "contentHash" = EXCLUDED."contentHash", "rowCount" = EXCLUDED."rowCount", "appliedAt" = now()
+            """, (name, digest, count))
         conn.commit()
-        print("✅ Test data seeded successfully!")
-        print(f"   - Created 3 tests (upcoming, active, completed)")
-        print(f"   - Added 4 comments with teacher replies")
-        print(f"   - Added 2 test submissions with grades")
-        
-    else:
-        print("❌ No teacher or student found in database")
-        print("   Please run the user setup first")
-
-except Exception as e:
-    print(f"❌ Error: {e}")
-    conn.rollback()
-finally:
-    cur.close()
-    conn.close()
+        written.append(seed_set["table"])
+        print(f"✅ {name}: upserted {count} rows")
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Seed sample tests, comments and submissions")
+    parser.add_argument("--force", action="store_true", help="Re-apply sets even if their hash is unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which sets would be applied")
+    args = parser.parse_args(argv)
+
+    try:
+        conn = connect()
+    except psycopg2.Error as e:
+        print(f"❌ Error: could not connect to the database: {str(e).strip()}")
+        return 1
+    try:
+        written = seed(conn, args.force, args.dry_run)
+    except LookupError:
+        return 1
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Error: {e}")
+        return 1
+    finally:
+        conn.close()
+    if written:
+        maintain(tables=written)
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
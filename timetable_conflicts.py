@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Timetable Conflict Detection for School Management System
+
+Loads every active course of one academic year / semester in a single query
+and reports overlapping meeting slots for:
+
+- rooms (two courses booked into the same room at the same time)
+- instructors (one "instructorId" teaching two courses at once)
+- students (one enrolment set containing two clashing courses)
+
+Each course's "schedule" JSONB is a list of meeting slots shaped like
+{"day": "monday", "startTime": "09:00", "endTime": "10:30", "room": "B12"},
+the same time format the Class model validates.
+
+Each resource gets its own interval tree, so a full run is O(n log n + k)
+for n slots and k reported conflicts, and re-checking a single edited course
+only queries the trees it touches.
+"""
+
+import argparse
+import heapq
+import json
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import psycopg2
+
+from create_user import get_db_config
+
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MINUTES_PER_DAY = 24 * 60
+
+COURSES_QUERY = """
+    SELECT c.id, c.code, c.title, c."instructorId", c.schedule,
+           COALESCE(array_agg(e."studentId"::text) FILTER (WHERE e."studentId" IS NOT NULL), '{}'::text[])
+    FROM courses c
+    LEFT JOIN {enrollments} e ON e."courseId" = c.id
+    WHERE c.status = 'active' AND c."academicYear" = %s AND c.semester = %s
+    GROUP BY c.id
+"""
+
+# course_enrollments is created by Sequelize sync; databases built only by
+# database_setup.py don't have it yet, which simply means no enrolled students.
+NO_ENROLLMENTS = '(SELECT NULL::uuid AS "courseId", NULL::uuid AS "studentId" WHERE false)'
+
+
+def parse_time(value: str) -> int:
+    """Convert 'HH:MM' into minutes since midnight."""
+    hours, minutes = value.strip().split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def slot_interval(slot: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    """
+    Map a schedule slot onto the weekly timeline as a half-open interval.
+    Returns None for slots that are missing a day or times.
+    """
+    day = str(slot.get("day", "")).strip().lower()
+    if day not in DAYS or not slot.get("startTime") or not slot.get("endTime"):
+        return None
+    offset = DAYS.index(day) * MINUTES_PER_DAY
+    start = offset + parse_time(slot["startTime"])
+    end = offset + parse_time(slot["endTime"])
+    if end <= start:
+        return None
+    return start, end
+
+
+def format_minute(value: int) -> str:
+    day, minute = divmod(value, MINUTES_PER_DAY)
+    return f"{DAYS[day][:3].title()} {minute // 60:02d}:{minute % 60:02d}"
+
+
+class IntervalTree:
+    """
+    Static interval tree over half-open [start, end) intervals.
+
+    Intervals are kept sorted by start and viewed as an implicit balanced BST
+    (the middle element of each range is its root), with every node storing
+    the largest end in its subtree. Building is O(n log n); a stabbing query
+    is O(log n + m) for m matches.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[int, int, Any]]):
+        self.items = sorted(intervals, key=lambda item: (item[0], item[1]))
+        self.max_end = [0] * len(self.items)
+        if self.items:
+            self._build(0, len(self.items) - 1)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _build(self, lo: int, hi: int) -> int:
+        mid = (lo + hi) // 2
+        best = self.items[mid][1]
+        if lo <= mid - 1:
+            best = max(best, self._build(lo, mid - 1))
+        if mid + 1 <= hi:
+            best = max(best, self._build(mid + 1, hi))
+        self.max_end[mid] = best
+        return best
+
+    def overlapping(self, start: int, end: int) -> List[Tuple[int, int, Any]]:
+        """Return every stored interval that overlaps [start, end)."""
+        found: List[Tuple[int, int, Any]] = []
+        stack = [(0, len(self.items) - 1)] if self.items else []
+        while stack:
+            lo, hi = stack.pop()
+            if lo > hi:
+                continue
+            mid = (lo + hi) // 2
+            if self.max_end[mid] <= start:
+                continue
+            stack.append((lo, mid - 1))
+            item_start, item_end, _ = self.items[mid]
+            if item_start < end:
+                if item_end > start:
+                    found.append(self.items[mid])
+                stack.append((mid + 1, hi))
+        return found
+
+    def all_overlaps(self) -> List[Tuple[Tuple[int, int, Any], Tuple[int, int, Any]]]:
+        """
+        Return every overlapping pair once, via a sweep over the start-sorted
+        intervals with a heap of open ends: O(n log n + k).
+        """
+        pairs = []
+        open_items: List[Tuple[int, int]] = []
+        for index, item in enumerate(self.items):
+            while open_items and open_items[0][0] <= item[0]:
+                heapq.heappop(open_items)
+            for _, other_index in open_items:
+                pairs.append((self.items[other_index], item))
+            heapq.heappush(open_items, (item[1], index))
+        return pairs
+
+
+class TimetableIndex:
+    """
+    Interval trees per room, per instructor and per student for one term.
+    Tree payloads are (course_id, slot_index) so conflicts can be traced back
+    to the exact slot that needs to move.
+    """
+
+    def __init__(self, courses: List[Dict[str, Any]]):
+        self.courses = {course["id"]: course for course in courses}
+        rooms: Dict[str, list] = defaultdict(list)
+        instructors: Dict[str, list] = defaultdict(list)
+        students: Dict[str, list] = defaultdict(list)
+
+        for course in courses:
+            for slot_index, slot, (start, end) in self.course_slots(course):
+                entry = (start, end, (course["id"], slot_index))
+                if slot.get("room"):
+                    rooms[str(slot["room"]).strip().lower()].append(entry)
+                if course.get("instructorId"):
+                    instructors[str(course["instructorId"])].append(entry)
+                for student_id in course.get("students", []):
+                    students[str(student_id)].append(entry)
+
+        self.trees = {
+            "room": {key: IntervalTree(items) for key, items in rooms.items()},
+            "instructor": {key: IntervalTree(items) for key, items in instructors.items()},
+            "student": {key: IntervalTree(items) for key, items in students.items()},
+        }
+
+    @staticmethod
+    def course_slots(course: Dict[str, Any]):
+        """Yield (slot_index, slot, interval) for every usable schedule slot."""
+        for slot_index, slot in enumerate(course.get("schedule") or []):
+            if not isinstance(slot, dict):
+                continue
+            try:
+                interval = slot_interval(slot)
+            except (ValueError, AttributeError):
+                interval = None
+            if interval:
+                yield slot_index, slot, interval
+
+    def _conflict(self, kind: str, resource: str, first, second) -> Optional[Dict[str, Any]]:
+        (start_a, end_a, (course_a, slot_a)), (start_b, end_b, (course_b, slot_b)) = first, second
+        if course_a == course_b:
+            return None
+        return {
+            "type": kind,
+            "resource": resource,
+            "start": format_minute(max(start_a, start_b)),
+            "end": format_minute(min(end_a, end_b)),
+            "courses": [
+                {"id": str(course_a), "code": self.courses[course_a]["code"], "slot": slot_a},
+                {"id": str(course_b), "code": self.courses[course_b]["code"], "slot": slot_b},
+            ],
+        }
+
+    def find_all_conflicts(self) -> List[Dict[str, Any]]:
+        """Report every overlap across all rooms, instructors and students."""
+        conflicts = []
+        for kind, trees in self.trees.items():
+            for resource, tree in trees.items():
+                for first, second in tree.all_overlaps():
+                    conflict = self._conflict(kind, resource, first, second)
+                    if conflict:
+                        conflicts.append(conflict)
+        return conflicts
+
+    def check_course(self, course: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Check one (possibly edited) course against everything else in the term.
+        Only the trees for its rooms, instructor and students are queried, which
+        keeps this cheap enough to run on every schedule edit.
+        """
+        self.courses.setdefault(course["id"], course)
+        conflicts = []
+        for slot_index, slot, (start, end) in self.course_slots(course):
+            entry = (start, end, (course["id"], slot_index))
+            lookups = []
+            if slot.get("room"):
+                lookups.append(("room", str(slot["room"]).strip().lower()))
+            if course.get("instructorId"):
+                lookups.append(("instructor", str(course["instructorId"])))
+            lookups.extend(("student", str(student_id)) for student_id in course.get("students", []))
+
+            for kind, resource in lookups:
+                tree = self.trees[kind].get(resource)
+                if not tree:
+                    continue
+                for other in tree.overlapping(start, end):
+                    conflict = self._conflict(kind, resource, entry, other)
+                    if conflict:
+                        conflicts.append(conflict)
+        return conflicts
+
+
+def load_courses(cur, academic_year: str, semester: str) -> List[Dict[str, Any]]:
+    """Fetch every active course for the term, with its enrolled students, in one query."""
+    cur.execute("SELECT to_regclass('course_enrollments') IS NOT NULL")
+    enrollments = "course_enrollments" if cur.fetchone()[0] else NO_ENROLLMENTS
+    cur.execute(COURSES_QUERY.replace("{enrollments}", enrollments), (academic_year, semester))
+    courses = []
+    for course_id, code, title, instructor_id, schedule, students in cur.fetchall():
+        if isinstance(schedule, str):
+            schedule = json.loads(schedule)
+        courses.append({
+            "id": course_id,
+            "code": code,
+            "title": title,
+            "instructorId": instructor_id,
+            "schedule": schedule or [],
+            "students": list(students or []),
+        })
+    return courses
+
+
+def print_report(conflicts: List[Dict[str, Any]]):
+    if not conflicts:
+        print("✅ No timetable conflicts found")
+        return
+
+    by_type: Dict[str, int] = defaultdict(int)
+    for conflict in conflicts:
+        by_type[conflict["type"]] += 1
+    print(f"⚠️  Found {len(conflicts)} conflicts:")
+    for kind, count in sorted(by_type.items()):
+        print(f"   - {kind}: {count}")
+    print()
+    for conflict in conflicts:
+        first, second = conflict["courses"]
+        print(f"  [{conflict['type']}] {conflict['resource']}: "
+              f"{first['code']} x {second['code']} ({conflict['start']} - {conflict['end']})")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Detect room, instructor and student timetable clashes")
+    parser.add_argument("academic_year", help='Academic year, e.g. "2024-2025"')
+    parser.add_argument("semester", choices=["fall", "spring", "summer", "winter"])
+    parser.add_argument("--course", help="Only check the course with this code (fast path for edits)")
+    parser.add_argument("--json", action="store_true", help="Print conflicts as JSON")
+    args = parser.parse_args(argv)
+
+    cfg = get_db_config()
+    conn = psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+    try:
+        with conn.cursor() as cur:
+            started = time.perf_counter()
+            courses = load_courses(cur, args.academic_year, args.semester)
+            loaded = time.perf_counter()
+    finally:
+        conn.close()
+
+    index = TimetableIndex(courses)
+    if args.course:
+        target = next((c for c in courses if c["code"] == args.course), None)
+        if target is None:
+            print(f"❌ No active course with code {args.course} in {args.academic_year} {args.semester}")
+            return 1
+        conflicts = index.check_course(target)
+    else:
+        conflicts = index.find_all_conflicts()
+    finished = time.perf_counter()
+
+    if args.json:
+        print(json.dumps(conflicts, indent=2))
+    else:
+        print(f"📚 Loaded {len(courses)} active courses in {(loaded - started) * 1000:.1f} ms")
+        print(f"⏱️  Conflict check took {(finished - loaded) * 1000:.1f} ms")
+        print_report(conflicts)
+    return 2 if conflicts else 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Check interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
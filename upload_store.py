@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Upload Store for School Management System
+
+Deduplicates the files under UPLOAD_PATH (./uploads by default). Every file
+is hashed with SHA-256 (in parallel) and stored once as
+
+    uploads/cas/<aa>/<bb>/<sha256><ext>
+
+Original multer file names are turned into hard links to that blob, so URLs
+already sitting in message bodies keep working while identical files share
+one copy on disk. The legacy name -> blob mapping is recorded in
+upload_store_links, and attachments."fileKey" (plus message bodies and
+profile pictures that point at /uploads/...) is rewritten to the blob key in
+batches. Because blob keys live under uploads/, express.static serves them
+unchanged.
+
+gc removes legacy names nothing in the database points at any more, and
+blobs whose only remaining link is their own cas/ entry and that nothing
+references.
+
+Usage:
+    python upload_store.py migrate [--jobs 8] [--batch-size 500] [--dry-run]
+    python upload_store.py gc [--dry-run]
+    python upload_store.py stats
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from create_user import get_db_config
+
+CAS_DIR = "cas"
+CHUNK_SIZE = 1024 * 1024
+# Generated trees under UPLOAD_PATH that are not uploads (image_renditions.py output)
+SKIP_DIRS = {CAS_DIR, "renditions"}
+
+LINKS_SQL = """
+CREATE TABLE IF NOT EXISTS upload_store_links (
+    "legacyKey" TEXT PRIMARY KEY,
+    "blobKey" TEXT NOT NULL,
+    sha256 CHAR(64) NOT NULL,
+    size BIGINT NOT NULL,
+    "createdAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS upload_store_links_blob ON upload_store_links ("blobKey");
+"""
+
+# (table, column, prefix) pairs that can hold an upload key
+REFERENCES = [
+    ("attachments", "fileKey", ""),
+    ("messages", "body", "/uploads/"),
+    ("users", "profilePicture", "/uploads/"),
+]
+
+
+def connect():
+    cfg = get_db_config()
+    return psycopg2.connect(cfg) if isinstance(cfg, str) else psycopg2.connect(**cfg)
+
+
+def upload_root() -> str:
+    return os.path.abspath(os.getenv("UPLOAD_PATH", "./uploads"))
+
+
+def blob_key(digest: str, ext: str) -> str:
+    return "/".join([CAS_DIR, digest[:2], digest[2:4], digest + ext.lower()])
+
+
+def hash_file(path: str) -> Tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def legacy_files(root: str) -> Iterable[str]:
+    """Keys (relative paths) of regular files outside the cas/ and renditions/ trees."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        if dirpath == root:
+            dirnames[:] = [name for name in dirnames if name not in SKIP_DIRS]
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if os.path.isfile(path) and not os.path.islink(path):
+                yield os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def existing_columns(cur) -> List[Tuple[str, str, str]]:
+    """REFERENCES filtered down to the tables/columns that exist in this database."""
+    found = []
+    for table, column, prefix in REFERENCES:
+        cur.execute("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = %s AND column_name = %s
+        """, (table, column))
+        if cur.fetchone():
+            found.append((table, column, prefix))
+    return found
+
+
+def link_to_blob(root: str, key: str, target_key: str, dry_run: bool, planned: Set[str]) -> int:
+    """
+    Make `key` a hard link to the blob at `target_key`, creating the blob from
+    this file if it doesn't exist yet. Returns the bytes freed. A dry run
+    creates nothing, so it records the blobs it would have created in
+    `planned` and counts later files with the same content as freed.
+    """
+    path = os.path.join(root, key)
+    blob = os.path.join(root, target_key)
+    stat = os.stat(path)
+    if not os.path.exists(blob):
+        if target_key in planned:
+            return stat.st_size if stat.st_nlink == 1 else 0
+        if dry_run:
+            planned.add(target_key)
+        else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            os.link(path, blob)
+        return 0
+
+    if os.path.samefile(path, blob):
+        return 0
+    if not dry_run:
+        tmp = path + ".cas-tmp"
+        os.link(blob, tmp)
+        os.replace(tmp, path)  # atomic swap; readers see old or new, never nothing
+    return stat.st_size if stat.st_nlink == 1 else 0
+
+
+def migrate(conn, root: str, jobs: int, batch_size: int, dry_run: bool):
+    with conn.cursor() as cur:
+        cur.execute(LINKS_SQL)
+        cur.execute('SELECT "legacyKey", "blobKey" FROM upload_store_links')
+        known = dict(cur.fetchall())
+    conn.commit()
+
+    # Files already linked into the store don't need hashing again.
+    pending = []
+    for key in legacy_files(root):
+        blob = known.get(key)
+        if blob and os.path.exists(os.path.join(root, blob)) and \
+                os.path.samefile(os.path.join(root, key), os.path.join(root, blob)):
+            continue
+        pending.append(key)
+    print(f"📂 {len(pending)} files to hash under {root} ({len(known)} already in the store)")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        hashes = list(pool.map(lambda key: hash_file(os.path.join(root, key)), pending))
+    hashed_bytes = sum(size for _, size in hashes)
+    elapsed = time.perf_counter() - started
+    print(f"🔐 Hashed {hashed_bytes / 1e6:.1f} MB in {elapsed:.2f}s "
+          f"({hashed_bytes / 1e6 / elapsed if elapsed else 0:.0f} MB/s, {jobs} jobs)")
+
+    freed = 0
+    rows = []
+    blobs: Set[str] = set()
+    planned: Set[str] = set()
+    for key, (digest, size) in zip(pending, hashes):
+        target = blob_key(digest, os.path.splitext(key)[1])
+        freed += link_to_blob(root, key, target, dry_run, planned)
+        blobs.add(target)
+        rows.append((key, target, digest, size))
+    print(f"🔗 {len(rows)} files map onto {len(blobs)} distinct blobs; {freed / 1e6:.1f} MB freed")
+
+    if dry_run:
+        print("🔎 Dry run: no links written and no database rows changed")
+        return
+
+    with conn.cursor() as cur:
+        for start in range(0, len(rows), batch_size):
+            execute_values(cur, """
+                INSERT INTO upload_store_links ("legacyKey", "blobKey", sha256, size) VALUES %s
+                ON CONFLICT ("legacyKey") DO UPDATE
+                SET "blobKey" = EXCLUDED."blobKey", sha256 = EXCLUDED.sha256, size = EXCLUDED.size
+            """, rows[start:start + batch_size])
+            conn.commit()
+    rewrite_references(conn, batch_size)
+
+
+def rewrite_references(conn, batch_size: int):
+    """Point every stored reference at the blob key, one keyset batch per transaction."""
+    with conn.cursor() as cur:
+        columns = existing_columns(cur)
+    conn.commit()
+
+    for table, column, prefix in columns:
+        statement = f"""
+            WITH batch AS (
+                SELECT t.id, l."blobKey"
+                FROM {table} t
+                JOIN upload_store_links l ON t."{column}" = %(prefix)s || l."legacyKey"
+                WHERE %(last)s::uuid IS NULL OR t.id > %(last)s::uuid
+                ORDER BY t.id
+                LIMIT %(limit)s
+            ),
+            updated AS (
+                UPDATE {table} t SET "{column}" = %(prefix)s || batch."blobKey"
+                FROM batch WHERE t.id = batch.id
+            )
+            SELECT count(*), (array_agg(id ORDER BY id DESC))[1] FROM batch
+        """
+        total, last = 0, None
+        while True:
+            with conn.cursor() as cur:
+                cur.execute(statement, {"prefix": prefix, "last": last, "limit": batch_size})
+                count, last = cur.fetchone()
+                last = str(last) if last else None
+            conn.commit()
+            if not count:
+                break
+            total += count
+        print(f"✏️  {table}.\"{column}\": {total} references rewritten")
+
+
+def referenced_keys(conn) -> Set[str]:
+    """Every upload key the database still points at, streamed via server-side cursors."""
+    keys: Set[str] = set()
+    with conn.cursor() as cur:
+        columns = existing_columns(cur)
+    conn.commit()
+    for table, column, prefix in columns:
+        with conn.cursor(name=f"refs_{table}") as cur:
+            cur.itersize = 10000
+            cur.execute(f'SELECT "{column}" FROM {table} WHERE "{column}" LIKE %s', (prefix + "%",))
+            for (value,) in cur:
+                keys.add(value[len(prefix):])
+        conn.commit()
+    return keys
+
+
+def gc(conn, root: str, dry_run: bool):
+    with conn.cursor() as cur:
+        cur.execute(LINKS_SQL)
+        cur.execute('SELECT "legacyKey" FROM upload_store_links')
+        legacy = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    referenced = referenced_keys(conn)
+
+    removed_links: List[str] = []
+    for key in legacy:
+        if key in referenced:
+            continue
+        path = os.path.join(root, key)
+        if os.path.exists(path) and not dry_run:
+            os.unlink(path)
+        removed_links.append(key)
+    if removed_links and not dry_run:
+        with conn.cursor() as cur:
+            cur.execute('DELETE FROM upload_store_links WHERE "legacyKey" = ANY(%s)', (removed_links,))
+        conn.commit()
+
+    removed_blobs, freed = 0, 0
+    cas_root = os.path.join(root, CAS_DIR)
+    for dirpath, _, filenames in os.walk(cas_root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            key = os.path.relpath(path, root).replace(os.sep, "/")
+            stat = os.stat(path)
+            if key in referenced or stat.st_nlink > 1:
+                continue
+            if not dry_run:
+                os.unlink(path)
+            removed_blobs += 1
+            freed += stat.st_size
+
+    verb = "Would remove" if dry_run else "Removed"
+    print(f"🗑️  {verb} {len(removed_links)} unreferenced legacy names and {removed_blobs} blobs "
+          f"({freed / 1e6:.1f} MB)")
+
+
+def stats(root: str):
+    logical, physical, files = 0, 0, 0
+    seen: Dict[Tuple[int, int], int] = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            stat = os.stat(os.path.join(dirpath, name))
+            if os.path.relpath(dirpath, root).split(os.sep)[0] not in SKIP_DIRS:
+                logical += stat.st_size
+                files += 1
+            inode = (stat.st_dev, stat.st_ino)
+            if inode not in seen:
+                seen[inode] = stat.st_size
+                physical += stat.st_size
+    print(f"📊 {root}: {files} upload names, {logical / 1e6:.1f} MB logical, "
+          f"{physical / 1e6:.1f} MB on disk ({len(seen)} distinct files)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Deduplicate uploads into a content-addressed store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    mig = sub.add_parser("migrate", help="Hash uploads, hard-link duplicates and rewrite references")
+    mig.add_argument("--jobs", type=int, default=os.cpu_count() or 4)
+    mig.add_argument("--batch-size", type=int, default=500)
+    mig.add_argument("--dry-run", action="store_true")
+
+    collect = sub.add_parser("gc", help="Remove unreferenced legacy names and blobs")
+    collect.add_argument("--dry-run", action="store_true")
+
+    sub.add_parser("stats", help="Compare logical and on-disk upload size")
+
+    args = parser.parse_args(argv)
+    root = upload_root()
+    if not os.path.isdir(root):
+        print(f"❌ Upload directory not found: {root}")
+        return 1
+
+    if args.command == "stats":
+        stats(root)
+        return 0
+
+    conn = connect()
+    try:
+        if args.command == "migrate":
+            migrate(conn, root, args.jobs, args.batch_size, args.dry_run)
+        else:
+            gc(conn, root, args.dry_run)
+        stats(root)
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted by user. Goodbye!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)